@@ -0,0 +1,39 @@
+"""add wishlist_item full-text search
+
+Revision ID: a8d4e1c7b9f2
+Revises: f2a7c9d3e6b5
+Create Date: 2026-10-16 20:24:05.613870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4e1c7b9f2'
+down_revision: Union[str, Sequence[str], None] = 'f2a7c9d3e6b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Same DDL as db.models.WISHLIST_SEARCH_DDL["postgresql"]. Adding a stored generated
+    # column rewrites wishlist_item, so run this in a quiet window on big tables.
+    op.execute(
+        "ALTER TABLE wishlist_item ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', regexp_replace(url, '[^[:alnum:]]+', ' ', 'g')), 'B')"
+        ") STORED"
+    )
+    op.create_index(
+        'ix_wishlist_search', 'wishlist_item', ['search_tsv'], unique=False, postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wishlist_search', table_name='wishlist_item')
+    op.drop_column('wishlist_item', 'search_tsv')
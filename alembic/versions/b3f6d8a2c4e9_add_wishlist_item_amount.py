@@ -0,0 +1,77 @@
+"""add wishlist_item amount_minor and currency
+
+Revision ID: b3f6d8a2c4e9
+Revises: a8d4e1c7b9f2
+Create Date: 2026-10-16 21:37:18.952046
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db.price_parsers import parse_price_v1
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f6d8a2c4e9'
+down_revision: Union[str, Sequence[str], None] = 'a8d4e1c7b9f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 1000
+
+wishlist_item = sa.table(
+    'wishlist_item',
+    sa.column('id', sa.Integer),
+    sa.column('price', sa.Text),
+    sa.column('amount_minor', sa.BigInteger),
+    sa.column('currency', sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('wishlist_item', sa.Column('amount_minor', sa.BigInteger(), nullable=True))
+    op.add_column('wishlist_item', sa.Column('currency', sa.String(length=3), nullable=True))
+
+    # Keyset batches over id; only rows with a parseable price are written.
+    conn = op.get_bind()
+    stmt = (
+        sa.update(wishlist_item)
+        .where(wishlist_item.c.id == sa.bindparam('row_id'))
+        .values(amount_minor=sa.bindparam('amount_minor'), currency=sa.bindparam('currency'))
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(wishlist_item.c.id, wishlist_item.c.price)
+            .where(wishlist_item.c.id > last_id)
+            .order_by(wishlist_item.c.id)
+            .limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row_id, price in rows:
+            amount_minor, currency = parse_price_v1(price)
+            if amount_minor is not None:
+                updates.append({"row_id": row_id, "amount_minor": amount_minor, "currency": currency})
+        if updates:
+            conn.execute(stmt, updates)
+        last_id = rows[-1][0]
+
+    # Built after the backfill; must match db.models.PRICE_SORT_KEY exactly.
+    op.create_index(
+        'ix_wishlist_guild_channel_price',
+        'wishlist_item',
+        ['guild_id', 'channel_id', sa.text('coalesce(amount_minor, 9223372036854775807)'), 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wishlist_guild_channel_price', table_name='wishlist_item')
+    op.drop_column('wishlist_item', 'currency')
+    op.drop_column('wishlist_item', 'amount_minor')
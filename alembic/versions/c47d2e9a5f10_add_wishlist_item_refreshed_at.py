@@ -0,0 +1,32 @@
+"""add wishlist_item.refreshed_at
+
+Revision ID: c47d2e9a5f10
+Revises: 8b1e4c6f2a93
+Create Date: 2026-10-16 15:26:09.511374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47d2e9a5f10'
+down_revision: Union[str, Sequence[str], None] = '8b1e4c6f2a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('wishlist_item', sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    # Existing items are as stale as their capture time.
+    op.execute("UPDATE wishlist_item SET refreshed_at = created_at")
+    op.create_index('ix_wishlist_refreshed_at', 'wishlist_item', ['refreshed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wishlist_refreshed_at', table_name='wishlist_item')
+    op.drop_column('wishlist_item', 'refreshed_at')
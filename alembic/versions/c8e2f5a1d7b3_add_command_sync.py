@@ -0,0 +1,33 @@
+"""add command_sync
+
+Revision ID: c8e2f5a1d7b3
+Revises: b3f6d8a2c4e9
+Create Date: 2026-10-16 23:11:42.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2f5a1d7b3'
+down_revision: Union[str, Sequence[str], None] = 'b3f6d8a2c4e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('command_sync',
+    sa.Column('scope', sa.String(length=32), nullable=False),
+    sa.Column('tree_hash', sa.String(length=64), nullable=False),
+    sa.Column('synced_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('scope')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('command_sync')
@@ -0,0 +1,27 @@
+"""add wishlist_item url_norm index
+
+Revision ID: d4a9b2e7f1c6
+Revises: c8e2f5a1d7b3
+Create Date: 2026-10-17 10:24:51.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9b2e7f1c6'
+down_revision: Union[str, Sequence[str], None] = 'c8e2f5a1d7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_wishlist_url_norm', 'wishlist_item', ['url_norm'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wishlist_url_norm', table_name='wishlist_item')
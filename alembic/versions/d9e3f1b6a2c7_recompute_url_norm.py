@@ -0,0 +1,31 @@
+"""recompute url_norm with canonical urls
+
+Revision ID: d9e3f1b6a2c7
+Revises: c47d2e9a5f10
+Create Date: 2026-10-16 16:48:52.204617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from db.url_norms import normalize_v2, recompute_url_norms
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e3f1b6a2c7'
+down_revision: Union[str, Sequence[str], None] = 'c47d2e9a5f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Frozen normalizer: rerunning this later must give the norms it gave the first time.
+    recompute_url_norms(op.get_bind(), normalize_v2)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Old norms aren't kept and merged duplicates are gone; nothing to undo.
+    pass
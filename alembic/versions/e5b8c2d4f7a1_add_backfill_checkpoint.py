@@ -0,0 +1,40 @@
+"""add backfill_checkpoint
+
+Revision ID: e5b8c2d4f7a1
+Revises: d9e3f1b6a2c7
+Create Date: 2026-10-16 18:02:14.730561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8c2d4f7a1'
+down_revision: Union[str, Sequence[str], None] = 'd9e3f1b6a2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('backfill_checkpoint',
+    sa.Column('guild_id', sa.String(length=32), nullable=False),
+    sa.Column('channel_id', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(length=16), server_default='running', nullable=False),
+    sa.Column('before_message_id', sa.String(length=32), nullable=True),
+    sa.Column('messages_scanned', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('links_found', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('links_saved', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('started_by', sa.Text(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('guild_id', 'channel_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('backfill_checkpoint')
@@ -0,0 +1,53 @@
+"""add channel_stats and channel_poster
+
+Revision ID: f2a7c9d3e6b5
+Revises: e5b8c2d4f7a1
+Create Date: 2026-10-16 19:11:42.318907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7c9d3e6b5'
+down_revision: Union[str, Sequence[str], None] = 'e5b8c2d4f7a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('channel_stats',
+    sa.Column('guild_id', sa.String(length=32), nullable=False),
+    sa.Column('channel_id', sa.String(length=32), nullable=False),
+    sa.Column('item_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('poster_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('last_added_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('guild_id', 'channel_id')
+    )
+    op.create_table('channel_poster',
+    sa.Column('guild_id', sa.String(length=32), nullable=False),
+    sa.Column('channel_id', sa.String(length=32), nullable=False),
+    sa.Column('user_tag', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('guild_id', 'channel_id', 'user_tag')
+    )
+    # Existing channels start out reconciled.
+    op.execute(
+        "INSERT INTO channel_poster (guild_id, channel_id, user_tag) "
+        "SELECT DISTINCT guild_id, channel_id, user_tag FROM wishlist_item WHERE user_tag IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO channel_stats (guild_id, channel_id, item_count, poster_count, last_added_at, reconciled_at) "
+        "SELECT guild_id, channel_id, count(*), count(DISTINCT user_tag), max(created_at), now() "
+        "FROM wishlist_item GROUP BY guild_id, channel_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('channel_poster')
+    op.drop_table('channel_stats')
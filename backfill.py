@@ -0,0 +1,238 @@
+"""
+/wishlist backfill: import links from a channel's existing message history.
+
+History is read newest -> oldest in pages. Each page's links are checked against the
+channel's stored url_norms in one query, the new ones are scraped through a small
+bounded pool (through the scrape cache, so per-host buckets/breakers still apply) and
+saved in large multi-row inserts. After each insert the checkpoint row moves to the
+oldest message covered, so an interrupted run (restart, crash, DB outage) resumes
+there instead of starting over.
+
+Two budgets keep it polite next to live traffic: history pages per minute (Discord)
+and scrapes per minute (retailers), plus BACKFILL_CONCURRENCY in-flight scrapes.
+"""
+import asyncio
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import discord
+from sqlalchemy import select
+
+import metrics
+import scrape_cache
+from db.models import BackfillCheckpoint
+from db.session import AsyncSessionLocal, dialect_insert
+from scraper import TokenBucket
+from urls import normalize_url, resolve_short_link
+
+BACKFILL_PAGE_SIZE = 100  # Discord's max per history request
+BACKFILL_PAGES_PER_MIN = float(os.getenv("BACKFILL_PAGES_PER_MIN", "30"))
+BACKFILL_SCRAPES_PER_MIN = float(os.getenv("BACKFILL_SCRAPES_PER_MIN", "60"))
+BACKFILL_CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "3"))
+BACKFILL_BATCH = int(os.getenv("BACKFILL_BATCH", "500"))
+# Seconds between progress message edits.
+BACKFILL_PROGRESS_INTERVAL = float(os.getenv("BACKFILL_PROGRESS_INTERVAL", "10"))
+
+FindDuplicates = Callable[[str, List[str]], Awaitable[Set[str]]]
+InsertItems = Callable[[List[Dict[str, Any]]], Awaitable[Set[Tuple[str, str]]]]
+
+
+@metrics.timed_db
+async def load_checkpoint_db(guild_id: str, channel_id: str) -> Optional[BackfillCheckpoint]:
+    async with AsyncSessionLocal() as db:
+        return await db.get(BackfillCheckpoint, (str(guild_id), str(channel_id)))
+
+
+@metrics.timed_db
+async def running_checkpoints_db() -> List[BackfillCheckpoint]:
+    async with AsyncSessionLocal() as db:
+        return list(
+            (await db.execute(select(BackfillCheckpoint).where(BackfillCheckpoint.status == "running")))
+            .scalars()
+            .all()
+        )
+
+
+@metrics.timed_db
+async def save_checkpoint_db(cp: Dict[str, Any]) -> None:
+    values = dict(cp, updated_at=datetime.now(timezone.utc))
+    stmt = dialect_insert(BackfillCheckpoint).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BackfillCheckpoint.guild_id, BackfillCheckpoint.channel_id],
+        set_={k: v for k, v in values.items() if k not in ("guild_id", "channel_id")},
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+
+class Backfill:
+    """
+    One run over one channel. run() is resumable: it starts from the stored checkpoint
+    unless restart=True.
+    """
+    def __init__(
+        self,
+        channel: "discord.abc.Messageable",
+        guild_id: str,
+        find_duplicates: FindDuplicates,
+        insert: InsertItems,
+        url_regex: str,
+        started_by: Optional[str] = None,
+    ):
+        self.channel = channel
+        self.guild_id = str(guild_id)
+        self.channel_id = str(channel.id)
+        self.find_duplicates = find_duplicates
+        self.insert = insert
+        self.url_regex = re.compile(url_regex)
+        self.pages = TokenBucket(BACKFILL_PAGES_PER_MIN / 60, 1)
+        self.scrapes = TokenBucket(BACKFILL_SCRAPES_PER_MIN / 60, BACKFILL_CONCURRENCY)
+        self.sem = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+        self.cp: Dict[str, Any] = {
+            "guild_id": self.guild_id,
+            "channel_id": self.channel_id,
+            "status": "running",
+            "before_message_id": None,
+            "messages_scanned": 0,
+            "links_found": 0,
+            "links_saved": 0,
+            "started_by": started_by,
+            "last_error": None,
+        }
+        self._committed = dict(self.cp)
+        self.progress_message: Optional[discord.Message] = None
+        self._last_progress = 0.0
+
+    # --- progress ---------------------------------------------------------------------
+
+    def render(self) -> str:
+        cp = self.cp
+        head = {
+            "running": "⏳ Backfilling this channel…",
+            "done": "✅ Backfill finished.",
+            "failed": "⚠️ Backfill stopped; run `/wishlist backfill` again to resume.",
+        }.get(cp["status"], cp["status"])
+        return (
+            f"{head}\n"
+            f"Messages scanned: **{cp['messages_scanned']}** · links found: **{cp['links_found']}**"
+            f" · new items saved: **{cp['links_saved']}**"
+        )
+
+    async def _report(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self._last_progress < BACKFILL_PROGRESS_INTERVAL:
+            return
+        self._last_progress = time.monotonic()
+        try:
+            if self.progress_message is None:
+                self.progress_message = await self.channel.send(self.render())
+            else:
+                await self.progress_message.edit(content=self.render())
+        except discord.HTTPException as e:
+            print(f"⚠️ Backfill progress update failed in {self.channel_id}: {e}")
+
+    # --- work -------------------------------------------------------------------------
+
+    async def _scrape(self, url: str) -> Dict[str, Any]:
+        await self.scrapes.acquire()
+        async with self.sem:
+            return await scrape_cache.cached_scrape(url)
+
+    async def _page(self, before: Optional[int]) -> List[discord.Message]:
+        await self.pages.acquire()
+        return [
+            m async for m in self.channel.history(
+                limit=BACKFILL_PAGE_SIZE,
+                before=discord.Object(id=before) if before else None,
+                oldest_first=False,
+            )
+        ]
+
+    async def _links(self, messages: List[discord.Message], seen: Set[str]) -> List[Dict[str, Any]]:
+        found = []
+        for m in messages:
+            if m.author.bot:
+                continue
+            for url in self.url_regex.findall(m.content or ""):
+                found.append({"url": url, "user_tag": str(m.author), "created_at": m.created_at})
+        resolved = await asyncio.gather(*(resolve_short_link(f["url"]) for f in found))
+        out = []
+        for f, url in zip(found, resolved):
+            norm = normalize_url(url)
+            if norm in seen:
+                continue
+            seen.add(norm)
+            out.append(dict(f, url=url))
+        return out
+
+    async def _flush(self, batch: List[Dict[str, Any]], before: Optional[int]) -> None:
+        if batch:
+            existing = await self.find_duplicates(self.channel_id, [b["url"] for b in batch])
+            new = [b for b in batch if normalize_url(b["url"]) not in existing]
+            infos = await asyncio.gather(*(self._scrape(b["url"]) for b in new))
+            inserted = await self.insert(
+                [
+                    {
+                        "guild_id": self.guild_id,
+                        "channel_id": self.channel_id,
+                        "url": b["url"],
+                        "title": info.get("title", "Unknown"),
+                        "price": info.get("price"),
+                        "user_tag": b["user_tag"],
+                        "created_at": b["created_at"],
+                    }
+                    for b, info in zip(new, infos)
+                ]
+            )
+            self.cp["links_saved"] += len(inserted)
+            metrics.LINKS_CAPTURED.inc(len(inserted))
+        # Only now is everything newer than `before` stored.
+        self.cp["before_message_id"] = str(before) if before else self.cp["before_message_id"]
+        await save_checkpoint_db(self.cp)
+        self._committed = dict(self.cp)
+
+    async def run(self, restart: bool = False) -> Dict[str, Any]:
+        stored = None if restart else await load_checkpoint_db(self.guild_id, self.channel_id)
+        if stored is not None and stored.status != "done":
+            for k in ("before_message_id", "messages_scanned", "links_found", "links_saved"):
+                self.cp[k] = getattr(stored, k)
+        await save_checkpoint_db(self.cp)
+        self._committed = dict(self.cp)
+        await self._report(force=True)
+
+        before = int(self.cp["before_message_id"]) if self.cp["before_message_id"] else None
+        seen: Set[str] = set()
+        batch: List[Dict[str, Any]] = []
+        try:
+            while True:
+                messages = await self._page(before)
+                if not messages:
+                    break
+                # Links in the part of the page we've read are queued; the checkpoint
+                # only advances when they are saved.
+                links = await self._links(messages, seen)
+                batch.extend(links)
+                before = messages[-1].id
+                self.cp["messages_scanned"] += len(messages)
+                self.cp["links_found"] += len(links)
+                if len(batch) >= BACKFILL_BATCH:
+                    await self._flush(batch, before)
+                    batch = []
+                await self._report()
+            await self._flush(batch, before)
+            self.cp["status"] = "done"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Counters go back to the last checkpoint so a resume doesn't count pages twice.
+            self.cp = dict(self._committed, status="failed", last_error=f"{type(e).__name__}: {e}")
+            print(f"❌ Backfill of {self.channel_id} failed: {e}")
+        try:
+            await save_checkpoint_db(self.cp)
+        except Exception as e:
+            print(f"⚠️ Could not store backfill checkpoint for {self.channel_id}: {e}")
+        await self._report(force=True)
+        return self.cp
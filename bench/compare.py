@@ -0,0 +1,40 @@
+"""
+Diff two bench/run.py result files: every numeric metric, old -> new, with % change.
+
+    python bench/compare.py before.json after.json
+"""
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+
+def flatten(d: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(d, dict):
+        for k, v in d.items():
+            if k == "args":
+                continue
+            yield from flatten(v, f"{prefix}.{k}" if prefix else k)
+    elif isinstance(d, (int, float)) and not isinstance(d, bool):
+        yield prefix, float(d)
+
+
+def main() -> None:
+    if len(sys.argv) != 3:
+        raise SystemExit(__doc__)
+    with open(sys.argv[1]) as f:
+        old: Dict[str, float] = dict(flatten(json.load(f)))
+    with open(sys.argv[2]) as f:
+        new: Dict[str, float] = dict(flatten(json.load(f)))
+
+    width = max((len(k) for k in old.keys() | new.keys()), default=0)
+    for key in sorted(old.keys() | new.keys()):
+        a, b = old.get(key), new.get(key)
+        if a is None or b is None:
+            print(f"{key:<{width}}  {a!s:>12} -> {b!s:<12}")
+            continue
+        change = f"{(b - a) / a * 100:+.1f}%" if a else ""
+        print(f"{key:<{width}}  {a:>12.3f} -> {b:<12.3f} {change}")
+
+
+if __name__ == "__main__":
+    main()
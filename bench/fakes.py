@@ -0,0 +1,70 @@
+"""
+Minimal stand-ins for the discord.py objects the bot touches, so benchmarks can drive
+on_message, the /wishlist commands and WishlistPager without a gateway connection.
+"""
+from typing import Any, List, Optional, Tuple
+
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, user_id: int = 1, name: str = "bench-user"):
+        self.id = user_id
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, shard_id: int = 0):
+        self.id = guild_id
+        self.shard_id = shard_id
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.sent: List[Tuple[Optional[str], dict]] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.sent.append((content, kwargs))
+
+
+class FakeMessage:
+    def __init__(self, content: str, guild: FakeGuild, channel: FakeChannel, author: Optional[FakeUser] = None):
+        self.content = content
+        self.guild = guild
+        self.channel = channel
+        self.author = author or FakeUser()
+
+
+class FakeResponse:
+    def __init__(self):
+        self.calls: List[Tuple[str, Optional[str], dict]] = []
+
+    async def send_message(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.calls.append(("send_message", content, kwargs))
+
+    async def edit_message(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.calls.append(("edit_message", content, kwargs))
+
+    async def defer(self, **kwargs: Any) -> None:
+        self.calls.append(("defer", None, kwargs))
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.calls: List[Tuple[Optional[str], dict]] = []
+
+    async def send(self, content: Optional[str] = None, **kwargs: Any) -> None:
+        self.calls.append((content, kwargs))
+
+
+class FakeInteraction:
+    def __init__(self, guild_id: int, channel_id: int, user: Optional[FakeUser] = None):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.user = user or FakeUser()
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
@@ -0,0 +1,136 @@
+"""
+Slash-command latency while scrapes are in flight.
+
+Serves a slow, fairly large product page from a local aiohttp server, fires a burst
+of scrapes at it and meanwhile runs the real `/wishlist latest` command (through
+bench.fakes, against a temp SQLite DB like bench/run.py) every few milliseconds.
+Compares the old blocking path (urllib + parse on the loop) with the async scraper.
+
+    python bench/loop_latency.py --scrapes 50 --delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fakes import FakeInteraction  # noqa: E402
+from bench.pages import product_page, start_server  # noqa: E402
+
+GUILD_ID, CHANNEL_ID = 1, 2
+
+
+def blocking_scrape(scraper, url: str) -> dict:
+    # What on_message used to do: fetch and parse right on the event loop.
+    with urllib.request.urlopen(url, timeout=10) as res:
+        html = res.read().decode("utf-8", errors="replace")
+    return scraper.parse_html(html)
+
+
+async def seed(bot) -> None:
+    await bot.save_items_db(
+        [
+            {
+                "guild_id": GUILD_ID,
+                "channel_id": CHANNEL_ID,
+                "url": f"https://shop.example/item/{i}",
+                "title": f"Seeded item {i}",
+                "price": f"${i}.99",
+                "user_tag": "bench-user",
+            }
+            for i in range(20)
+        ]
+    )
+
+
+async def run(bot, scraper, mode: str, base_url: str, scrapes: int, interval: float) -> dict:
+    group = bot.WishlistGroup()
+    latencies = []
+    done = asyncio.Event()
+
+    async def probe():
+        # Commands "arrive" on a fixed schedule; latency is arrival -> handled, so
+        # time spent waiting for a blocked loop counts against it.
+        due = time.perf_counter() + interval
+        while not done.is_set():
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            await group.latest.callback(group, FakeInteraction(GUILD_ID, CHANNEL_ID))
+            now = time.perf_counter()
+            while due <= now:
+                latencies.append((now - due) * 1000)
+                due += interval
+
+    async def one(i):
+        url = f"{base_url}/p/{i}"
+        if mode == "blocking":
+            blocking_scrape(scraper, url)
+        else:
+            await scraper.scrape(url)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(interval * 5)  # baseline samples
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(scrapes)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await probe_task
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "scrapes": scrapes,
+        "wall_s": round(elapsed, 3),
+        "samples": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scrapes", type=int, default=50)
+    ap.add_argument("--delay", type=float, default=0.5, help="server-side delay per page (s)")
+    ap.add_argument("--page-kb", type=int, default=300)
+    ap.add_argument("--interval", type=float, default=0.005, help="probe interval (s)")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}/bench.db"
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    # Every page lives on 127.0.0.1: don't let per-host politeness skew the async run.
+    os.environ.setdefault("SCRAPE_HOST_RATE", "100000")
+    os.environ.setdefault("SCRAPE_HOST_BURST", "1000")
+
+    import bot  # noqa: E402  (needs the env above)
+    import scraper  # noqa: E402
+    from db.models import Base  # noqa: E402
+    from db.session import async_engine  # noqa: E402
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(bot)
+
+    port = start_server({f"/p/{i}": product_page(args.page_kb) for i in range(args.scrapes)}, args.delay)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        results = []
+        for mode in ("blocking", "async"):
+            # The blocking path is serial, keep its run short.
+            n = min(args.scrapes, 10) if mode == "blocking" else args.scrapes
+            results.append(await run(bot, scraper, mode, base_url, n, args.interval))
+        print(json.dumps(results, indent=2))
+    finally:
+        await scraper.close()
+        await async_engine.dispose()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
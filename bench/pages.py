@@ -0,0 +1,65 @@
+"""
+Synthetic product pages and a local server for the benchmarks.
+"""
+import asyncio
+import json
+import threading
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+
+LAYOUTS = ("og", "jsonld", "span")
+
+
+def product_page(kb: int, layout: str = "og", title: str = "Bench Product", price: str = "19.99") -> bytes:
+    """
+    ~kb KiB of HTML. Where the metadata lives depends on layout:
+    - og: OpenGraph/product meta tags in <head>
+    - jsonld: schema.org Product JSON-LD at the top of <body>
+    - span: only <title> + a <span class="price"> at the end of the body
+    """
+    head = f"<title>{title}</title>" + "<style>.x{color:red}</style>" * 20
+    pre, post = "", ""
+    if layout == "og":
+        head += f'<meta property="og:title" content="{title}"><meta property="product:price:amount" content="{price}">'
+    elif layout == "jsonld":
+        ld = {"@context": "https://schema.org", "@type": "Product", "name": title, "offers": {"@type": "Offer", "price": price}}
+        pre = f'<script type="application/ld+json">{json.dumps(ld)}</script>'
+    else:
+        post = f'<span class="price">${price}</span>'
+
+    filler = "<div class=\"card\"><p>" + ("lorem ipsum dolor sit amet " * 40) + "</p></div>\n"
+    body = filler * max(1, (kb * 1024) // len(filler))
+    return f"<html><head>{head}</head><body>{pre}{body}{post}</body></html>".encode()
+
+
+def start_server(pages: Dict[str, bytes], delay: float = 0.0, handler: Optional[Callable] = None) -> int:
+    """
+    Serve pages (path -> body) from a background thread with its own loop, so blocking
+    code in the benchmark can't stall it. Returns the bound port.
+    """
+    ready = threading.Event()
+    port = []
+
+    async def default_handler(request):
+        if delay:
+            await asyncio.sleep(delay)
+        body = pages.get(request.path)
+        if body is None:
+            return web.Response(status=404, text="not found")
+        return web.Response(body=body, content_type="text/html")
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler or default_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port.append(runner.addresses[0][1])
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    return port[0]
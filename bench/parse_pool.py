@@ -0,0 +1,70 @@
+"""
+Fallback-parse throughput vs cores: the same pages parsed through a thread pool (the
+old asyncio.to_thread path, GIL-bound) and through parse_pool.ParsePool with 1, 2, 4...
+workers. Pages use the "span" layout, the one the head-only extractor can't finish.
+
+    python bench/parse_pool.py --kb 500 --pages 64 --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.pages import product_page  # noqa: E402
+from extract import parse_page  # noqa: E402
+from parse_pool import ParsePool  # noqa: E402
+
+
+async def run_threads(body: bytes, pages: int, threads: int) -> float:
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(threads) as ex:
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(ex, parse_page, body, "utf-8") for _ in range(pages)))
+        return time.perf_counter() - start
+
+
+async def run_pool(body: bytes, pages: int, workers: int, max_tasks: int) -> float:
+    pool = ParsePool(workers, max_tasks)
+    try:
+        # Start every worker first so the timing is parse throughput, not interpreter startup.
+        await asyncio.gather(*(pool.parse(b"<html></html>", "utf-8") for _ in range(workers)))
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.parse(body, "utf-8") for _ in range(pages)))
+        return time.perf_counter() - start
+    finally:
+        await pool.close()
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--kb", type=int, default=500, help="page size in KiB")
+    ap.add_argument("--pages", type=int, default=64)
+    ap.add_argument("--workers", default=None, help="comma-separated pool sizes (default: 1,2,4.. up to CPUs)")
+    ap.add_argument("--max-tasks", type=int, default=0, help="recycle workers after N pages; 0 = never")
+    args = ap.parse_args()
+
+    cpus = os.cpu_count() or 1
+    sizes = [int(w) for w in args.workers.split(",")] if args.workers else sorted(
+        {1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus} | {cpus}
+    )
+    body = product_page(args.kb, "span")
+
+    def row(mode: str, n: int, seconds: float) -> dict:
+        return {"mode": mode, "n": n, "pages_per_s": round(args.pages / seconds, 1), "ms": round(seconds * 1000, 1)}
+
+    results = [row("threads", max(sizes), await run_threads(body, args.pages, max(sizes)))]
+    for n in sizes:
+        results.append(row("processes", n, await run_pool(body, args.pages, n, args.max_tasks)))
+    base = results[1]["pages_per_s"]
+    for r in results:
+        r["speedup_vs_1_process"] = round(r["pages_per_s"] / base, 2)
+    print(json.dumps({"cpus": cpus, "kb": args.kb, "pages": args.pages, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,263 @@
+"""
+Offline benchmark suite: ingestion, scraping, pagination, search and export.
+
+Everything runs locally: a corpus of synthetic product pages (small to multi-MB) is
+served from 127.0.0.1 and the real bot code is driven with fake discord objects.
+Results go to stdout and, with --out, to a JSON file so runs can be compared.
+
+    python bench/run.py                                   # temp SQLite DB
+    python bench/run.py --db postgresql://localhost/bench --out before.json
+
+Rows are written under a fresh guild/channel id per run and deleted afterwards, so a
+scratch Postgres database can be reused.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.fakes import FakeChannel, FakeGuild, FakeInteraction, FakeMessage  # noqa: E402
+from bench.pages import LAYOUTS, product_page, start_server  # noqa: E402
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(len(s) * q))]  # noqa: E731
+    return {
+        "n": len(s),
+        "p50_ms": round(pick(0.50), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(s[-1], 3),
+        "mean_ms": round(statistics.fmean(s), 3),
+    }
+
+
+async def bench_scrape(scraper, base: str, sizes: List[int], runs: int) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for layout in LAYOUTS:
+        for kb in sizes:
+            lat = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                await scraper.scrape(f"{base}/{layout}/{kb}")
+                lat.append((time.perf_counter() - t0) * 1000)
+            out[f"{layout}/{kb}KiB"] = percentiles(lat)
+    return out
+
+
+async def bench_ingest(bot, base: str, guild_id: int, channel_id: int, messages: int, links: int) -> Dict[str, Any]:
+    client = bot.WishlistBot()
+    guild, channel = FakeGuild(guild_id), FakeChannel(channel_id)
+    run_id = int(time.time())
+    lat = []
+
+    t0 = time.perf_counter()
+    for m in range(messages):
+        # Distinct URLs (query string) over a handful of pages: exercises dedupe, the
+        # scrape cache and batch inserts the way a busy channel would.
+        urls = " ".join(f"{base}/og/50?run={run_id}&m={m}&i={i}" for i in range(links))
+        t = time.perf_counter()
+        await client.on_message(FakeMessage(f"check these {urls}", guild, channel))
+        lat.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - t0
+
+    # Re-post the first message: pure duplicate path.
+    dup_urls = " ".join(f"{base}/og/50?run={run_id}&m=0&i={i}" for i in range(links))
+    t = time.perf_counter()
+    await client.on_message(FakeMessage(dup_urls, guild, channel))
+    dup_ms = (time.perf_counter() - t) * 1000
+
+    return {
+        "messages": messages,
+        "links_per_message": links,
+        "messages_per_s": round(messages / elapsed, 2),
+        "links_per_s": round(messages * links / elapsed, 2),
+        "latency": percentiles(lat),
+        "duplicate_message_ms": round(dup_ms, 3),
+    }
+
+
+async def seed(bot, guild_id: int, channel_id: int, n: int) -> None:
+    batch = 1000
+    for start in range(0, n, batch):
+        await bot.save_items_db(
+            [
+                {
+                    "guild_id": guild_id,
+                    "channel_id": channel_id,
+                    "url": f"https://shop.example/item/{i}",
+                    "title": f"Seeded item {i}",
+                    "price": f"${i % 500}.99",
+                    "user_tag": f"user{i % 37}",
+                }
+                for i in range(start, min(n, start + batch))
+            ]
+        )
+
+
+async def bench_pagination(bot, guild_id: int, channel_id: int, depths: List[int], page_size: int) -> Dict[str, Any]:
+    group = bot.WishlistGroup()
+    interaction = FakeInteraction(guild_id, channel_id)
+    t0 = time.perf_counter()
+    await group.all.callback(group, interaction, page_size=page_size)
+    open_ms = (time.perf_counter() - t0) * 1000
+    view = interaction.response.calls[-1][2]["view"]
+    buttons = {c.custom_id: c for c in view.children}
+
+    out: Dict[str, Any] = {"open_ms": round(open_ms, 3), "next_click": {}}
+    page, window = 0, []
+    for depth in sorted(depths):
+        while page < depth and not buttons["next"].disabled:
+            t = time.perf_counter()
+            await buttons["next"].callback(FakeInteraction(guild_id, channel_id))
+            window.append((time.perf_counter() - t) * 1000)
+            page += 1
+        # Latency of the last few clicks before reaching this depth.
+        out["next_click"][f"page_{depth}"] = percentiles(window[-10:])
+        window = []
+
+    t = time.perf_counter()
+    await buttons["last"].callback(FakeInteraction(guild_id, channel_id))
+    out["last_ms"] = round((time.perf_counter() - t) * 1000, 3)
+    t = time.perf_counter()
+    await buttons["first"].callback(FakeInteraction(guild_id, channel_id))
+    out["first_ms"] = round((time.perf_counter() - t) * 1000, 3)
+    return out
+
+
+async def bench_search(bot, guild_id: int, channel_id: int, n: int, runs: int = 20) -> Dict[str, Any]:
+    # From one match to every row of the channel; URL words come from the weight-B part.
+    queries = {
+        "one_item": f"seeded item {n // 2}",
+        "prefix": f"item {n // 100}",
+        "every_row": "seeded",
+        "url_word": "shop example",
+    }
+    out: Dict[str, Any] = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(runs):
+            t = time.perf_counter()
+            hits = await bot.search_items_db(str(guild_id), str(channel_id), query)
+            samples.append((time.perf_counter() - t) * 1000)
+        out[name] = dict(percentiles(samples), hits=len(hits))
+    return out
+
+
+async def bench_export(bot, guild_id: int, channel_id: int) -> Dict[str, Any]:
+    group = bot.WishlistGroup()
+    out: Dict[str, Any] = {}
+    for fmt in ("json", "ndjson", "csv"):
+        for compress in (False, True):
+            choice = bot.discord.app_commands.Choice(name=fmt, value=fmt)
+            interaction = FakeInteraction(guild_id, channel_id)
+            tracemalloc.start()
+            t = time.perf_counter()
+            await group.export.callback(group, interaction, choice, compress)
+            elapsed = (time.perf_counter() - t) * 1000
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            files = [f for _, kw in interaction.followup.calls for f in kw.get("files", [])]
+            out[f"{fmt}{'.gz' if compress else ''}"] = {
+                "ms": round(elapsed, 1),
+                "peak_mib": round(peak / 2**20, 2),
+                "files": len(files),
+            }
+    return out
+
+
+async def cleanup(bot, guild_id: int, channel_id: int) -> None:
+    await bot.clear_channel_db(str(guild_id), str(channel_id))
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", help="DATABASE_URL (default: temp SQLite file)")
+    ap.add_argument("--sizes", default="20,200,2000,5000", help="corpus page sizes in KiB")
+    ap.add_argument("--scrape-runs", type=int, default=5)
+    ap.add_argument("--messages", type=int, default=100)
+    ap.add_argument("--links", type=int, default=5, help="links per ingested message")
+    ap.add_argument("--items", type=int, default=20000, help="rows seeded for pagination/search/export")
+    ap.add_argument("--depths", default="1,10,100,1000", help="pager depths to report")
+    ap.add_argument("--page-size", type=int, default=5)
+    ap.add_argument("--only", help="comma list of: scrape,ingest,pagination,search,export")
+    ap.add_argument("--out", help="write results JSON here")
+    args = ap.parse_args()
+
+    tmp = None
+    if not args.db:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = f"sqlite:///{tmp.name}/bench.db"
+    os.environ["DATABASE_URL"] = args.db
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    # Every corpus page lives on 127.0.0.1: don't let per-host politeness skew numbers.
+    os.environ.setdefault("SCRAPE_HOST_RATE", "100000")
+    os.environ.setdefault("SCRAPE_HOST_BURST", "1000")
+
+    import bot  # noqa: E402  (needs the env above)
+    import scraper  # noqa: E402
+    from db.models import Base  # noqa: E402
+    from db.session import async_engine  # noqa: E402
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    pages = {f"/{layout}/{kb}": product_page(kb, layout) for layout in LAYOUTS for kb in sizes}
+    pages["/og/50"] = product_page(50, "og")
+    base = f"http://127.0.0.1:{start_server(pages)}"
+
+    only = set(args.only.split(",")) if args.only else {"scrape", "ingest", "pagination", "search", "export"}
+    run_id = int(time.time() * 1000) % 10**12
+    ingest_channel, browse_channel = run_id, run_id + 1
+    guild_id = run_id
+
+    results: Dict[str, Any] = {
+        "db": async_engine.dialect.name,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": vars(args),
+    }
+    try:
+        if "scrape" in only:
+            results["scrape"] = await bench_scrape(scraper, base, sizes, args.scrape_runs)
+        if "ingest" in only:
+            results["ingest"] = await bench_ingest(bot, base, guild_id, ingest_channel, args.messages, args.links)
+        if only & {"pagination", "search", "export"}:
+            t = time.perf_counter()
+            await seed(bot, guild_id, browse_channel, args.items)
+            results["seed_s"] = round(time.perf_counter() - t, 2)
+        if "pagination" in only:
+            depths = [int(d) for d in args.depths.split(",")]
+            results["pagination"] = await bench_pagination(bot, guild_id, browse_channel, depths, args.page_size)
+        if "search" in only:
+            results["search"] = await bench_search(bot, guild_id, browse_channel, args.items)
+        if "export" in only:
+            results["export"] = await bench_export(bot, guild_id, browse_channel)
+    finally:
+        await cleanup(bot, guild_id, ingest_channel)
+        await cleanup(bot, guild_id, browse_channel)
+        await scraper.close()
+        await async_engine.dispose()
+
+    text = json.dumps(results, indent=2, default=str)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+"""
+Bytes read and CPU per scrape: head-only streaming extractor vs full body + BeautifulSoup.
+
+    python bench/scrape_bytes.py --sizes 50,500,2000,5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper  # noqa: E402
+from bench.pages import LAYOUTS, product_page, start_server  # noqa: E402
+
+
+async def full_body(url: str) -> dict:
+    # The pre-streaming behaviour: read everything, parse everything.
+    async with scraper.get_session().get(url) as res:
+        html = await res.text(errors="replace")
+    info = scraper.parse_html(html)
+    info["bytes"] = len(html.encode())
+    return info
+
+
+async def measure(fn, url: str, runs: int) -> dict:
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    info = {}
+    for _ in range(runs):
+        info = await fn(url)
+    return {
+        "title": info.get("title"),
+        "price": info.get("price"),
+        "bytes": info.get("bytes"),
+        "cpu_ms": round((time.process_time() - cpu0) * 1000 / runs, 2),
+        "wall_ms": round((time.perf_counter() - wall0) * 1000 / runs, 2),
+    }
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="50,500,2000,5000", help="page sizes in KiB")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    pages = {f"/{layout}/{kb}": product_page(kb, layout) for layout in LAYOUTS for kb in sizes}
+    base = f"http://127.0.0.1:{start_server(pages)}"
+
+    async def head_only(url):
+        async with scraper.get_session().get(url) as res:
+            return await scraper.read_page(res)
+
+    results = []
+    try:
+        for path in pages:
+            url = base + path
+            results.append({
+                "page": path,
+                "full": await measure(full_body, url, args.runs),
+                "head": await measure(head_only, url, args.runs),
+            })
+    finally:
+        await scraper.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
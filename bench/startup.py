@@ -0,0 +1,60 @@
+"""
+Import time and RSS of `import bot`, each run in a fresh interpreter, plus which heavy
+modules got loaded on the way (bs4 and psycopg2 should only load on first use).
+
+    python bench/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import bot, metrics
+print(json.dumps({
+    "import_ms": (time.perf_counter() - t0) * 1000,
+    "rss_mib": metrics.rss_bytes() / 2**20,
+    "modules": len(sys.modules),
+    "loaded": [m for m in ("bs4", "psycopg2", "requests") if m in sys.modules],
+}))
+"""
+
+
+def probe(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--db", default=None, help="DATABASE_URL (default: temp SQLite; never connected)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="wishlist-startup-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.db or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+        METRICS_PORT="",
+    )
+    runs = [probe(env) for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "import_ms_p50": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "rss_mib_p50": round(statistics.median(r["rss_mib"] for r in runs), 1),
+        "modules": runs[-1]["modules"],
+        "eager_heavy_modules": runs[-1]["loaded"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
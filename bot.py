@@ -1,59 +1,107 @@
+import time
+
+STARTED_AT = time.perf_counter()
+
+import asyncio
 import discord
+import hashlib
+import json
 import re
 import os
-import json
-import io
 import math
-from urllib.parse import urlparse, urlunparse
-from typing import Optional, List, Dict, Any
+from datetime import timezone
+from typing import Optional, List, Dict, Any, AsyncIterator, Set, Tuple
 
 from dotenv import load_dotenv
-from scraper import scrape
 
-from sqlalchemy import select, delete, func
-from sqlalchemy.exc import IntegrityError
+# Before the db/scraper imports below: they read their settings at import time.
+load_dotenv()
+
+import channel_stats
+import dedupe
+import metrics
+import prices
+import refresher
+import render_cache
+import scraper
+import scrape_cache
+import write_buffer
+from backfill import Backfill, running_checkpoints_db
+from cache import LRUCache
+from export import EXPORT_FORMATS, EXPORT_MAX_BYTES, write_export
+from shards import parse_shard_ids
+from urls import normalize_url, resolve_short_link, resolver_stats
 
-from db.session import SessionLocal
-from db.models import ChannelConfig, WishlistItem
+from sqlalchemy import column, delete, func, literal_column, or_, select, table, text
 
-load_dotenv()
+from db.session import DB_POOL_SIZE, AsyncSessionLocal, async_engine, dialect_insert
+from db.models import PRICE_SORT_KEY, ChannelConfig, CommandSync, ScrapeJob, WishlistItem
+
+IMPORTED_AT = time.perf_counter()
 
 TOKEN = os.getenv("DISCORD_TOKEN")
-if not TOKEN:
-    raise RuntimeError("DISCORD_TOKEN is not set")
 
 # If true, the bot will sync slash commands on startup.
 # Prefer leaving this OFF in production unless you are intentionally syncing. :contentReference[oaicite:1]{index=1}
 SYNC_COMMANDS = os.getenv("SYNC_COMMANDS", "false").lower() in ("1", "true", "yes")
 
+# If true, on_message only enqueues new links (scrape_job); worker.py scrapes, saves and replies.
+SCRAPE_QUEUE = os.getenv("SCRAPE_QUEUE", "false").lower() in ("1", "true", "yes")
+
 # Optional: if set, sync commands instantly to a single guild (fast iteration).
 # Provide a guild ID string like "123456789012345678".
 SYNC_GUILD_ID = os.getenv("SYNC_GUILD_ID")
 
+# "lean" (small VMs): no member/message caches, no guild chunking, only the gateway
+# intents on_message needs, and DB warm-up + command sync run after login instead of
+# before it. "full" keeps discord.py's defaults.
+RUNTIME_PROFILE = os.getenv("RUNTIME_PROFILE", "full").lower()
+LEAN = RUNTIME_PROFILE == "lean"
+# Cap on the retry delay when warm-up finds the database unreachable.
+WARM_UP_BACKOFF_MAX = 60.0
+
+# Sharding (shards.py sets these per process). SHARD_COUNT switches to AutoShardedClient
+# ("auto" = Discord's recommendation); SHARD_IDS limits this process to some shards.
+SHARD_COUNT = os.getenv("SHARD_COUNT", "")
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", ""))
+# Process-wide jobs (price refresh, stats reconciliation, command sync) run once per
+# bot, in the process that owns shard 0.
+PRIMARY = not SHARD_IDS or 0 in SHARD_IDS
+
 URL_REGEX = r"https?://[^\s]+"
 
-intents = discord.Intents.default()
+# Discord limits: message content length and embeds per message.
+MAX_MESSAGE_CHARS = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_FILES_PER_MESSAGE = 10
+
+# /wishlist all page size cap; titles are clipped so a full page stays under MAX_MESSAGE_CHARS.
+MAX_PAGE_SIZE = 10
+MAX_TITLE_CHARS = 80
+
+# Rows fetched per round trip when streaming /wishlist export.
+EXPORT_FETCH_ROWS = 1000
+
+# /wishlist search returns the best SEARCH_MAX_RESULTS matches in one query; the pager
+# then pages through them in memory.
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "100"))
+SEARCH_MAX_TERMS = 8
+
+# Per-channel capture flags are cached in memory (write-through from /wishlist enable|disable).
+# CONFIG_CACHE_TTL (seconds) lets other processes' changes show up; 0 = never expire.
+CONFIG_CACHE_SIZE = int(os.getenv("CONFIG_CACHE_SIZE", "10000"))
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "0")) or None
+
+if LEAN:
+    intents = discord.Intents.none()
+    intents.guilds = True  # channel lookups (backfill resume, exports)
+    intents.guild_messages = True
+else:
+    intents = discord.Intents.default()
+    intents.messages = True
 intents.message_content = True  # needed for URL capture from messages
-intents.messages = True
 
-
-def normalize_url(raw: str) -> str:
-    """
-    Normalize URL for duplicate detection:
-    - lower scheme/host
-    - strip fragments
-    - strip trailing slash
-    - keep query
-    """
-    try:
-        raw = raw.strip()
-        p = urlparse(raw)
-        scheme = (p.scheme or "https").lower()
-        netloc = p.netloc.lower()
-        path = p.path.rstrip("/")
-        return urlunparse((scheme, netloc, path, p.params, p.query, ""))  # strip fragment
-    except Exception:
-        return raw.strip()
+capture_cache = LRUCache(maxsize=CONFIG_CACHE_SIZE, ttl=CONFIG_CACHE_TTL)
 
 
 def is_admin_member(member: discord.Member) -> bool:
@@ -61,26 +109,125 @@ def is_admin_member(member: discord.Member) -> bool:
     return perms.administrator or perms.manage_messages
 
 
-def is_capture_enabled(guild_id: str, channel_id: str) -> bool:
+@metrics.timed_db
+async def preload_capture_config() -> int:
     """
-    If no row exists, default to enabled (preserve current behavior).
+    Warm capture_cache with stored channel_config rows (up to the cache size).
     """
-    with SessionLocal() as db:
-        row = db.execute(
-            select(ChannelConfig.enabled).where(
-                ChannelConfig.guild_id == str(guild_id),
-                ChannelConfig.channel_id == str(channel_id),
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(ChannelConfig.guild_id, ChannelConfig.channel_id, ChannelConfig.enabled)
+                .limit(CONFIG_CACHE_SIZE)
+            )
+        ).all()
+    for guild_id, channel_id, enabled in rows:
+        # With the warm-up in the background, a toggle or lookup may have landed first.
+        if (guild_id, channel_id) not in capture_cache:
+            capture_cache.set((guild_id, channel_id), bool(enabled))
+    return len(rows)
+
+
+@metrics.timed_db
+async def warm_pool_db(connections: int) -> None:
+    """
+    Open `connections` pooled connections at once so the first commands don't pay for
+    TCP/TLS/auth setup.
+    """
+    async def ping() -> None:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+def command_tree_hash(tree: discord.app_commands.CommandTree, guild: Optional[discord.abc.Snowflake]) -> str:
+    """
+    sha256 over the payload tree.sync() would send for this scope.
+    """
+    payload = []
+    for cmd in tree.get_commands(guild=guild):
+        try:
+            payload.append(cmd.to_dict(tree))
+        except TypeError:  # discord.py < 2.4: to_dict() takes no tree
+            payload.append(cmd.to_dict())
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+@metrics.timed_db
+async def get_synced_hash_db(scope: str) -> Optional[str]:
+    async with AsyncSessionLocal() as db:
+        row = await db.get(CommandSync, scope)
+    return row.tree_hash if row is not None else None
+
+
+@metrics.timed_db
+async def set_synced_hash_db(scope: str, tree_hash: str) -> None:
+    stmt = dialect_insert(CommandSync).values(scope=scope, tree_hash=tree_hash)
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CommandSync.scope],
+                set_={"tree_hash": stmt.excluded.tree_hash, "synced_at": func.now()},
+            )
+        )
+        await db.commit()
+
+
+@metrics.timed_db
+async def get_capture_enabled_db(guild_id: str, channel_id: str) -> Optional[bool]:
+    """
+    The stored channel_config flag; None if the channel has no row.
+    """
+    async with AsyncSessionLocal() as db:
+        row = (
+            await db.execute(
+                select(ChannelConfig.enabled).where(
+                    ChannelConfig.guild_id == str(guild_id),
+                    ChannelConfig.channel_id == str(channel_id),
+                )
             )
         ).first()
-        return True if row is None else bool(row[0])
+    return None if row is None else bool(row[0])
 
 
-def set_capture_enabled(guild_id: str, channel_id: str, enabled: bool) -> None:
-    with SessionLocal() as db:
-        row = db.execute(
-            select(ChannelConfig).where(
-                ChannelConfig.guild_id == str(guild_id),
-                ChannelConfig.channel_id == str(channel_id),
+async def is_capture_enabled(guild_id: str, channel_id: str) -> bool:
+    """
+    If no row exists, default to enabled (preserve current behavior).
+    Served from capture_cache; only misses hit the DB (and only those are timed in
+    DB_SECONDS). While the DB is unreachable the last known (even expired) flag is used,
+    else the default, so capture keeps going.
+    """
+    key = (str(guild_id), str(channel_id))
+    last_known = capture_cache.peek(key, True)
+    enabled = capture_cache.get(key)
+    if enabled is not None:
+        return enabled
+    if writes.down:
+        return last_known
+
+    try:
+        stored = await get_capture_enabled_db(guild_id, channel_id)
+    except Exception as e:
+        if not write_buffer.is_outage(e):
+            raise
+        return last_known
+    enabled = True if stored is None else stored
+    capture_cache.set(key, enabled)
+    return enabled
+
+
+@metrics.timed_db
+async def set_capture_enabled(guild_id: str, channel_id: str, enabled: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        row = (
+            await db.execute(
+                select(ChannelConfig).where(
+                    ChannelConfig.guild_id == str(guild_id),
+                    ChannelConfig.channel_id == str(channel_id),
+                )
             )
         ).scalar_one_or_none()
 
@@ -88,75 +235,175 @@ def set_capture_enabled(guild_id: str, channel_id: str, enabled: bool) -> None:
             db.add(ChannelConfig(guild_id=str(guild_id), channel_id=str(channel_id), enabled=enabled))
         else:
             row.enabled = enabled
-        db.commit()
+        await db.commit()
 
+    capture_cache.set((str(guild_id), str(channel_id)), enabled)
 
-def has_duplicate_db(channel_id: str, url: str) -> bool:
-    n = normalize_url(url)
-    with SessionLocal() as db:
-        row = db.execute(
-            select(WishlistItem.id).where(
-                WishlistItem.channel_id == str(channel_id),
-                WishlistItem.url_norm == n,
+
+@metrics.timed_db
+async def find_duplicates_db(channel_id: str, urls: List[str]) -> Set[str]:
+    """
+    One `url_norm IN (...)` query for a whole message; returns the url_norms already stored.
+    Links the dedupe index rules out never reach the query.
+    """
+    norms = await dedupe.index.possible(channel_id, {normalize_url(u) for u in urls})
+    if not norms:
+        return set()
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(WishlistItem.url_norm).where(
+                    WishlistItem.channel_id == str(channel_id),
+                    WishlistItem.url_norm.in_(norms),
+                )
             )
-        ).first()
-        return row is not None
+        ).all()
+        return {r[0] for r in rows}
+
+
+async def has_duplicate_db(channel_id: str, url: str) -> bool:
+    return bool(await find_duplicates_db(channel_id, [url]))
+
+
+@metrics.timed_db
+async def insert_items_db(items: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+    """
+    Multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING channel_id, url_norm.
+    Each item: guild_id, channel_id, url, title, price, user_tag (+ optional created_at,
+    used by backfill to keep the original post time).
+    Returns the (channel_id, url_norm) pairs actually inserted (rows lost to
+    uq_wishlist_channel_urlnorm are skipped). Safe to replay.
+    channel_stats is updated in the same transaction.
+    """
+    if not items:
+        return set()
+    rows = [
+        {
+            "guild_id": str(it["guild_id"]),
+            "channel_id": str(it["channel_id"]),
+            "url": it["url"],
+            "url_norm": normalize_url(it["url"]),
+            "title": it.get("title") or "Unknown",
+            "price": it.get("price"),
+            "amount_minor": amount_minor,
+            "currency": currency,
+            "user_tag": it.get("user_tag"),
+        }
+        for it in items
+        for amount_minor, currency in [prices.parse_price(it.get("price"))]
+    ]
+    # A multi-row VALUES needs the same columns on every row.
+    if all(it.get("created_at") for it in items):
+        for row, it in zip(rows, items):
+            row["created_at"] = it["created_at"]
+    stmt = (
+        dialect_insert(WishlistItem)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[WishlistItem.channel_id, WishlistItem.url_norm])
+        .returning(
+            WishlistItem.channel_id,
+            WishlistItem.url_norm,
+            WishlistItem.guild_id,
+            WishlistItem.user_tag,
+            WishlistItem.created_at,
+        )
+    )
+    async with AsyncSessionLocal() as db:
+        try:
+            returned = (await db.execute(stmt)).all()
+            await channel_stats.record_inserts(
+                db,
+                [(guild_id, channel_id, user_tag, created_at) for channel_id, _, guild_id, user_tag, created_at in returned],
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    by_channel: Dict[str, Set[str]] = {}
+    for channel_id, norm, *_ in returned:
+        by_channel.setdefault(channel_id, set()).add(norm)
+    for channel_id, norms in by_channel.items():
+        dedupe.index.add(channel_id, norms)
+        render_cache.pages.bump(channel_id)
+    return {(channel_id, norm) for channel_id, norm, *_ in returned}
+
+
+async def save_items_db(items: List[Dict[str, Any]]) -> Set[str]:
+    """
+    insert_items_db() for callers that know all items share a channel: returns url_norms.
+    """
+    return {norm for _, norm in await insert_items_db(items)}
+
 
+# Live captures go through this: batched across messages, journaled while the DB is down.
+writes = write_buffer.WriteBuffer(insert_items_db)
 
-def save_item_db(
+
+async def save_item_db(
     guild_id: str,
     channel_id: str,
     url: str,
     title: str,
     price: Optional[str],
     user_tag: Optional[str],
-) -> None:
-    with SessionLocal() as db:
-        try:
-            db.add(
-                WishlistItem(
-                    guild_id=str(guild_id),
-                    channel_id=str(channel_id),
-                    url=url,
-                    url_norm=normalize_url(url),
-                    title=title or "Unknown",
-                    price=price,
-                    user_tag=user_tag,
-                )
-            )
-            db.commit()
-        except Exception:
-            db.rollback()
-            raise
+) -> bool:
+    """
+    Returns False if the URL was already in this channel's wishlist.
+    """
+    inserted = await save_items_db(
+        [
+            {
+                "guild_id": guild_id,
+                "channel_id": channel_id,
+                "url": url,
+                "title": title,
+                "price": price,
+                "user_tag": user_tag,
+            }
+        ]
+    )
+    return bool(inserted)
+
+
+@metrics.timed_db
+async def enqueue_scrape_jobs_db(guild_id: str, channel_id: str, urls: List[str], user_tag: Optional[str]) -> None:
+    if not urls:
+        return
+    async with AsyncSessionLocal() as db:
+        db.add_all(
+            ScrapeJob(guild_id=str(guild_id), channel_id=str(channel_id), url=url, user_tag=user_tag)
+            for url in urls
+        )
+        await db.commit()
 
 
-def count_items_db(guild_id: str, channel_id: str) -> int:
-    with SessionLocal() as db:
-        n = db.execute(
-            select(func.count()).select_from(WishlistItem).where(
-                WishlistItem.guild_id == str(guild_id),
-                WishlistItem.channel_id == str(channel_id),
-            )
-        ).scalar_one()
-        return int(n)
-
-
-def get_latest_items_db(guild_id: str, channel_id: str, limit: int = 5) -> List[Dict[str, Any]]:
-    with SessionLocal() as db:
-        rows = db.execute(
-            select(
-                WishlistItem.title,
-                WishlistItem.price,
-                WishlistItem.url,
-                WishlistItem.user_tag,
-                WishlistItem.created_at,
-            )
-            .where(
-                WishlistItem.guild_id == str(guild_id),
-                WishlistItem.channel_id == str(channel_id),
+async def count_items_db(guild_id: str, channel_id: str) -> int:
+    """
+    Read from the maintained channel_stats row: O(1) however big the channel is.
+    """
+    return int((await channel_stats.get_stats_db(guild_id, channel_id))["items"])
+
+
+@metrics.timed_db
+async def get_latest_items_db(guild_id: str, channel_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(
+                    WishlistItem.title,
+                    WishlistItem.price,
+                    WishlistItem.url,
+                    WishlistItem.user_tag,
+                    WishlistItem.created_at,
+                )
+                .where(
+                    WishlistItem.guild_id == str(guild_id),
+                    WishlistItem.channel_id == str(channel_id),
+                )
+                .order_by(WishlistItem.created_at.desc())
+                .limit(limit)
             )
-            .order_by(WishlistItem.created_at.desc())
-            .limit(limit)
         ).all()
 
         out: List[Dict[str, Any]] = []
@@ -173,128 +420,427 @@ def get_latest_items_db(guild_id: str, channel_id: str, limit: int = 5) -> List[
         return out
 
 
-def get_page_items_db(
+# Keyset cursor: (sort value, id) of an item at the edge of a page.
+PageKey = Tuple[Any, int]
+
+# /wishlist all orderings: sort expression and whether it runs ascending. Each one has a
+# (guild_id, channel_id, <expression>, ...) index, so every page is an index range scan.
+PAGE_SORTS: Dict[str, Tuple[Any, bool]] = {
+    "newest": (WishlistItem.created_at, False),  # ix_wishlist_guild_channel_created
+    "price": (PRICE_SORT_KEY, True),             # ix_wishlist_guild_channel_price
+}
+
+
+@metrics.timed_db
+async def get_page_items_db(
     guild_id: str,
     channel_id: str,
-    page: int,
     items_per_page: int = 5,
-) -> tuple[List[Dict[str, Any]], int]:
-    total_items = count_items_db(guild_id, channel_id)
-    total_pages = max(1, math.ceil(total_items / items_per_page))
-    page = max(0, min(page, total_pages - 1))
-    offset = page * items_per_page
-
-    with SessionLocal() as db:
-        rows = db.execute(
-            select(
-                WishlistItem.title,
-                WishlistItem.price,
-                WishlistItem.url,
-                WishlistItem.user_tag,
-                WishlistItem.created_at,
-            )
-            .where(
-                WishlistItem.guild_id == str(guild_id),
-                WishlistItem.channel_id == str(channel_id),
-            )
-            .order_by(WishlistItem.created_at.desc())
-            .offset(offset)
-            .limit(items_per_page)
-        ).all()
+    after: Optional[PageKey] = None,
+    before: Optional[PageKey] = None,
+    last: bool = False,
+    sort: str = "newest",
+    limit: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Keyset pagination in PAGE_SORTS[sort] order (ties broken by id).
 
-        items: List[Dict[str, Any]] = []
-        for title, price, url, user_tag, created_at in rows:
-            items.append(
-                {
-                    "title": title,
-                    "price": price,
-                    "url": url,
-                    "user": user_tag,
-                    "timestamp": created_at.isoformat() if created_at else None,
-                }
-            )
+    - no cursor: first page
+    - after: the page after that item (Next)
+    - before: the page before that item (Prev)
+    - last=True: the last page
 
-    return items, total_pages
+    limit overrides the number of rows (default items_per_page); the last page passes
+    the remainder so it lines up with the pages before it.
 
+    Returns (items, has_more), has_more meaning there are further items in the direction
+    of travel. Each item carries its "key" for the next cursor.
+    """
+    sort_col, ascending = PAGE_SORTS[sort]
+    backwards = before is not None or last
+    cols = (sort_col, WishlistItem.id)
+
+    stmt = select(
+        WishlistItem.id,
+        WishlistItem.title,
+        WishlistItem.price,
+        WishlistItem.url,
+        WishlistItem.user_tag,
+        WishlistItem.created_at,
+        sort_col.label("sort_key"),
+    ).where(
+        WishlistItem.guild_id == str(guild_id),
+        WishlistItem.channel_id == str(channel_id),
+    )
+    cursor = after if after is not None else before
+    if cursor is not None:
+        value, item_id = cursor
+        # The redundant <=/>= on the sort value keeps the condition seekable on the index.
+        if (after is not None) == ascending:
+            stmt = stmt.where(sort_col >= value, or_(sort_col > value, WishlistItem.id > item_id))
+        else:
+            stmt = stmt.where(sort_col <= value, or_(sort_col < value, WishlistItem.id < item_id))
+    run_ascending = ascending != backwards
+    limit = limit or items_per_page
+    stmt = stmt.order_by(*(c.asc() if run_ascending else c.desc() for c in cols)).limit(limit + 1)
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(stmt)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows = list(reversed(rows))
+
+    items: List[Dict[str, Any]] = []
+    for item_id, title, price, url, user_tag, created_at, sort_key in rows:
+        items.append(
+            {
+                "title": title,
+                "price": price,
+                "url": url,
+                "user": user_tag,
+                "timestamp": created_at.isoformat() if created_at else None,
+                "key": (sort_key, item_id),
+            }
+        )
+    return items, has_more
 
-def export_channel_db(guild_id: str, channel_id: str) -> List[Dict[str, Any]]:
-    with SessionLocal() as db:
-        rows = db.execute(
-            select(
-                WishlistItem.title,
-                WishlistItem.price,
-                WishlistItem.url,
-                WishlistItem.user_tag,
-                WishlistItem.created_at,
-            )
-            .where(
-                WishlistItem.guild_id == str(guild_id),
-                WishlistItem.channel_id == str(channel_id),
-            )
-            .order_by(WishlistItem.created_at.asc())
-        ).all()
 
-        out: List[Dict[str, Any]] = []
-        for title, price, url, user_tag, created_at in rows:
-            out.append(
-                {
-                    "title": title,
-                    "price": price,
-                    "url": url,
-                    "user": user_tag,
-                    "timestamp": created_at.isoformat() if created_at else None,
-                }
-            )
-        return out
+@metrics.timed_db
+async def price_stats_db(guild_id: str, channel_id: str) -> List[Dict[str, Any]]:
+    """
+    count/sum/min/max of parsed prices per currency, in one aggregate. currency None =
+    prices with no recognizable currency.
+    """
+    stmt = (
+        select(
+            WishlistItem.currency,
+            func.count(WishlistItem.amount_minor),
+            func.sum(WishlistItem.amount_minor),
+            func.min(WishlistItem.amount_minor),
+            func.max(WishlistItem.amount_minor),
+        )
+        .where(
+            WishlistItem.guild_id == str(guild_id),
+            WishlistItem.channel_id == str(channel_id),
+            WishlistItem.amount_minor.is_not(None),
+        )
+        .group_by(WishlistItem.currency)
+        .order_by(func.count(WishlistItem.amount_minor).desc())
+    )
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(stmt)).all()
+    return [
+        {"currency": currency, "count": int(n), "sum": int(total), "min": int(lo), "max": int(hi)}
+        for currency, n, total, lo, hi in rows
+    ]
+
+
+async def export_channel_db(guild_id: str, channel_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the channel oldest-first through a server-side cursor, EXPORT_FETCH_ROWS at a time.
+    """
+    stmt = (
+        select(
+            WishlistItem.title,
+            WishlistItem.price,
+            WishlistItem.url,
+            WishlistItem.user_tag,
+            WishlistItem.created_at,
+        )
+        .where(
+            WishlistItem.guild_id == str(guild_id),
+            WishlistItem.channel_id == str(channel_id),
+        )
+        .order_by(WishlistItem.created_at.asc(), WishlistItem.id.asc())
+        .execution_options(yield_per=EXPORT_FETCH_ROWS)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for title, price, url, user_tag, created_at in result:
+            yield {
+                "title": title,
+                "price": price,
+                "url": url,
+                "user": user_tag,
+                "timestamp": created_at.isoformat() if created_at else None,
+            }
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    Letters/digits only, so user input can never be query syntax for tsquery or FTS5.
+    """
+    return re.findall(r"[^\W_]+", query.lower())[:SEARCH_MAX_TERMS]
 
 
-def clear_channel_db(guild_id: str, channel_id: str) -> int:
-    with SessionLocal() as db:
-        res = db.execute(
+@metrics.timed_db
+async def search_items_db(guild_id: str, channel_id: str, query: str, limit: int = SEARCH_MAX_RESULTS) -> List[Dict[str, Any]]:
+    """
+    Ranked full-text match on title + URL words (see db.models.WISHLIST_SEARCH_DDL).
+    Every term must match as a prefix ("airp" finds AirPods); ties go to the newest item.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    stmt = select(
+        WishlistItem.title,
+        WishlistItem.price,
+        WishlistItem.url,
+        WishlistItem.user_tag,
+        WishlistItem.created_at,
+    ).where(
+        WishlistItem.guild_id == str(guild_id),
+        WishlistItem.channel_id == str(channel_id),
+    )
+    if async_engine.dialect.name == "sqlite":
+        fts = table("wishlist_item_fts", column("rowid"))
+        stmt = (
+            stmt.join(fts, fts.c.rowid == WishlistItem.id)
+            .where(text("wishlist_item_fts MATCH :match").bindparams(match=" ".join(f'"{t}"*' for t in terms)))
+            # bm25 is lower-is-better; title hits weigh 10x URL hits.
+            .order_by(text("bm25(wishlist_item_fts, 10.0, 1.0)"), WishlistItem.created_at.desc())
+        )
+    else:
+        tsv = literal_column("wishlist_item.search_tsv")
+        # Literal regconfig: a bound 'simple' would arrive as varchar and not resolve.
+        tsq = func.to_tsquery(literal_column("'simple'::regconfig"), " & ".join(f"{t}:*" for t in terms))
+        stmt = stmt.where(tsv.op("@@")(tsq)).order_by(func.ts_rank(tsv, tsq).desc(), WishlistItem.created_at.desc())
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(stmt.limit(limit))).all()
+    return [
+        {
+            "title": title,
+            "price": price,
+            "url": url,
+            "user": user_tag,
+            "timestamp": created_at.isoformat() if created_at else None,
+        }
+        for title, price, url, user_tag, created_at in rows
+    ]
+
+
+@metrics.timed_db
+async def clear_channel_db(guild_id: str, channel_id: str) -> int:
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
             delete(WishlistItem).where(
                 WishlistItem.guild_id == str(guild_id),
                 WishlistItem.channel_id == str(channel_id),
             )
         )
-        db.commit()
-        return int(res.rowcount or 0)
+        await channel_stats.record_clear(db, str(guild_id), str(channel_id))
+        await db.commit()
+    dedupe.index.reset(channel_id)
+    render_cache.pages.bump(channel_id)
+    return int(res.rowcount or 0)
 
 
-def render_items(items: List[Dict[str, Any]], page: int, total_pages: int) -> str:
+def render_items(items: List[Dict[str, Any]], page: int, total_pages: int, header: Optional[str] = None) -> str:
     if not items:
         return "**🛒 This channel wishlist is empty.**"
-    msg = f"**🛒 Wishlist Page {page + 1} of {total_pages} (This Channel)**\n\n"
+    if header is None:
+        header = f"🛒 Wishlist Page {page + 1} of {total_pages} (This Channel)"
+    msg = f"**{header}**\n\n"
     for it in items:
         title = it.get("title") or "Unknown"
+        if len(title) > MAX_TITLE_CHARS:
+            title = title[:MAX_TITLE_CHARS - 1] + "…"
         price = it.get("price") or "N/A"
         url = it.get("url") or ""
         msg += f"• **{title}** – {price}\n<{url}>\n\n"
+    if len(msg) > MAX_MESSAGE_CHARS:
+        # Very long URLs on a big page; better a clipped page than a rejected edit.
+        msg = msg[:MAX_MESSAGE_CHARS - 1] + "…"
     return msg
 
 
+def render_latest(items: List[Dict[str, Any]]) -> str:
+    if not items:
+        return "📝 This channel wishlist is currently empty."
+    # Show oldest->newest within the last 5
+    msg = "**🛒 Latest Wishlist Items (This Channel):**\n\n"
+    for it in reversed(items):
+        title = it.get("title") or "Unknown"
+        price = it.get("price") or "N/A"
+        url = it.get("url") or ""
+        msg += f"• **{title}** – {price}\n<{url}>\n\n"
+    return msg
+
+
+async def latest_cached(guild_id: str, channel_id: str) -> str:
+    version = render_cache.pages.version(channel_id)
+    msg = render_cache.pages.get(channel_id, version, "latest")
+    if msg is None:
+        msg = render_latest(await get_latest_items_db(guild_id, channel_id, limit=5))
+        render_cache.pages.set(channel_id, version, "latest", msg)
+    return msg
+
+
+async def count_cached(guild_id: str, channel_id: str, version: Any) -> int:
+    total_items = render_cache.pages.get(channel_id, version, "count")
+    if total_items is None:
+        total_items = await count_items_db(guild_id, channel_id)
+        render_cache.pages.set(channel_id, version, "count", total_items)
+    return total_items
+
+
+async def total_pages_cached(guild_id: str, channel_id: str, version: Any, items_per_page: int) -> int:
+    total_items = await count_cached(guild_id, channel_id, version)
+    return max(1, math.ceil(total_items / items_per_page))
+
+
+async def page_cached(
+    guild_id: str,
+    channel_id: str,
+    version: Any,
+    items_per_page: int,
+    page: int,
+    total_pages: int,
+    after: Optional[PageKey] = None,
+    before: Optional[PageKey] = None,
+    last: bool = False,
+    sort: str = "newest",
+) -> Tuple[List[Dict[str, Any]], bool, str]:
+    """
+    get_page_items_db() + render_items() through render_cache: (items, has_more, content).
+    `version` must be read before total_pages was computed, so both match the same data.
+    """
+    key = ("page", sort, items_per_page, page, after, before, last)
+    hit = render_cache.pages.get(channel_id, version, key)
+    if hit is not None:
+        return hit
+    limit = None
+    if last:
+        # Offset pages are full from the front, so the last one holds the remainder.
+        total_items = await count_cached(guild_id, channel_id, version)
+        limit = total_items - (max(1, math.ceil(total_items / items_per_page)) - 1) * items_per_page
+    items, has_more = await get_page_items_db(
+        guild_id, channel_id, items_per_page, after=after, before=before, last=last, sort=sort,
+        limit=limit or None,
+    )
+    header = None
+    if sort == "price":
+        header = f"🛒 Wishlist by Price, Page {page + 1} of {total_pages} (This Channel)"
+    entry = (items, has_more, render_items(items, page, total_pages, header=header))
+    render_cache.pages.set(channel_id, version, key, entry)
+    return entry
+
+
+def render_stats(totals: Dict[str, Any], by_currency: List[Dict[str, Any]]) -> str:
+    msg = "**📊 Wishlist Stats (This Channel)**\n\n"
+    msg += f"Items: **{totals['items']}** · posters: **{totals['posters']}**"
+    last_added_at = totals["last_added_at"]
+    if last_added_at is not None:
+        if last_added_at.tzinfo is None:  # SQLite drops tzinfo
+            last_added_at = last_added_at.replace(tzinfo=timezone.utc)
+        msg += f" · last added <t:{int(last_added_at.timestamp())}:R>"
+    msg += "\n\n"
+    for row in by_currency:
+        cur = row["currency"]
+        fmt = lambda v: prices.format_minor(v, cur)  # noqa: E731
+        msg += (
+            f"• **{cur or 'No currency'}** ({row['count']} items): total {fmt(row['sum'])}"
+            f" · min {fmt(row['min'])} · max {fmt(row['max'])}\n"
+        )
+    unpriced = totals["items"] - sum(row["count"] for row in by_currency)
+    if unpriced > 0:
+        msg += f"• No price: {unpriced} items\n"
+    return msg
+
+
+def build_item_embed(url: str, info: Dict[str, Any], author: Any) -> discord.Embed:
+    embed = discord.Embed(
+        title=(info.get("title") or "Item")[:256],
+        description=f"Posted by {author}",
+        color=0x00FF00,
+    )
+    embed.add_field(name="Price", value=(info.get("price") or "N/A")[:1024], inline=True)
+    embed.add_field(name="Link", value=f"[View Product]({url})", inline=False)
+    return embed
+
+
+def chunk_lines(header: str, lines: List[str], limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+    """
+    Split header + lines into messages that fit Discord's content limit.
+    """
+    out: List[str] = []
+    current = header
+    for line in lines:
+        if len(current) + 1 + len(line) > limit:
+            out.append(current)
+            current = header
+        current += "\n" + line
+    if lines:
+        out.append(current)
+    return out
+
+
+def upload_batches(parts: List[Tuple[str, Any]], max_bytes: int = EXPORT_MAX_BYTES) -> List[List[Tuple[str, Any]]]:
+    """
+    Group export parts into followups: Discord's upload limit is per request, so a
+    message carries at most MAX_FILES_PER_MESSAGE files and max_bytes in total.
+    """
+    batches: List[List[Tuple[str, Any]]] = []
+    batch: List[Tuple[str, Any]] = []
+    batch_bytes = 0
+    for name, fp in parts:
+        fp.seek(0, os.SEEK_END)
+        size = fp.tell()
+        fp.seek(0)
+        if batch and (len(batch) >= MAX_FILES_PER_MESSAGE or batch_bytes + size > max_bytes):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append((name, fp))
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 class WishlistPager(discord.ui.View):
     """
     Button-based pagination for /wishlist all.
     Uses interaction edits, with a simple interaction check so only the requester can paginate.
     (Pattern: interaction_check + edit_message) :contentReference[oaicite:2]{index=2}
+
+    Pages are keyset cursors (sort value, id) rather than offsets, so deep pages cost the
+    same as the first one and items don't shift while someone is browsing. Pages and the
+    page count come from render_cache until the channel changes.
     """
     def __init__(
         self,
         requester_id: int,
         guild_id: str,
         channel_id: str,
-        page: int,
+        items: List[Dict[str, Any]],
+        has_next: bool,
         total_pages: int,
+        version: Any,
+        content: str,
         items_per_page: int = 5,
+        sort: str = "newest",
         timeout: float = 180.0,
     ):
         super().__init__(timeout=timeout)
         self.requester_id = requester_id
         self.guild_id = guild_id
         self.channel_id = channel_id
-        self.page = page
-        self.total_pages = total_pages
         self.items_per_page = items_per_page
+        self.sort = sort
+        self.page = 0
+        self.total_pages = total_pages
+        self.version = version
+        self._set_page(items, has_prev=False, has_next=has_next, content=content)
+
+    def _set_page(self, items: List[Dict[str, Any]], has_prev: bool, has_next: bool, content: str) -> None:
+        self.items = items
+        self.content = content
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.page = max(0, min(self.page, self.total_pages - 1))
         self._refresh_buttons()
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
@@ -306,26 +852,76 @@ class WishlistPager(discord.ui.View):
     def _refresh_buttons(self) -> None:
         for child in self.children:
             if isinstance(child, discord.ui.Button):
-                if child.custom_id == "prev":
-                    child.disabled = self.page <= 0
-                elif child.custom_id == "next":
-                    child.disabled = self.page >= (self.total_pages - 1)
+                if child.custom_id in ("first", "prev"):
+                    child.disabled = not self.has_prev
+                elif child.custom_id in ("next", "last"):
+                    child.disabled = not self.has_next
+
+    async def _sync_version(self) -> None:
+        # The channel changed since this page was loaded: the page count may have too.
+        version = render_cache.pages.version(self.channel_id)
+        if version != self.version:
+            self.version = version
+            self.total_pages = await total_pages_cached(
+                self.guild_id, self.channel_id, version, self.items_per_page
+            )
+
+    async def _page(self, page: int, **cursor: Any) -> Tuple[List[Dict[str, Any]], bool, str]:
+        return await page_cached(
+            self.guild_id,
+            self.channel_id,
+            self.version,
+            self.items_per_page,
+            page,
+            self.total_pages,
+            sort=self.sort,
+            **cursor,
+        )
+
+    async def _show(self, interaction: discord.Interaction) -> None:
+        await interaction.response.edit_message(content=self.content, view=self)
+
+    @discord.ui.button(label="« First", style=discord.ButtonStyle.secondary, custom_id="first")
+    async def first(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._sync_version()
+        self.page = 0
+        items, has_next, content = await self._page(0)
+        self._set_page(items, has_prev=False, has_next=has_next, content=content)
+        await self._show(interaction)
 
     @discord.ui.button(label="Prev", style=discord.ButtonStyle.secondary, custom_id="prev")
     async def prev(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.page = max(0, self.page - 1)
-        items, total_pages = get_page_items_db(self.guild_id, self.channel_id, self.page, self.items_per_page)
-        self.total_pages = total_pages
-        self._refresh_buttons()
-        await interaction.response.edit_message(content=render_items(items, self.page, self.total_pages), view=self)
+        await self._sync_version()
+        page = max(0, min(self.page - 1, self.total_pages - 1))
+        if page == 0:
+            # Back at the start: load the real first page, in case inserts since the
+            # last click shifted the cursor pages out of line.
+            items, _, content = await self._page(0)
+            has_prev = False
+        else:
+            items, has_prev, content = await self._page(page, before=self.items[0]["key"])
+        if items:
+            self.page = page
+            self._set_page(items, has_prev=has_prev, has_next=True, content=content)
+        await self._show(interaction)
 
     @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, custom_id="next")
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.page = min(self.total_pages - 1, self.page + 1)
-        items, total_pages = get_page_items_db(self.guild_id, self.channel_id, self.page, self.items_per_page)
-        self.total_pages = total_pages
-        self._refresh_buttons()
-        await interaction.response.edit_message(content=render_items(items, self.page, self.total_pages), view=self)
+        await self._sync_version()
+        page = min(self.page + 1, self.total_pages - 1)
+        items, has_next, content = await self._page(page, after=self.items[-1]["key"])
+        if items:
+            self.page = page
+            self._set_page(items, has_prev=True, has_next=has_next, content=content)
+        await self._show(interaction)
+
+    @discord.ui.button(label="Last »", style=discord.ButtonStyle.secondary, custom_id="last")
+    async def last(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._sync_version()
+        self.page = self.total_pages - 1
+        items, has_prev, content = await self._page(self.page, last=True)
+        self._set_page(items, has_prev=has_prev, has_next=False, content=content)
+        await self._show(interaction)
 
     async def on_timeout(self) -> None:
         # disable buttons on timeout
@@ -336,6 +932,88 @@ class WishlistPager(discord.ui.View):
         # but we don't store the message object to keep it minimal.
 
 
+class SearchPager(discord.ui.View):
+    """
+    Prev/Next over /wishlist search results. The ranked matches are fetched once
+    (search_items_db), so paging never goes back to the DB.
+    """
+    def __init__(
+        self,
+        requester_id: int,
+        query: str,
+        items: List[Dict[str, Any]],
+        items_per_page: int = 5,
+        timeout: float = 180.0,
+    ):
+        super().__init__(timeout=timeout)
+        self.requester_id = requester_id
+        self.query = query
+        self.items = items
+        self.items_per_page = items_per_page
+        self.page = 0
+        self.total_pages = max(1, math.ceil(len(items) / items_per_page))
+        self._refresh_buttons()
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.requester_id:
+            await interaction.response.send_message("You can’t control someone else’s search results.", ephemeral=True)
+            return False
+        return True
+
+    def _refresh_buttons(self) -> None:
+        for child in self.children:
+            if isinstance(child, discord.ui.Button):
+                if child.custom_id == "search_prev":
+                    child.disabled = self.page == 0
+                elif child.custom_id == "search_next":
+                    child.disabled = self.page >= self.total_pages - 1
+
+    def render(self) -> str:
+        start = self.page * self.items_per_page
+        shown = discord.utils.escape_markdown(self.query[:50])
+        count = f"top {len(self.items)}" if len(self.items) >= SEARCH_MAX_RESULTS else str(len(self.items))
+        header = f"🔍 “{shown}”: {count} matches · Page {self.page + 1} of {self.total_pages}"
+        return render_items(self.items[start:start + self.items_per_page], self.page, self.total_pages, header=header)
+
+    async def _show(self, interaction: discord.Interaction) -> None:
+        self._refresh_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="Prev", style=discord.ButtonStyle.secondary, custom_id="search_prev")
+    async def prev(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary, custom_id="search_next")
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.total_pages - 1, self.page + 1)
+        await self._show(interaction)
+
+    async def on_timeout(self) -> None:
+        for child in self.children:
+            if isinstance(child, discord.ui.Button):
+                child.disabled = True
+
+
+# channel_id -> running backfill task (at most one per channel).
+backfills: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+def start_backfill(channel: Any, guild_id: str, started_by: Optional[str], restart: bool = False) -> None:
+    job = Backfill(
+        channel,
+        guild_id,
+        find_duplicates=find_duplicates_db,
+        insert=insert_items_db,
+        url_regex=URL_REGEX,
+        started_by=started_by,
+    )
+    channel_id = str(channel.id)
+    task = asyncio.create_task(job.run(restart=restart))
+    backfills[channel_id] = task
+    task.add_done_callback(lambda _t: backfills.pop(channel_id, None))
+
+
 class WishlistGroup(discord.app_commands.Group):
     """
     /wishlist ... command group (subcommands). :contentReference[oaicite:3]{index=3}
@@ -349,27 +1027,32 @@ class WishlistGroup(discord.app_commands.Group):
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
 
-        items = get_latest_items_db(guild_id, channel_id, limit=5)
-        if not items:
-            await interaction.response.send_message("📝 This channel wishlist is currently empty.")
-            return
-
-        # Show oldest->newest within the last 5
-        msg = "**🛒 Latest Wishlist Items (This Channel):**\n\n"
-        for it in reversed(items):
-            title = it.get("title") or "Unknown"
-            price = it.get("price") or "N/A"
-            url = it.get("url") or ""
-            msg += f"• **{title}** – {price}\n<{url}>\n\n"
-        await interaction.response.send_message(msg)
+        await interaction.response.send_message(await latest_cached(guild_id, channel_id))
 
     @discord.app_commands.command(name="all", description="Browse all wishlist items for this channel")
+    @discord.app_commands.describe(
+        page_size="Items per page (default 5)",
+        sort="newest first (default) or cheapest first",
+    )
+    @discord.app_commands.choices(
+        sort=[discord.app_commands.Choice(name=s, value=s) for s in PAGE_SORTS]
+    )
     @discord.app_commands.guild_only()
-    async def all(self, interaction: discord.Interaction):
+    async def all(
+        self,
+        interaction: discord.Interaction,
+        page_size: discord.app_commands.Range[int, 1, MAX_PAGE_SIZE] = 5,
+        sort: Optional[discord.app_commands.Choice[str]] = None,
+    ):
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
+        order = sort.value if sort else "newest"
 
-        items, total_pages = get_page_items_db(guild_id, channel_id, page=0, items_per_page=5)
+        version = render_cache.pages.version(channel_id)
+        total_pages = await total_pages_cached(guild_id, channel_id, version, page_size)
+        items, has_next, content = await page_cached(
+            guild_id, channel_id, version, page_size, 0, total_pages, sort=order
+        )
         if not items:
             await interaction.response.send_message("📝 This channel wishlist is currently empty.")
             return
@@ -378,31 +1061,92 @@ class WishlistGroup(discord.app_commands.Group):
             requester_id=interaction.user.id,
             guild_id=guild_id,
             channel_id=channel_id,
-            page=0,
+            items=items,
+            has_next=has_next,
             total_pages=total_pages,
-            items_per_page=5,
+            version=version,
+            content=content,
+            items_per_page=page_size,
+            sort=order,
         )
-        await interaction.response.send_message(content=render_items(items, 0, total_pages), view=view)
+        await interaction.response.send_message(content=content, view=view)
 
-    @discord.app_commands.command(name="export", description="Export this channel wishlist as a JSON file")
+    @discord.app_commands.command(name="search", description="Search this channel wishlist by title or link")
+    @discord.app_commands.describe(
+        query="Words to look for; each one matches as a prefix (\"airp\" finds AirPods)",
+        page_size="Results per page (default 5)",
+    )
     @discord.app_commands.guild_only()
-    async def export(self, interaction: discord.Interaction):
+    async def search(
+        self,
+        interaction: discord.Interaction,
+        query: discord.app_commands.Range[str, 1, 100],
+        page_size: discord.app_commands.Range[int, 1, MAX_PAGE_SIZE] = 5,
+    ):
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
 
-        data = export_channel_db(guild_id, channel_id)
-        if not data:
+        items = await search_items_db(guild_id, channel_id, query)
+        if not items:
+            await interaction.response.send_message("🔍 No wishlist items in this channel match that search.", ephemeral=True)
+            return
+
+        view = SearchPager(requester_id=interaction.user.id, query=query, items=items, items_per_page=page_size)
+        await interaction.response.send_message(content=view.render(), view=view)
+
+    @discord.app_commands.command(name="stats", description="Item count and price totals for this channel")
+    @discord.app_commands.guild_only()
+    async def stats(self, interaction: discord.Interaction):
+        guild_id = str(interaction.guild_id)
+        channel_id = str(interaction.channel_id)
+
+        totals = await channel_stats.get_stats_db(guild_id, channel_id)
+        if not totals["items"]:
             await interaction.response.send_message("📝 This channel wishlist is currently empty.")
             return
+        by_currency = await price_stats_db(guild_id, channel_id)
+        await interaction.response.send_message(render_stats(totals, by_currency))
+
+    @discord.app_commands.command(name="export", description="Export this channel wishlist as a file")
+    @discord.app_commands.describe(format="File format (default: json)", compress="gzip the output")
+    @discord.app_commands.choices(
+        format=[discord.app_commands.Choice(name=f, value=f) for f in EXPORT_FORMATS]
+    )
+    @discord.app_commands.guild_only()
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        format: Optional[discord.app_commands.Choice[str]] = None,
+        compress: bool = False,
+    ):
+        guild_id = str(interaction.guild_id)
+        channel_id = str(interaction.channel_id)
 
-        payload = json.dumps(data, indent=2).encode("utf-8")
-        buf = io.BytesIO(payload)
-        filename = f"wishlist-{channel_id}.json"
+        # Big channels take a while to stream; acknowledge within Discord's 3s window first.
+        await interaction.response.defer(thinking=True)
 
-        await interaction.response.send_message(
-            content="📦 Export for this channel:",
-            file=discord.File(fp=buf, filename=filename),
+        parts = await write_export(
+            export_channel_db(guild_id, channel_id),
+            basename=f"wishlist-{channel_id}",
+            fmt=format.value if format else "json",
+            compress=compress,
         )
+        if not parts:
+            await interaction.followup.send("📝 This channel wishlist is currently empty.")
+            return
+
+        try:
+            for i, batch in enumerate(upload_batches(parts)):
+                content = None
+                if i == 0:
+                    content = "📦 Export for this channel:" if len(parts) == 1 else f"📦 Export for this channel ({len(parts)} files):"
+                await interaction.followup.send(
+                    content=content,
+                    files=[discord.File(fp=fp, filename=name) for name, fp in batch],
+                )
+        finally:
+            for _, fp in parts:
+                fp.close()
 
     @discord.app_commands.command(name="clear", description="Admin-only: clear this channel wishlist")
     @discord.app_commands.guild_only()
@@ -416,9 +1160,25 @@ class WishlistGroup(discord.app_commands.Group):
 
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
-        deleted = clear_channel_db(guild_id, channel_id)
+        deleted = await clear_channel_db(guild_id, channel_id)
         await interaction.response.send_message(f"🧹 Cleared this channel’s wishlist. ({deleted} items removed)")
 
+    @discord.app_commands.command(name="backfill", description="Admin-only: import links posted earlier in this channel")
+    @discord.app_commands.describe(restart="Ignore the saved checkpoint and start again from the newest message")
+    @discord.app_commands.guild_only()
+    async def backfill(self, interaction: discord.Interaction, restart: bool = False):
+        if not isinstance(interaction.user, discord.Member) or not is_admin_member(interaction.user):
+            await interaction.response.send_message("⛔ Admin-only command.", ephemeral=True)
+            return
+        channel_id = str(interaction.channel_id)
+        if channel_id in backfills:
+            await interaction.response.send_message("⏳ A backfill is already running in this channel.", ephemeral=True)
+            return
+        await interaction.response.send_message(
+            "📥 Backfill started; progress is posted in this channel.", ephemeral=True
+        )
+        start_backfill(interaction.channel, str(interaction.guild_id), str(interaction.user), restart=restart)
+
     @discord.app_commands.command(name="enable", description="Admin-only: enable wishlist capture in this channel")
     @discord.app_commands.guild_only()
     async def enable(self, interaction: discord.Interaction):
@@ -427,7 +1187,7 @@ class WishlistGroup(discord.app_commands.Group):
             return
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
-        set_capture_enabled(guild_id, channel_id, True)
+        await set_capture_enabled(guild_id, channel_id, True)
         await interaction.response.send_message("✅ Wishlist capture enabled for this channel.", ephemeral=True)
 
     @discord.app_commands.command(name="disable", description="Admin-only: disable wishlist capture in this channel")
@@ -438,32 +1198,214 @@ class WishlistGroup(discord.app_commands.Group):
             return
         guild_id = str(interaction.guild_id)
         channel_id = str(interaction.channel_id)
-        set_capture_enabled(guild_id, channel_id, False)
+        await set_capture_enabled(guild_id, channel_id, False)
         await interaction.response.send_message("🛑 Wishlist capture disabled for this channel.", ephemeral=True)
 
 
-class WishlistBot(discord.Client):
+def _collect_cache_metrics() -> None:
+    metrics.export_cache_stats("channel_config", capture_cache.stats())
+    metrics.export_cache_stats("scrape", scrape_cache.stats())
+    metrics.export_cache_stats("dedupe_index", dedupe.index.stats())
+    metrics.export_cache_stats("render", render_cache.pages.stats())
+    metrics.export_cache_stats("short_links", resolver_stats())
+
+
+metrics.register_collector(_collect_cache_metrics)
+
+
+def client_kwargs() -> Dict[str, Any]:
+    if not LEAN:
+        return {}
+    return {
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        "max_messages": None,  # no message cache; on_message gets the message itself
+    }
+
+
+def shard_kwargs() -> Dict[str, Any]:
+    if not SHARD_COUNT:
+        return {}
+    kwargs: Dict[str, Any] = {}
+    if SHARD_COUNT != "auto":
+        kwargs["shard_count"] = int(SHARD_COUNT)
+    if SHARD_IDS:
+        if "shard_count" not in kwargs:
+            raise RuntimeError("SHARD_IDS needs a numeric SHARD_COUNT")
+        kwargs["shard_ids"] = SHARD_IDS
+    return kwargs
+
+
+class WishlistBot(discord.AutoShardedClient if SHARD_COUNT else discord.Client):
     def __init__(self):
-        super().__init__(intents=intents)
+        # http_trace times every Discord REST call (sends, interaction responses, edits).
+        super().__init__(
+            intents=intents,
+            http_trace=metrics.discord_trace_config(),
+            **client_kwargs(),
+            **shard_kwargs(),
+        )
         self.tree = discord.app_commands.CommandTree(self)
+        self.metrics = metrics.MetricsService()
+        self.refresher = refresher.PriceRefresher()
+        self.stats_reconciler = channel_stats.StatsReconciler()
+        self.warm_up_task: Optional["asyncio.Task[None]"] = None
+        self.startup_reported = False
+
+    def shard_states(self) -> Dict[int, Tuple[float, bool]]:
+        """
+        shard_id -> (heartbeat latency, connection open) for the shards in this process.
+        """
+        if isinstance(self, discord.AutoShardedClient):
+            return {sid: (info.latency, not info.is_closed()) for sid, info in self.shards.items()}
+        return {self.shard_id or 0: (self.latency, self.is_ready() and not self.is_closed())}
+
+    def _collect_shard_metrics(self) -> None:
+        for shard_id, (latency, up) in self.shard_states().items():
+            metrics.SHARD_UP.set(1 if up else 0, shard=shard_id)
+            if math.isfinite(latency):  # inf until the first heartbeat ack
+                metrics.SHARD_LATENCY.set(latency, shard=shard_id)
+
+    def health(self) -> Tuple[bool, Dict[str, Any]]:
+        states = self.shard_states()
+        down = sorted(sid for sid, (_, up) in states.items() if not up)
+        latency = {
+            str(sid): round(lat, 3) if math.isfinite(lat) else None for sid, (lat, _) in states.items()
+        }
+        # Still connecting counts as healthy; a shard that drops later doesn't.
+        ok = not self.is_ready() or not down
+        return ok, {"ready": self.is_ready(), "shards_down": down, "latency": latency}
 
     async def setup_hook(self) -> None:
+        metrics.register_collector(self._collect_shard_metrics)
+        metrics.register_health(self.health)
+        await self.metrics.start()
+        await writes.start()
+
+        if PRIMARY:
+            await self.refresher.start()
+            await self.stats_reconciler.start()
+
         # Add /wishlist group + subcommands. :contentReference[oaicite:4]{index=4}
         self.tree.add_command(WishlistGroup())
 
-        if SYNC_COMMANDS:
-            # Sync commands either globally (slow propagation) or to a single guild (fast). :contentReference[oaicite:5]{index=5}
-            if SYNC_GUILD_ID:
-                guild = discord.Object(id=int(SYNC_GUILD_ID))
-                self.tree.copy_global_to(guild=guild)
-                await self.tree.sync(guild=guild)
-                print(f"✅ Synced commands to guild {SYNC_GUILD_ID}")
-            else:
-                await self.tree.sync()
-                print("✅ Synced commands globally")
+        if LEAN:
+            # Log in right away; capture lookups fall back to the DB until the cache is warm.
+            self.warm_up_task = asyncio.create_task(self.warm_up())
+        else:
+            try:
+                await self._warm_up_once()
+            except Exception as e:
+                if not write_buffer.is_outage(e):
+                    raise
+                # Log in anyway: captures are journaled until the DB is back.
+                print(f"⚠️ Database unreachable at startup, warming up in the background: {e}")
+                self.warm_up_task = asyncio.create_task(self.warm_up())
+        metrics.STARTUP_SECONDS.set(time.perf_counter() - STARTED_AT, phase="setup")
+
+    async def _warm_up_once(self) -> None:
+        await warm_pool_db(DB_POOL_SIZE)
+        loaded = await preload_capture_config()
+        print(f"✅ Preloaded {loaded} channel configs")
+        if SYNC_COMMANDS and PRIMARY:
+            await self.sync_commands()
+        metrics.STARTUP_SECONDS.set(time.perf_counter() - STARTED_AT, phase="warm_up")
+
+    async def warm_up(self) -> None:
+        """
+        Background warm-up: retried with backoff while the database is unreachable.
+        """
+        backoff = 1.0
+        while True:
+            try:
+                await self._warm_up_once()
+                return
+            except Exception as e:
+                if not write_buffer.is_outage(e):
+                    print(f"⚠️ Background warm-up failed: {e}")
+                    return
+                print(f"⚠️ Warm-up: database unreachable, retrying in {backoff:.0f}s: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WARM_UP_BACKOFF_MAX)
+
+    async def sync_commands(self) -> None:
+        """
+        Sync either globally (slow propagation) or to a single guild (fast), and only when
+        the tree differs from the last one synced to that scope. :contentReference[oaicite:5]{index=5}
+        """
+        guild = None
+        if SYNC_GUILD_ID:
+            guild = discord.Object(id=int(SYNC_GUILD_ID))
+            self.tree.copy_global_to(guild=guild)
+        scope = SYNC_GUILD_ID or "global"
+        tree_hash = command_tree_hash(self.tree, guild)
+        if await get_synced_hash_db(scope) == tree_hash:
+            print(f"✅ Commands unchanged for {scope}; sync skipped")
+            return
+        await self.tree.sync(guild=guild)
+        await set_synced_hash_db(scope, tree_hash)
+        print(f"✅ Synced commands to guild {SYNC_GUILD_ID}" if guild else "✅ Synced commands globally")
+
+    async def close(self) -> None:
+        if self.warm_up_task is not None:
+            self.warm_up_task.cancel()
+        # Interrupted backfills keep status "running" and resume on the next start.
+        for task in list(backfills.values()):
+            task.cancel()
+        await self.refresher.stop()
+        await self.stats_reconciler.stop()
+        await writes.stop()
+        await self.metrics.stop()
+        await scraper.close()
+        await async_engine.dispose()
+        await super().close()
 
     async def on_ready(self):
-        print(f"✅ Bot is live as {self.user}")
+        shards = f" (shards {', '.join(map(str, sorted(self.shard_states())))})" if SHARD_COUNT else ""
+        print(f"✅ Bot is live as {self.user}{shards}")
+        if not self.startup_reported:
+            self.report_startup()
+        await self.resume_backfills()
+
+    def report_startup(self) -> None:
+        """
+        Once per process: how long imports and login took and the RSS at that point, in the
+        log and as gauges, so startup regressions show up in both.
+        """
+        self.startup_reported = True
+        imports = IMPORTED_AT - STARTED_AT
+        ready = time.perf_counter() - STARTED_AT
+        rss = metrics.rss_bytes()
+        metrics.STARTUP_SECONDS.set(imports, phase="imports")
+        metrics.STARTUP_SECONDS.set(ready, phase="ready")
+        print(
+            f"⏱️ Startup ({RUNTIME_PROFILE}): imports {imports:.2f}s, ready {ready:.2f}s, "
+            f"RSS {rss / 2**20:.1f} MiB"
+        )
+
+    # Only AutoShardedClient dispatches the on_shard_* events.
+    async def on_shard_connect(self, shard_id: int) -> None:
+        metrics.SHARD_EVENTS.inc(shard=shard_id, event="connect")
+
+    async def on_shard_disconnect(self, shard_id: int) -> None:
+        metrics.SHARD_EVENTS.inc(shard=shard_id, event="disconnect")
+        print(f"⚠️ Shard {shard_id} disconnected")
+
+    async def on_shard_resumed(self, shard_id: int) -> None:
+        metrics.SHARD_EVENTS.inc(shard=shard_id, event="resume")
+
+    async def resume_backfills(self) -> None:
+        try:
+            checkpoints = await running_checkpoints_db()
+        except Exception as e:
+            print(f"⚠️ Could not load backfill checkpoints: {e}")
+            return
+        for cp in checkpoints:
+            channel = self.get_channel(int(cp.channel_id))
+            if channel is None or cp.channel_id in backfills:
+                continue
+            print(f"📥 Resuming backfill of channel {cp.channel_id}")
+            start_backfill(channel, cp.guild_id, cp.started_by)
 
     async def on_message(self, message: discord.Message):
         # Ignore bot messages
@@ -474,48 +1416,89 @@ class WishlistBot(discord.Client):
         if message.guild is None:
             return
 
+        metrics.SHARD_MESSAGES.inc(shard=message.guild.shard_id)
+
         guild_id = str(message.guild.id)
         channel_id = str(message.channel.id)
 
-        # Capture gating (default enabled)
-        if not is_capture_enabled(guild_id, channel_id):
-            return
-
+        # Cheap regex first: most messages have no URL and never need the config lookup.
         urls = re.findall(URL_REGEX, message.content)
         if not urls:
             return
 
+        # Capture gating (default enabled)
+        if not await is_capture_enabled(guild_id, channel_id):
+            return
+
+        # amzn.to/bit.ly/... -> the product URL, so short and long forms dedupe together.
+        urls = await asyncio.gather(*(resolve_short_link(u) for u in urls))
+
+        # Same link pasted twice in one message counts once.
+        seen: Set[str] = set()
+        unique_urls = []
         for url in urls:
-            # DB duplicate check before scraping
-            if has_duplicate_db(channel_id, url):
-                await message.channel.send(f"🔁 Already in this channel wishlist:\n<{url}>")
-                continue
+            n = normalize_url(url)
+            if n not in seen:
+                seen.add(n)
+                unique_urls.append(url)
+
+        # One duplicate query, concurrent scrapes, one multi-row insert.
+        if writes.down:
+            # DB unreachable: don't wait on it; replay drops duplicates via the constraint.
+            existing = set()
+        else:
+            existing = await find_duplicates_db(channel_id, unique_urls)
+        new_urls = [u for u in unique_urls if normalize_url(u) not in existing]
+        metrics.DEDUPE_HITS.inc(len(existing))
+
+        if SCRAPE_QUEUE and not writes.down:
+            # Durable hand-off: worker.py does the scrape/insert/reply. (While the DB is
+            # down the inline path below journals instead.)
+            await enqueue_scrape_jobs_db(guild_id, channel_id, new_urls, str(message.author))
+            dupes = [u for u in unique_urls if normalize_url(u) in existing]
+            for chunk in chunk_lines("🔁 Already in this channel wishlist:", [f"<{u}>" for u in dupes]):
+                await message.channel.send(chunk)
+            return
 
-            info = scrape(url)
+        infos = await asyncio.gather(*(scrape_cache.cached_scrape(u) for u in new_urls))
 
-            try:
-                save_item_db(
-                    guild_id=guild_id,
-                    channel_id=channel_id,
-                    url=url,
-                    title=info.get("title", "Unknown"),
-                    price=info.get("price"),
-                    user_tag=str(message.author),
-                )
-            except IntegrityError:
-                # Race condition between check and insert
-                await message.channel.send(f"🔁 Already in this channel wishlist:\n<{url}>")
-                continue
+        inserted = await writes.submit(
+            [
+                {
+                    "guild_id": guild_id,
+                    "channel_id": channel_id,
+                    "url": url,
+                    "title": info.get("title", "Unknown"),
+                    "price": info.get("price"),
+                    "user_tag": str(message.author),
+                }
+                for url, info in zip(new_urls, infos)
+            ]
+        )
 
-            embed = discord.Embed(
-                title=info.get("title", "Item"),
-                description=f"Posted by {message.author}",
-                color=0x00FF00,
-            )
-            embed.add_field(name="Price", value=info.get("price", "N/A"), inline=True)
-            embed.add_field(name="Link", value=f"[View Product]({url})", inline=False)
-            await message.channel.send(embed=embed)
+        metrics.INSERT_RACES.inc(len(new_urls) - len(inserted))
+        metrics.LINKS_CAPTURED.inc(len(inserted))
+
+        # Anything not inserted is a duplicate (including races between check and insert).
+        dupes = [u for u in unique_urls if normalize_url(u) not in inserted]
+        embeds = [
+            build_item_embed(url, info, message.author)
+            for url, info in zip(new_urls, infos)
+            if normalize_url(url) in inserted
+        ]
+
+        for chunk in chunk_lines("🔁 Already in this channel wishlist:", [f"<{u}>" for u in dupes]):
+            await message.channel.send(chunk)
+        for i in range(0, len(embeds), MAX_EMBEDS_PER_MESSAGE):
+            await message.channel.send(embeds=embeds[i:i + MAX_EMBEDS_PER_MESSAGE])
+
+
+def main() -> None:
+    if not TOKEN:
+        raise RuntimeError("DISCORD_TOKEN is not set")
+    bot = WishlistBot()
+    bot.run(TOKEN)
 
 
-bot = WishlistBot()
-bot.run(TOKEN)
+if __name__ == "__main__":
+    main()
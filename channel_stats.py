@@ -0,0 +1,228 @@
+"""
+Maintained per-channel stats (channel_stats + channel_poster).
+
+record_inserts() and record_clear() run inside the caller's transaction, so the totals
+commit or roll back together with the rows they describe, and reading a channel's item
+count is a primary-key lookup instead of a COUNT(*) over its rows.
+
+StatsReconciler rebuilds every channel from wishlist_item once per
+CHANNEL_STATS_RECONCILE_INTERVAL, to repair drift from writes that bypassed the app
+(manual SQL, an older process still running during a deploy).
+
+Lock order is items -> channel_stats row -> channel_poster rows in both paths, so an
+insert and a reconcile of the same channel queue up instead of deadlocking.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, or_, select, union, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import metrics
+from db.models import ChannelPoster, ChannelStats, WishlistItem
+from db.session import AsyncSessionLocal, dialect_insert
+
+# Seconds between full reconciliation passes; 0 disables the job.
+CHANNEL_STATS_RECONCILE_INTERVAL = float(os.getenv("CHANNEL_STATS_RECONCILE_INTERVAL", "86400"))
+
+# (guild_id, channel_id, user_tag, created_at) of one inserted wishlist_item row.
+InsertedRow = Tuple[str, str, Optional[str], datetime]
+
+
+def _stats_upsert(guild_id: str, channel_id: str, item_count: int, last_added_at: Optional[datetime]):
+    stmt = dialect_insert(ChannelStats).values(
+        guild_id=guild_id, channel_id=channel_id, item_count=item_count, last_added_at=last_added_at
+    )
+    # Backfilled rows keep their original created_at, so last_added_at can't just be overwritten.
+    return stmt.on_conflict_do_update(
+        index_elements=[ChannelStats.guild_id, ChannelStats.channel_id],
+        set_={
+            "item_count": ChannelStats.item_count + stmt.excluded.item_count,
+            "last_added_at": case(
+                (
+                    or_(
+                        ChannelStats.last_added_at.is_(None),
+                        stmt.excluded.last_added_at > ChannelStats.last_added_at,
+                    ),
+                    stmt.excluded.last_added_at,
+                ),
+                else_=ChannelStats.last_added_at,
+            ),
+        },
+    )
+
+
+def _channel(model: Any, guild_id: str, channel_id: str) -> List[Any]:
+    return [model.guild_id == guild_id, model.channel_id == channel_id]
+
+
+async def record_inserts(db: AsyncSession, rows: Iterable[InsertedRow]) -> None:
+    """
+    Add freshly inserted wishlist_item rows to their channels' stats (caller commits).
+    """
+    by_channel: Dict[Tuple[str, str], List[InsertedRow]] = {}
+    for row in rows:
+        by_channel.setdefault((row[0], row[1]), []).append(row)
+
+    # Sorted, so two batches touching the same channels lock them in the same order.
+    for guild_id, channel_id in sorted(by_channel):
+        group = by_channel[(guild_id, channel_id)]
+        await db.execute(
+            _stats_upsert(guild_id, channel_id, len(group), max(created_at for *_, created_at in group))
+        )
+
+        tags = sorted({user_tag for _, _, user_tag, _ in group if user_tag})
+        if not tags:
+            continue
+        new_posters = (
+            await db.execute(
+                dialect_insert(ChannelPoster)
+                .values([{"guild_id": guild_id, "channel_id": channel_id, "user_tag": t} for t in tags])
+                .on_conflict_do_nothing(
+                    index_elements=[ChannelPoster.guild_id, ChannelPoster.channel_id, ChannelPoster.user_tag]
+                )
+                .returning(ChannelPoster.user_tag)
+            )
+        ).all()
+        if new_posters:
+            await db.execute(
+                update(ChannelStats)
+                .where(*_channel(ChannelStats, guild_id, channel_id))
+                .values(poster_count=ChannelStats.poster_count + len(new_posters))
+            )
+
+
+async def record_clear(db: AsyncSession, guild_id: str, channel_id: str) -> None:
+    """
+    The channel's items were all deleted in this transaction (caller commits).
+    """
+    await db.execute(delete(ChannelStats).where(*_channel(ChannelStats, guild_id, channel_id)))
+    await db.execute(delete(ChannelPoster).where(*_channel(ChannelPoster, guild_id, channel_id)))
+
+
+@metrics.timed_db
+async def get_stats_db(guild_id: str, channel_id: str) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        row = await db.get(ChannelStats, (str(guild_id), str(channel_id)))
+    if row is None:
+        return {"items": 0, "posters": 0, "last_added_at": None}
+    return {"items": row.item_count, "posters": row.poster_count, "last_added_at": row.last_added_at}
+
+
+@metrics.timed_db
+async def reconcile_channel_db(guild_id: str, channel_id: str) -> bool:
+    """
+    Recompute one channel from wishlist_item. Returns True if the stored stats were off.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        # Make sure there is a row to lock; inserts for this channel then wait behind us
+        # and add their rows on top of the recount once we commit.
+        await db.execute(
+            dialect_insert(ChannelStats)
+            .values(guild_id=guild_id, channel_id=channel_id)
+            .on_conflict_do_nothing(index_elements=[ChannelStats.guild_id, ChannelStats.channel_id])
+        )
+        current = (
+            await db.execute(
+                select(ChannelStats.item_count, ChannelStats.poster_count)
+                .where(*_channel(ChannelStats, guild_id, channel_id))
+                .with_for_update()
+            )
+        ).one()
+
+        item_count, last_added_at = (
+            await db.execute(
+                select(func.count(), func.max(WishlistItem.created_at)).where(
+                    *_channel(WishlistItem, guild_id, channel_id)
+                )
+            )
+        ).one()
+        tags = (
+            await db.execute(
+                select(WishlistItem.user_tag)
+                .where(*_channel(WishlistItem, guild_id, channel_id), WishlistItem.user_tag.is_not(None))
+                .distinct()
+            )
+        ).scalars().all()
+
+        await db.execute(delete(ChannelPoster).where(*_channel(ChannelPoster, guild_id, channel_id)))
+        if item_count == 0:
+            await db.execute(delete(ChannelStats).where(*_channel(ChannelStats, guild_id, channel_id)))
+        else:
+            if tags:
+                await db.execute(
+                    dialect_insert(ChannelPoster).values(
+                        [{"guild_id": guild_id, "channel_id": channel_id, "user_tag": t} for t in tags]
+                    )
+                )
+            await db.execute(
+                update(ChannelStats)
+                .where(*_channel(ChannelStats, guild_id, channel_id))
+                .values(
+                    item_count=item_count,
+                    poster_count=len(tags),
+                    last_added_at=last_added_at,
+                    reconciled_at=now,
+                )
+            )
+        await db.commit()
+    return tuple(current) != (item_count, len(tags))
+
+
+@metrics.timed_db
+async def channels_db() -> List[Tuple[str, str]]:
+    """
+    Every channel with items or a stats row (a stale row for an emptied channel gets removed).
+    """
+    stmt = union(
+        select(WishlistItem.guild_id, WishlistItem.channel_id).distinct(),
+        select(ChannelStats.guild_id, ChannelStats.channel_id),
+    )
+    async with AsyncSessionLocal() as db:
+        return [tuple(r) for r in (await db.execute(stmt)).all()]
+
+
+class StatsReconciler:
+    """
+    Owns the reconciliation loop for one process; start()/stop() like refresher.PriceRefresher.
+    """
+    def __init__(self):
+        self.task: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        if CHANNEL_STATS_RECONCILE_INTERVAL > 0:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run_once(self) -> int:
+        """
+        Reconcile every channel; returns how many had drifted.
+        """
+        drifted = 0
+        for guild_id, channel_id in await channels_db():
+            if await reconcile_channel_db(guild_id, channel_id):
+                drifted += 1
+                print(f"⚠️ channel_stats drift fixed for {guild_id}/{channel_id}")
+        return drifted
+
+    async def _run(self) -> None:
+        while True:
+            # The migration fills the table, so the first pass can wait a full interval.
+            await asyncio.sleep(CHANNEL_STATS_RECONCILE_INTERVAL)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ channel_stats reconciliation failed: {e}")
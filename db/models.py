@@ -3,9 +3,32 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, Index, String, Text, UniqueConstraint, func
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+    literal_column,
+)
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind cursor values in the same
+# format so keyset comparisons on created_at work in local runs too.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 
 class Base(DeclarativeBase):
     pass
@@ -36,14 +59,194 @@ class WishlistItem(Base):
 
     title: Mapped[str] = mapped_column(Text, nullable=False)
     price: Mapped[str] = mapped_column(Text, nullable=True)
+    # prices.parse_price(price): integer minor units + ISO code; NULL when unparseable.
+    amount_minor: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    currency: Mapped[str] = mapped_column(String(3), nullable=True)
 
     user_tag: Mapped[str] = mapped_column(Text, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), nullable=False, server_default=func.now()
+        Timestamp, nullable=False, server_default=func.now()
+    )
+    # Last time refresher.py checked the price (starts at capture time).
+    refreshed_at: Mapped[datetime] = mapped_column(
+        Timestamp, nullable=False, server_default=func.now()
     )
 
     __table_args__ = (
         UniqueConstraint("channel_id", "url_norm", name="uq_wishlist_channel_urlnorm"),
         Index("ix_wishlist_guild_channel_created", "guild_id", "channel_id", "created_at"),
+        Index("ix_wishlist_refreshed_at", "refreshed_at"),
+        # Price refresh reads and updates every channel's row for a link at once.
+        Index("ix_wishlist_url_norm", "url_norm"),
+    )
+
+
+# Sort key for /wishlist all sort:price: cheapest first, unpriced items last. A literal
+# (not a bound parameter) so queries match the expression index below.
+PRICE_SORT_KEY = func.coalesce(WishlistItem.amount_minor, literal_column("9223372036854775807"))
+Index(
+    "ix_wishlist_guild_channel_price",
+    WishlistItem.guild_id,
+    WishlistItem.channel_id,
+    PRICE_SORT_KEY,
+    WishlistItem.id,
+)
+
+# Full-text search for /wishlist search. Not mapped: Postgres gets a generated tsvector
+# column + GIN index, SQLite an external-content FTS5 table kept in sync by triggers.
+# Created with the table here (create_all: bench, local runs) and by migration
+# a8d4e1c7b9f2 for existing databases. URLs are split on punctuation so host and path
+# words ("amazon", "airpods") match; title words rank above URL words.
+WISHLIST_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE wishlist_item ADD COLUMN search_tsv tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', regexp_replace(url, '[^[:alnum:]]+', ' ', 'g')), 'B')"
+        ") STORED",
+        "CREATE INDEX ix_wishlist_search ON wishlist_item USING gin (search_tsv)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE wishlist_item_fts USING fts5("
+        "title, url, content='wishlist_item', content_rowid='id')",
+        "CREATE TRIGGER wishlist_item_fts_ai AFTER INSERT ON wishlist_item BEGIN "
+        "INSERT INTO wishlist_item_fts(rowid, title, url) VALUES (new.id, new.title, new.url); END",
+        "CREATE TRIGGER wishlist_item_fts_ad AFTER DELETE ON wishlist_item BEGIN "
+        "INSERT INTO wishlist_item_fts(wishlist_item_fts, rowid, title, url) "
+        "VALUES ('delete', old.id, old.title, old.url); END",
+        "CREATE TRIGGER wishlist_item_fts_au AFTER UPDATE OF title, url ON wishlist_item BEGIN "
+        "INSERT INTO wishlist_item_fts(wishlist_item_fts, rowid, title, url) "
+        "VALUES ('delete', old.id, old.title, old.url); "
+        "INSERT INTO wishlist_item_fts(rowid, title, url) VALUES (new.id, new.title, new.url); END",
+    ],
+}
+
+for _dialect, _statements in WISHLIST_SEARCH_DDL.items():
+    for _stmt in _statements:
+        event.listen(WishlistItem.__table__, "after_create", DDL(_stmt).execute_if(dialect=_dialect))
+event.listen(
+    WishlistItem.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS wishlist_item_fts").execute_if(dialect="sqlite"),
+)
+
+
+class ScrapeCache(Base):
+    """
+    Last scrape result per normalized URL, shared by every channel/guild.
+    etag/last_modified are the HTTP validators used to revalidate cheaply.
+    """
+    __tablename__ = "scrape_cache"
+
+    url_norm: Mapped[str] = mapped_column(Text, primary_key=True)
+
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    price: Mapped[str] = mapped_column(Text, nullable=True)
+
+    etag: Mapped[str] = mapped_column(Text, nullable=True)
+    last_modified: Mapped[str] = mapped_column(Text, nullable=True)
+
+    fetched_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class ScrapeJob(Base):
+    """
+    Durable queue of links waiting to be scraped by worker.py.
+    pending -> running (claimed with FOR UPDATE SKIP LOCKED) -> deleted on success,
+    back to pending with backoff on failure, failed after JOB_MAX_ATTEMPTS.
+    """
+    __tablename__ = "scrape_job"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    guild_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    channel_id: Mapped[str] = mapped_column(String(32), nullable=False)
+
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    user_tag: Mapped[str] = mapped_column(Text, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        Timestamp, nullable=False, server_default=func.now()
+    )
+    locked_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp, nullable=False, server_default=func.now()
+    )
+
+    __table_args__ = (
+        Index("ix_scrape_job_status_next", "status", "next_attempt_at"),
+    )
+
+
+class BackfillCheckpoint(Base):
+    """
+    Progress of /wishlist backfill for one channel. History is walked newest -> oldest;
+    before_message_id is the oldest message whose links are already saved, so a restart
+    resumes right below it.
+    """
+    __tablename__ = "backfill_checkpoint"
+
+    guild_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    channel_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+
+    status: Mapped[str] = mapped_column(String(16), nullable=False, server_default="running")
+    before_message_id: Mapped[str] = mapped_column(String(32), nullable=True)
+
+    messages_scanned: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    links_found: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    links_saved: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+
+    started_by: Mapped[str] = mapped_column(Text, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        Timestamp, nullable=False, server_default=func.now()
+    )
+
+
+class ChannelStats(Base):
+    """
+    Denormalized per-channel totals, kept in the same transaction as every insert and
+    /wishlist clear (channel_stats.py) so pagination reads the count in O(1).
+    No row means an empty channel.
+    """
+    __tablename__ = "channel_stats"
+
+    guild_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    channel_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    poster_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    last_added_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
+
+    reconciled_at: Mapped[datetime] = mapped_column(Timestamp, nullable=True)
+
+
+class ChannelPoster(Base):
+    """
+    Distinct user_tags per channel: poster_count grows when an insert adds a row here.
+    """
+    __tablename__ = "channel_poster"
+
+    guild_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    channel_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    user_tag: Mapped[str] = mapped_column(Text, primary_key=True)
+
+
+class CommandSync(Base):
+    """
+    Hash of the slash-command tree last synced to Discord, per scope (a guild id or
+    "global"), so a restart with an unchanged tree skips the sync call.
+    """
+    __tablename__ = "command_sync"
+
+    scope: Mapped[str] = mapped_column(String(32), primary_key=True)
+    tree_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    synced_at: Mapped[datetime] = mapped_column(
+        Timestamp, nullable=False, server_default=func.now()
     )
@@ -0,0 +1,86 @@
+# db/price_parsers.py
+"""
+Frozen copies of prices.parse_price for the migrations that backfill amount_minor and
+currency. Like db/url_norms.py: a released version must never change, and it reads no
+settings, so a migration writes the same values whatever prices.py or the environment
+look like when it runs. Bare numbers get no currency (PRICE_DEFAULT_CURRENCY is a
+runtime setting; the app applies it to new rows only).
+"""
+from __future__ import annotations
+
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional, Tuple
+
+ParsedPrice = Tuple[Optional[int], Optional[str]]
+
+_V1_SYMBOLS = sorted(
+    [
+        ("US$", "USD"), ("CA$", "CAD"), ("C$", "CAD"), ("A$", "AUD"), ("AU$", "AUD"),
+        ("NZ$", "NZD"), ("HK$", "HKD"), ("S$", "SGD"), ("R$", "BRL"), ("MX$", "MXN"),
+        ("Rs.", "INR"), ("Rs", "INR"), ("zł", "PLN"),
+        ("$", "USD"), ("€", "EUR"), ("£", "GBP"), ("₹", "INR"), ("¥", "JPY"), ("₩", "KRW"),
+        ("₺", "TRY"), ("₽", "RUB"), ("₫", "VND"), ("₪", "ILS"),
+    ],
+    key=lambda s: -len(s[0]),
+)
+_V1_CODES = frozenset({
+    "USD", "EUR", "GBP", "INR", "JPY", "CNY", "CAD", "AUD", "NZD", "CHF", "SEK", "NOK",
+    "DKK", "PLN", "CZK", "HUF", "BRL", "MXN", "KRW", "SGD", "HKD", "ZAR", "TRY", "AED",
+    "SAR", "ILS", "RUB", "VND", "THB", "IDR", "MYR", "PHP", "CLP", "ISK",
+})
+_V1_ZERO_DECIMAL = frozenset({"JPY", "KRW", "VND", "CLP", "ISK"})
+
+_V1_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+_V1_NUMBER_RE = re.compile(
+    r"(?:\d{1,3}(?:[ .,'\u00a0\u202f]\d{3})+|\d+)(?:[.,]\d+)?"
+    r"|(?<![A-Za-z])[.,]\d+"
+)
+
+
+def _v1_currency(text: str) -> Optional[str]:
+    for code in _V1_CODE_RE.findall(text.upper()):
+        if code in _V1_CODES:
+            return code
+    for symbol, code in _V1_SYMBOLS:
+        if symbol in text:
+            return code
+    return None
+
+
+def _v1_number(raw: str) -> Optional[Decimal]:
+    raw = re.sub(r"[\s']", "", raw).rstrip(".,")
+    if "," in raw and "." in raw:
+        decimal = "," if raw.rfind(",") > raw.rfind(".") else "."
+    elif "," in raw or "." in raw:
+        sep = "," if "," in raw else "."
+        tail = raw.rpartition(sep)[2]
+        decimal = None if raw.count(sep) > 1 or len(tail) == 3 else sep
+    else:
+        decimal = None
+    for t in {",", "."} - {decimal}:
+        raw = raw.replace(t, "")
+    if decimal == ",":
+        raw = raw.replace(",", ".")
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        return None
+
+
+def parse_price_v1(text: Optional[str]) -> ParsedPrice:
+    """
+    prices.parse_price as of migration b3f6d8a2c4e9, without PRICE_DEFAULT_CURRENCY.
+    """
+    if not text:
+        return None, None
+    match = _V1_NUMBER_RE.search(text)
+    if match is None:
+        return None, None
+    amount = _v1_number(match.group())
+    if amount is None:
+        return None, None
+    currency = _v1_currency(text)
+    digits = 0 if currency in _V1_ZERO_DECIMAL else 2
+    minor = int((amount * 10 ** digits).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return minor, currency
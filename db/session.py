@@ -4,18 +4,86 @@ from __future__ import annotations
 import os
 
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+# Pool sizing for the async engine (per process).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+
 def get_database_url() -> str:
     url = os.environ.get("DATABASE_URL")
     if not url:
         raise RuntimeError("DATABASE_URL is not set")
     return url
 
-# For a simple bot, a synchronous engine is fine.
-engine = create_engine(
-    get_database_url(),
-    pool_pre_ping=True,  # helps avoid stale connections
-)
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+def get_async_database_url() -> tuple[URL, dict]:
+    """
+    Map DATABASE_URL onto an async driver:
+    - postgresql://... -> postgresql+asyncpg://...
+    - sqlite:///...    -> sqlite+aiosqlite:///... (local runs/tests)
+
+    asyncpg doesn't understand libpq's sslmode/channel_binding query params (Neon URLs
+    carry both), so they are stripped and turned into connect_args.
+    """
+    url = make_url(get_database_url())
+    connect_args: dict = {}
+    backend = url.get_backend_name()
+
+    if backend == "postgresql":
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = "require" if sslmode in ("require", "prefer", "allow") else True
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+
+    return url, connect_args
+
+
+def _create_async_engine():
+    url, connect_args = get_async_database_url()
+    kwargs: dict = {"pool_pre_ping": True, "connect_args": connect_args}
+    if url.get_backend_name() != "sqlite":
+        kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+    return create_async_engine(url, **kwargs)
+
+
+_sync: dict = {}
+
+
+def __getattr__(name: str):
+    """
+    Sync `engine` / `SessionLocal`: handy for one-off scripts; the bot itself only uses
+    the async engine. Built on first access so bot startup doesn't load psycopg2.
+    """
+    if name not in ("engine", "SessionLocal"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if not _sync:
+        _sync["engine"] = create_engine(
+            get_database_url(),
+            pool_pre_ping=True,  # helps avoid stale connections
+        )
+        _sync["SessionLocal"] = sessionmaker(bind=_sync["engine"], autoflush=False, autocommit=False)
+    return _sync[name]
+
+
+# Async engine used by every bot.py helper, so DB round trips never block the event loop.
+async_engine = _create_async_engine()
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def dialect_insert(table):
+    """
+    INSERT construct for the active backend, so callers get on_conflict_do_nothing/
+    on_conflict_do_update on both Postgres and SQLite.
+    """
+    if async_engine.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
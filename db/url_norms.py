@@ -0,0 +1,210 @@
+# db/url_norms.py
+"""
+Frozen copies of urls.normalize_url for the migrations that rewrite url_norm, plus the
+recompute routine they share. A released version must never change: rerunning a
+migration has to produce the norms it produced the first time, whatever urls.py does
+later. New normalizer rules get a new version here and a new migration.
+
+normalize_v2 is the first released version (v1, which stripped ref/tag/spm/... on every
+host, never shipped and must not run: its recompute would delete rows it merged).
+"""
+from __future__ import annotations
+
+import logging
+import re
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import sqlalchemy as sa
+
+log = logging.getLogger("alembic.runtime.migration")
+
+_HOST_PREFIXES = ("www.", "m.", "mobile.", "smile.")
+_AMAZON_HOST = re.compile(r"^amazon\.(com|ca|com\.mx|com\.br|co\.uk|de|fr|it|es|nl|se|pl|com\.be|com\.tr|ae|sa|in|co\.jp|com\.au|sg|eg)$")
+_AMAZON_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?:[/?]|$)", re.I)
+_EBAY_ITEM = re.compile(r"^/itm/(?:[^/]+/)?(\d{9,})")
+_ETSY_LISTING = re.compile(r"^/listing/(\d+)")
+_WALMART_ITEM = re.compile(r"^/ip/(?:[^/]+/)?(\d+)")
+_PATH_RULES = {
+    "ebay.com": (_EBAY_ITEM, "/itm/{}"),
+    "ebay.co.uk": (_EBAY_ITEM, "/itm/{}"),
+    "ebay.de": (_EBAY_ITEM, "/itm/{}"),
+    "etsy.com": (_ETSY_LISTING, "/listing/{}"),
+    "walmart.com": (_WALMART_ITEM, "/ip/{}"),
+}
+
+# (params, prefixes) dropped everywhere, and per host ("amazon" = any Amazon store).
+Tracking = Tuple[frozenset, Tuple[str, ...]]
+
+V2_GLOBAL: Tracking = (
+    frozenset({
+        "fbclid", "gclid", "gclsrc", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+        "srsltid", "_ga", "_gl",
+    }),
+    ("utm_", "hsa_", "_hs"),
+)
+V2_HOSTS: Dict[str, Tracking] = {
+    "amazon": (
+        frozenset({
+            "ref", "ref_", "tag", "linkcode", "linkid", "ascsubtag", "camp", "creative",
+            "creativeasin", "psc", "smid", "_encoding", "ref_src", "si",
+        }),
+        ("pd_rd_", "pf_rd_"),
+    ),
+    "aliexpress.com": (
+        frozenset({"spm", "scm", "aff_fcid", "aff_fsk", "aff_platform", "aff_trace_key", "sk", "terminal_id"}),
+        (),
+    ),
+}
+
+
+def _canonical_host(netloc: str) -> str:
+    host = netloc.lower().rsplit("@", 1)[-1]
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    return host
+
+
+def _canonical_path(host: str, path: str) -> Optional[str]:
+    if _AMAZON_HOST.match(host):
+        m = _AMAZON_ASIN.search(path + "/")
+        return f"/dp/{m.group(1).upper()}" if m else None
+    rule = _PATH_RULES.get(host)
+    if rule is None:
+        return None
+    m = rule[0].match(path)
+    return rule[1].format(m.group(1)) if m else None
+
+
+def _normalize(raw: str, global_tracking: Tracking, hosts: Dict[str, Tracking]) -> str:
+    try:
+        raw = raw.strip()
+        p = urlparse(raw)
+        host = _canonical_host(p.netloc)
+        canonical_path = _canonical_path(host, p.path)
+        if canonical_path is not None:
+            return urlunparse(("https", host, canonical_path, "", "", ""))
+
+        site = hosts.get("amazon") if _AMAZON_HOST.match(host) else hosts.get(host)
+        rules = [global_tracking] + ([site] if site else [])
+
+        def tracking(key: str) -> bool:
+            k = key.lower()
+            return any(k in params or k.startswith(prefixes) for params, prefixes in rules)
+
+        query = sorted((k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not tracking(k))
+        return urlunparse(("https", host, p.path.rstrip("/"), p.params, urlencode(query), ""))
+    except Exception:
+        return raw.strip()
+
+
+def normalize_v2(raw: str) -> str:
+    """
+    urls.normalize_url as of migration d9e3f1b6a2c7: canonical product paths, global
+    tracking keys, site-specific keys (ref, tag, si, spm, ...) scoped to their hosts.
+    """
+    return _normalize(raw, V2_GLOBAL, V2_HOSTS)
+
+
+BATCH = 1000
+
+wishlist_item = sa.table(
+    'wishlist_item',
+    sa.column('id', sa.Integer),
+    sa.column('channel_id', sa.String),
+    sa.column('url', sa.Text),
+    sa.column('url_norm', sa.Text),
+)
+scrape_cache = sa.table('scrape_cache', sa.column('url_norm', sa.Text))
+
+
+def _chunks(seq, n=BATCH) -> Iterable[list]:
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+
+def recompute_url_norms(conn, normalize: Callable[[str], str]) -> Dict[str, int]:
+    """
+    Rewrite wishlist_item.url_norm with `normalize`, one channel at a time so memory is
+    bounded by the largest channel. Within a channel the oldest row keeps a norm; later
+    rows that now collide with it are deleted (the unique constraint leaves no other
+    choice) and each deletion is logged with both ids and the URL. Cached scrapes under
+    keys that changed are dropped. Returns counts for the migration log.
+    """
+    totals = {"channels": 0, "changed": 0, "deleted": 0, "cache_dropped": 0}
+    update = (
+        sa.update(wishlist_item)
+        .where(wishlist_item.c.id == sa.bindparam('row_id'))
+        .values(url_norm=sa.bindparam('norm'))
+    )
+
+    last_channel = ""
+    while True:
+        channels = conn.execute(
+            sa.select(wishlist_item.c.channel_id)
+            .where(wishlist_item.c.channel_id > last_channel)
+            .group_by(wishlist_item.c.channel_id)
+            .order_by(wishlist_item.c.channel_id)
+            .limit(BATCH)
+        ).scalars().all()
+        if not channels:
+            break
+        for channel_id in channels:
+            keep: Dict[str, int] = {}
+            changed = []
+            drop = []
+            rows = conn.execute(
+                sa.select(wishlist_item.c.id, wishlist_item.c.url, wishlist_item.c.url_norm)
+                .where(wishlist_item.c.channel_id == channel_id)
+                .order_by(wishlist_item.c.id)
+            )
+            for row_id, url, old_norm in rows:
+                norm = normalize(url)
+                if norm in keep:
+                    drop.append(row_id)
+                    log.warning(
+                        "url_norm: deleting wishlist_item %s (channel %s, %s): duplicate of %s",
+                        row_id, channel_id, url, keep[norm],
+                    )
+                else:
+                    keep[norm] = row_id
+                    if norm != old_norm:
+                        changed.append({"row_id": row_id, "norm": norm})
+
+            for ids in _chunks(drop):
+                conn.execute(sa.delete(wishlist_item).where(wishlist_item.c.id.in_(ids)))
+            # Park changed rows on a unique placeholder first, so a row taking over a norm
+            # another row is about to give up never trips uq_wishlist_channel_urlnorm.
+            for batch in _chunks(changed):
+                conn.execute(update, [{"row_id": c["row_id"], "norm": f"~migrating~{c['row_id']}"} for c in batch])
+            for batch in _chunks(changed):
+                conn.execute(update, batch)
+
+            totals["channels"] += 1
+            totals["changed"] += len(changed)
+            totals["deleted"] += len(drop)
+        last_channel = channels[-1]
+
+    # Cached scrapes under old keys would never be hit again.
+    last_key = ""
+    while True:
+        keys = conn.execute(
+            sa.select(scrape_cache.c.url_norm)
+            .where(scrape_cache.c.url_norm > last_key)
+            .order_by(scrape_cache.c.url_norm)
+            .limit(BATCH)
+        ).scalars().all()
+        if not keys:
+            break
+        stale = [k for k in keys if normalize(k) != k]
+        if stale:
+            conn.execute(sa.delete(scrape_cache).where(scrape_cache.c.url_norm.in_(stale)))
+            totals["cache_dropped"] += len(stale)
+        last_key = keys[-1]
+
+    log.info("url_norm recompute: %s", totals)
+    return totals
@@ -0,0 +1,166 @@
+"""
+Per-channel membership index for the duplicate check.
+
+Each channel's url_norms are loaded once (lazily) into a set of 64-bit hashes. A link
+whose hash isn't in the set is definitely new and skips the duplicate query; only
+possible hits (hash present) are confirmed against the table. Inserts made by this
+process are added as they happen; rows written elsewhere (worker.py, another process)
+are still caught by uq_wishlist_channel_urlnorm at insert time.
+
+Channels are kept in LRU order and evicted once the total number of hashes goes over
+DEDUPE_MAX_ENTRIES. A channel bigger than the whole budget is never indexed.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from db.models import WishlistItem
+from db.session import AsyncSessionLocal
+
+DEDUPE_MAX_ENTRIES = int(os.getenv("DEDUPE_MAX_ENTRIES", "100000"))
+
+
+def _h(norm: str) -> int:
+    # str hashes are salted per process, which is fine for an in-process index.
+    return hash(norm)
+
+
+class DedupeIndex:
+    """
+    Not thread-safe: bot event loop only, like cache.LRUCache.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0      # lookups answered without the duplicate query
+        self.misses = 0    # lookups that still needed it
+        self._channels: "OrderedDict[str, Set[int]]" = OrderedDict()
+        self._size = 0
+        self._too_big: Set[str] = set()
+        self._loading: Dict[Tuple[str, int], "asyncio.Task[Optional[Set[int]]]"] = {}
+        # Inserts that land while a channel is loading; merged in when the load finishes.
+        self._pending: Dict[str, Set[int]] = {}
+        # Bumped by reset(): a load that started before a clear must not be stored.
+        self._generation: Dict[str, int] = {}
+
+    async def _load(self, channel_id: str) -> Optional[Set[int]]:
+        async with AsyncSessionLocal() as db:
+            res = await db.stream_scalars(
+                select(WishlistItem.url_norm)
+                .where(WishlistItem.channel_id == channel_id)
+                .limit(self.max_entries + 1)
+                .execution_options(yield_per=5000)
+            )
+            hashes = {_h(n) async for n in res}
+        if len(hashes) > self.max_entries:
+            return None
+        return hashes
+
+    async def _get(self, channel_id: str) -> Optional[Set[int]]:
+        hashes = self._channels.get(channel_id)
+        if hashes is not None:
+            self._channels.move_to_end(channel_id)
+            return hashes
+        if channel_id in self._too_big:
+            return None
+
+        generation = self._generation.get(channel_id, 0)
+        key = (channel_id, generation)
+        task = self._loading.get(key)
+        if task is None:
+            self._pending[channel_id] = set()
+            task = asyncio.create_task(self._load(channel_id))
+            self._loading[key] = task
+            task.add_done_callback(lambda _t: self._loading.pop(key, None))
+        hashes = await asyncio.shield(task)
+
+        if channel_id in self._channels:  # another waiter already stored it
+            return self._channels[channel_id]
+        pending = self._pending.pop(channel_id, set())
+        if self._generation.get(channel_id, 0) != generation:
+            return None
+        if hashes is None:
+            self._too_big.add(channel_id)
+            return None
+        hashes |= pending
+        self._channels[channel_id] = hashes
+        self._size += len(hashes)
+        self._evict(keep=channel_id)
+        return hashes
+
+    def _evict(self, keep: str) -> None:
+        while self._size > self.max_entries and len(self._channels) > 1:
+            channel_id, hashes = next(iter(self._channels.items()))
+            if channel_id == keep:
+                self._channels.move_to_end(channel_id)
+                continue
+            del self._channels[channel_id]
+            self._size -= len(hashes)
+
+    async def possible(self, channel_id: str, norms: Iterable[str]) -> Set[str]:
+        """
+        The subset of norms that may already be saved in the channel. Everything else
+        is certainly new. Falls back to "all of them" if the channel can't be indexed.
+        """
+        norms = set(norms)
+        if not norms:
+            return norms
+        try:
+            hashes = await self._get(str(channel_id))
+        except Exception as e:
+            print(f"⚠️ dedupe index load failed for {channel_id}: {e}")
+            hashes = None
+        if hashes is None:
+            self.misses += 1
+            return norms
+        maybe = {n for n in norms if _h(n) in hashes}
+        if maybe:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return maybe
+
+    def add(self, channel_id: str, norms: Iterable[str]) -> None:
+        channel_id = str(channel_id)
+        new = {_h(n) for n in norms}
+        if channel_id in self._pending:
+            self._pending[channel_id] |= new
+        hashes = self._channels.get(channel_id)
+        if hashes is None:
+            return
+        before = len(hashes)
+        hashes |= new
+        self._size += len(hashes) - before
+        if len(hashes) > self.max_entries:
+            del self._channels[channel_id]
+            self._size -= len(hashes)
+            self._too_big.add(channel_id)
+        else:
+            self._evict(keep=channel_id)
+
+    def reset(self, channel_id: str) -> None:
+        """
+        Forget a channel (after /wishlist clear); the next lookup reloads it.
+        """
+        channel_id = str(channel_id)
+        hashes = self._channels.pop(channel_id, None)
+        if hashes is not None:
+            self._size -= len(hashes)
+        self._too_big.discard(channel_id)
+        self._generation[channel_id] = self._generation.get(channel_id, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": self._size,
+            "maxsize": self.max_entries,
+            "channels": len(self._channels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+index = DedupeIndex(DEDUPE_MAX_ENTRIES)
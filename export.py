@@ -0,0 +1,113 @@
+"""
+Streaming /wishlist export.
+
+Rows are consumed from an async iterator (a server-side cursor in bot.export_channel_db)
+and written straight into spooled temp files, so memory stays flat no matter how big
+the channel is. Output is split into several parts when it would exceed the
+attachment limit.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# Discord's attachment limit for non-boosted servers.
+EXPORT_MAX_BYTES = int(os.getenv("EXPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+# Kept in memory up to this size, then spilled to disk.
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(1024 * 1024)))
+# Headroom for bytes still buffered inside the gzip compressor when we check sizes.
+_GZIP_SLACK = 256 * 1024
+
+EXPORT_FORMATS = ("json", "ndjson", "csv")
+# Written by _Part.finish(); reserved in the size check so a finished part stays under the cap.
+_FOOTERS = {"json": b"\n]"}
+CSV_FIELDS = ["title", "price", "url", "user", "timestamp"]
+
+
+class _Part:
+    """
+    One output file: a spooled temp file, optionally gzip-wrapped, with per-format
+    header/footer so every part is valid on its own.
+    """
+    def __init__(self, fmt: str, compress: bool):
+        self.fmt = fmt
+        self.raw = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+        self.out = gzip.GzipFile(fileobj=self.raw, mode="wb") if compress else self.raw
+        self.compress = compress
+        self.rows = 0
+        if fmt == "json":
+            self.out.write(b"[")
+        elif fmt == "csv":
+            self.out.write(_csv_line(CSV_FIELDS))
+
+    def size(self) -> int:
+        return self.raw.tell() + (_GZIP_SLACK if self.compress else 0)
+
+    def write(self, chunk: bytes) -> None:
+        self.out.write(chunk)
+        self.rows += 1
+
+    def finish(self):
+        if self.fmt == "json":
+            self.out.write(_FOOTERS["json"] if self.rows else b"]")
+        if self.compress:
+            self.out.close()  # flushes the gzip trailer, leaves raw open
+        self.raw.seek(0)
+        return self.raw
+
+
+def _csv_line(values: List[Any]) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue().encode("utf-8")
+
+
+def _encode(fmt: str, item: Dict[str, Any], first_in_part: bool) -> bytes:
+    if fmt == "ndjson":
+        return (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+    if fmt == "csv":
+        return _csv_line([item.get(k) for k in CSV_FIELDS])
+    # Pretty JSON, same layout as json.dumps(list, indent=2).
+    body = json.dumps(item, indent=2).replace("\n", "\n  ")
+    return (("\n  " if first_in_part else ",\n  ") + body).encode("utf-8")
+
+
+async def write_export(
+    rows: AsyncIterator[Dict[str, Any]],
+    basename: str,
+    fmt: str = "json",
+    compress: bool = False,
+    max_bytes: Optional[int] = None,
+) -> List[Tuple[str, Any]]:
+    """
+    Stream rows into one or more files. Returns [(filename, fileobj)], rewound and ready
+    to upload; the caller closes them. Empty list if there were no rows.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    limit = (max_bytes or EXPORT_MAX_BYTES) - len(_FOOTERS.get(fmt, b""))
+
+    parts = []
+    part = None
+    async for item in rows:
+        chunk = _encode(fmt, item, first_in_part=part is None or part.rows == 0)
+        if part is not None and part.rows and part.size() + len(chunk) > limit:
+            finished = part.finish()
+            finished.rollover()  # finished parts wait on disk, only the current one is spooled
+            parts.append(finished)
+            part = None
+            chunk = _encode(fmt, item, first_in_part=True)
+        if part is None:
+            part = _Part(fmt, compress)
+        part.write(chunk)
+
+    if part is not None:
+        parts.append(part.finish())
+
+    ext = fmt + (".gz" if compress else "")
+    if len(parts) == 1:
+        return [(f"{basename}.{ext}", parts[0])]
+    return [(f"{basename}-part{i}.{ext}", fp) for i, fp in enumerate(parts, start=1)]
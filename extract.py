@@ -0,0 +1,165 @@
+"""
+HTML -> (title, price) extraction, kept free of aiohttp/discord/DB imports so parse
+worker processes (scraper.py's pool) start small.
+
+MetaExtractor is the incremental head-only parser the fetcher feeds while downloading;
+parse_page() is the full BeautifulSoup fallback that runs in a worker process and hands
+back a ParseResult, a two-field tuple that pickles in a few dozen bytes.
+"""
+import json
+from html.parser import HTMLParser
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+
+class ParseResult(NamedTuple):
+    title: str
+    price: str
+
+
+class MetaExtractor(HTMLParser):
+    """
+    Incremental extractor for the few tags we need: og:title, product:price:amount,
+    JSON-LD Product name/price and <title>. Fed chunk by chunk while the page downloads,
+    so we can stop reading early instead of building a full tree.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og_title: Optional[str] = None
+        self.meta_price: Optional[str] = None
+        self.ld_title: Optional[str] = None
+        self.ld_price: Optional[str] = None
+        self.title_tag: Optional[str] = None
+        self.head_closed = False
+        self._in_title = False
+        self._in_ld = False
+        self._buf: list = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            a = dict(attrs)
+            key = a.get("property") or a.get("name")
+            content = a.get("content")
+            if key == "og:title" and content and self.og_title is None:
+                self.og_title = content.strip()
+            elif key == "product:price:amount" and content and self.meta_price is None:
+                self.meta_price = content.strip()
+        elif tag == "title" and self.title_tag is None:
+            self._in_title, self._buf = True, []
+        elif tag == "script" and (dict(attrs).get("type") or "").lower() == "application/ld+json":
+            self._in_ld, self._buf = True, []
+        elif tag == "body":
+            self.head_closed = True  # pages that never close <head>
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title_tag = "".join(self._buf).strip() or None
+        elif tag == "script" and self._in_ld:
+            self._in_ld = False
+            self._read_json_ld("".join(self._buf))
+        elif tag == "head":
+            self.head_closed = True
+
+    def handle_data(self, data):
+        if self._in_title or self._in_ld:
+            self._buf.append(data)
+
+    def _read_json_ld(self, raw: str) -> None:
+        title, price = parse_json_ld(raw)
+        self.ld_title = self.ld_title or title
+        self.ld_price = self.ld_price or price
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.og_title or self.ld_title or self.title_tag
+
+    @property
+    def price(self) -> Optional[str]:
+        return self.meta_price or self.ld_price
+
+    @property
+    def complete(self) -> bool:
+        # og:title lives in the head and beats the other titles, so anything else is only
+        # final once the head is done.
+        return bool(self.price) and bool(self.og_title or (self.head_closed and self.title))
+
+
+def parse_json_ld(raw: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (name, price) of the first schema.org Product in a JSON-LD blob.
+    """
+    try:
+        product = _find_product(json.loads(raw))
+    except ValueError:
+        return None, None
+    if product is None:
+        return None, None
+
+    name = product.get("name")
+    title = name.strip() if isinstance(name, str) else None
+    offers = product.get("offers")
+    if isinstance(offers, list):
+        offers = offers[0] if offers else None
+    price = None
+    if isinstance(offers, dict):
+        amount = offers.get("price", offers.get("lowPrice"))
+        if amount is not None:
+            price = str(amount)
+    return title, price
+
+
+def _find_product(data: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(data, list):
+        for d in data:
+            found = _find_product(d)
+            if found is not None:
+                return found
+        return None
+    if not isinstance(data, dict):
+        return None
+    kind = data.get("@type")
+    if kind == "Product" or (isinstance(kind, list) and "Product" in kind):
+        return data
+    return _find_product(data.get("@graph"))
+
+
+def parse_html(html):
+    """
+    Full BeautifulSoup parse; fallback when the head-only extractor comes up short.
+    """
+    # Imported on first use: most pages never get here, and bs4 costs startup time and RSS.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Try Open Graph first
+    title = (soup.find("meta", property="og:title") or {}).get("content")
+    price = (soup.find("meta", property="product:price:amount") or {}).get("content")
+
+    # Then JSON-LD Product data (often in the body)
+    for script in soup.find_all("script", type="application/ld+json"):
+        if title and price:
+            break
+        ld_title, ld_price = parse_json_ld(script.string or "")
+        title = title or ld_title
+        price = price or ld_price
+
+    # Fallbacks
+    if not title and soup.title:
+        title = soup.title.get_text(strip=True)
+    if not price:
+        price_tag = soup.find("span", class_="price") or soup.find("span", class_="sale-price")
+        price = price_tag.get_text(strip=True) if price_tag else "N/A"
+
+    return {
+        "title": title or "Unknown Product",
+        "price": price or "N/A"
+    }
+
+
+def parse_page(body: bytes, charset: str) -> ParseResult:
+    """
+    Worker entry point: raw body bytes in, so decoding is also off the event loop.
+    """
+    info = parse_html(body.decode(charset, errors="replace"))
+    return ParseResult(info["title"], info["price"])
@@ -0,0 +1,355 @@
+"""
+Hot-path metrics: counters, gauges and fixed-bucket histograms rendered in Prometheus
+text format on a small aiohttp endpoint, plus an event-loop lag probe and optional
+periodic one-line JSON summaries.
+
+Everything is plain dict/list bookkeeping on the event loop (no locks, no deps), so it
+is cheap enough to leave on in production.
+"""
+import asyncio
+import functools
+import json
+import os
+import re
+import sys
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from aiohttp import web
+
+# Endpoint; empty METRICS_PORT disables it.
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT", "9091")
+# Seconds between structured summary log lines; 0 = off.
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "0"))
+LOOP_LAG_INTERVAL = 0.5
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _fmt(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        inner = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + inner + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._fmt(k)} {v}" for k, v in self.values.items()]
+
+    def summary(self) -> Any:
+        return {",".join(k) or "_": v for k, v in self.values.items()}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # per label set: [bucket counts..., +Inf count], sum
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[key] += value
+
+    def time(self, **labels: Any) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, counts in self.counts.items():
+            running = 0
+            for bound, c in zip(self.buckets, counts):
+                running += c
+                lines.append(f"{self.name}_bucket{self._fmt(key, ('le', repr(bound)))} {running}")
+            running += counts[-1]
+            lines.append(f"{self.name}_bucket{self._fmt(key, ('le', '+Inf'))} {running}")
+            lines.append(f"{self.name}_sum{self._fmt(key)} {self.sums[key]}")
+            lines.append(f"{self.name}_count{self._fmt(key)} {running}")
+        return lines
+
+    def summary(self) -> Any:
+        out = {}
+        for key, counts in self.counts.items():
+            n = sum(counts)
+            out[",".join(key) or "_"] = {"count": n, "avg_ms": round(self.sums[key] / n * 1000, 3) if n else 0}
+        return out
+
+
+class _Timer:
+    def __init__(self, hist: Histogram, labels: Dict[str, Any]):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.hist.observe(time.perf_counter() - self.start, **self.labels)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_registry: List[_Metric] = []
+_collectors: List[Callable[[], None]] = []
+_health: Optional[Callable[[], Tuple[bool, Dict[str, Any]]]] = None
+
+
+# --- the bot's metrics --------------------------------------------------------------
+
+DB_SECONDS = Histogram("wishlist_db_seconds", "Latency of *_db helpers", ["helper"])
+SCRAPE_SECONDS = Histogram("wishlist_scrape_seconds", "Scrape time split into fetch and parse", ["phase"])
+DISCORD_SECONDS = Histogram("wishlist_discord_http_seconds", "Discord REST call latency", ["method", "route", "status"])
+LOOP_LAG_SECONDS = Histogram(
+    "wishlist_event_loop_lag_seconds", "Event-loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+LOOP_LAG_MAX = Gauge("wishlist_event_loop_lag_max_seconds", "Worst loop lag since the last summary")
+
+LINKS_CAPTURED = Counter("wishlist_links_captured_total", "Links saved to a wishlist")
+DEDUPE_HITS = Counter("wishlist_dedupe_hits_total", "Links rejected as already in the channel wishlist")
+INSERT_RACES = Counter("wishlist_insert_races_total", "Links that passed the duplicate check but lost at insert")
+SCRAPE_FAILURES = Counter("wishlist_scrape_failures_total", "Failed scrapes", ["domain", "reason"])
+WRITE_BATCH_ROWS = Histogram(
+    "wishlist_write_batch_rows", "Rows per write-behind batch",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+JOURNALED_ROWS = Counter("wishlist_journaled_rows_total", "Rows spilled to the local journal during DB outages")
+JOURNAL_PENDING = Gauge("wishlist_journal_pending_rows", "Journaled rows waiting for replay")
+PRICE_REFRESHES = Counter("wishlist_price_refreshes_total", "Background price checks", ["result"])
+
+SHARD_LATENCY = Gauge("wishlist_shard_latency_seconds", "Gateway heartbeat latency", ["shard"])
+SHARD_UP = Gauge("wishlist_shard_up", "1 while the shard's gateway connection is open", ["shard"])
+SHARD_EVENTS = Counter("wishlist_shard_events_total", "Gateway connects/disconnects/resumes", ["shard", "event"])
+SHARD_MESSAGES = Counter("wishlist_shard_messages_total", "Guild messages received", ["shard"])
+
+STARTUP_SECONDS = Gauge("wishlist_startup_seconds", "Time from process start to each startup phase", ["phase"])
+PROCESS_RSS_BYTES = Gauge("wishlist_process_rss_bytes", "Resident set size of this process")
+
+CACHE_REQUESTS = Gauge("wishlist_cache_requests", "Cache lookups since start", ["cache", "result"])
+CACHE_SIZE = Gauge("wishlist_cache_entries", "Entries currently cached", ["cache"])
+
+
+def export_cache_stats(name: str, stats: Dict[str, Any]) -> None:
+    """
+    Copy an LRUCache.stats() dict into the cache gauges.
+    """
+    CACHE_REQUESTS.set(stats["hits"], cache=name, result="hit")
+    CACHE_REQUESTS.set(stats["misses"], cache=name, result="miss")
+    CACHE_SIZE.set(stats["size"], cache=name)
+
+
+def register_collector(fn: Callable[[], None]) -> None:
+    """
+    fn runs right before each render/summary; use it to copy cache stats etc. into gauges.
+    """
+    _collectors.append(fn)
+
+
+def register_health(fn: Callable[[], Tuple[bool, Dict[str, Any]]]) -> None:
+    """
+    fn backs GET /health: (healthy, details). Unhealthy answers 503 so a supervisor or
+    load balancer check can restart/skip the process.
+    """
+    global _health
+    _health = fn
+
+
+def rss_bytes() -> int:
+    """
+    Current RSS from /proc (Linux); elsewhere the peak from getrusage.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # macOS reports bytes
+
+
+def _collect_rss() -> None:
+    PROCESS_RSS_BYTES.set(rss_bytes())
+
+
+register_collector(_collect_rss)
+
+
+def timed_db(fn: Callable) -> Callable:
+    """
+    Record an async *_db helper's latency in DB_SECONDS.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - start, helper=fn.__name__)
+    return wrapper
+
+
+def render() -> str:
+    for fn in _collectors:
+        fn()
+    lines: List[str] = []
+    for m in _registry:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> Dict[str, Any]:
+    for fn in _collectors:
+        fn()
+    out = {}
+    for m in _registry:
+        data = m.summary()
+        if data:
+            out[m.name] = data
+    return out
+
+
+# --- Discord REST timing via aiohttp tracing ----------------------------------------
+
+_ID_SEGMENT = re.compile(r"/(\d{5,}|[A-Za-z0-9_\-.]{40,})(?=/|$)")
+
+
+def _route(path: str) -> str:
+    # /api/v10/channels/123/messages -> /api/v10/channels/:id/messages (also hides interaction tokens)
+    return _ID_SEGMENT.sub("/:id", path)
+
+
+def discord_trace_config() -> aiohttp.TraceConfig:
+    """
+    Pass as discord.Client(http_trace=...) to time every send/response/edit the bot makes.
+    """
+    async def on_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_end(session, ctx, params):
+        DISCORD_SECONDS.observe(
+            time.perf_counter() - ctx.start,
+            method=params.method,
+            route=_route(params.url.path),
+            status=params.response.status,
+        )
+
+    async def on_exception(session, ctx, params):
+        DISCORD_SECONDS.observe(
+            time.perf_counter() - ctx.start, method=params.method, route=_route(params.url.path), status="error"
+        )
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_exception)
+    return trace
+
+
+# --- background tasks ---------------------------------------------------------------
+
+async def _loop_lag_monitor() -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL)
+        LOOP_LAG_SECONDS.observe(lag)
+        if lag > LOOP_LAG_MAX.values.get((), 0.0):
+            LOOP_LAG_MAX.set(lag)
+
+
+async def _log_summaries(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps({"event": "metrics", "ts": round(time.time(), 3), **summary()}, separators=(",", ":")))
+        LOOP_LAG_MAX.set(0.0)
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def _handle_health(request: web.Request) -> web.Response:
+    ok, details = _health() if _health is not None else (True, {})
+    return web.json_response({"ok": ok, **details}, status=200 if ok else 503)
+
+
+class MetricsService:
+    """
+    Owns the endpoint + background tasks for one process.
+    """
+    def __init__(self):
+        self.runner: Optional[web.AppRunner] = None
+        self.tasks: List["asyncio.Task[None]"] = []
+
+    async def start(self) -> None:
+        self.tasks.append(asyncio.create_task(_loop_lag_monitor()))
+        if METRICS_LOG_INTERVAL > 0:
+            self.tasks.append(asyncio.create_task(_log_summaries(METRICS_LOG_INTERVAL)))
+        if METRICS_PORT:
+            app = web.Application()
+            app.router.add_get("/metrics", _handle_metrics)
+            app.router.add_get("/health", _handle_health)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, METRICS_HOST, int(METRICS_PORT)).start()
+            print(f"📈 Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+    async def stop(self) -> None:
+        for t in self.tasks:
+            t.cancel()
+        self.tasks.clear()
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,136 @@
+"""
+Process pool for the BeautifulSoup fallback parse, so large pages are parsed on other
+cores instead of holding the bot's GIL.
+
+Each worker is `python parse_pool.py <max_tasks>`: a small process that imports only
+extract.py (+ bs4), reads (body bytes, charset) frames on stdin and writes a pickled
+extract.ParseResult per frame on stdout. multiprocessing isn't used because its
+spawn/forkserver children re-import the main script (bot.py, with discord.py and
+SQLAlchemy) before running anything.
+
+A worker exits after max_tasks pages and is replaced on the next request, which caps
+the memory a long-lived parser can accumulate. A worker that dies or is abandoned
+mid-page (cancelled scrape) is killed and replaced the same way.
+"""
+import asyncio
+import os
+import pickle
+import sys
+from typing import Dict, List, Optional, Set
+
+_HEADER = 4  # big-endian frame length
+
+Proc = asyncio.subprocess.Process
+
+
+class ParsePool:
+    """
+    Workers start lazily on first use; one page in flight per worker.
+    """
+    def __init__(self, workers: int, max_tasks: int):
+        self.workers = workers
+        self.max_tasks = max_tasks
+        self.spawned = 0
+        # One slot per worker: a running process or None (start one when taken).
+        self._idle: "asyncio.Queue[Optional[Proc]]" = asyncio.Queue()
+        for _ in range(workers):
+            self._idle.put_nowait(None)
+        self._procs: Set[Proc] = set()
+        self._tasks: Dict[int, int] = {}  # pid -> pages parsed by that worker
+
+    async def _spawn(self) -> Proc:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), str(self.max_tasks),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self.spawned += 1
+        self._procs.add(proc)
+        self._tasks[proc.pid] = 0
+        return proc
+
+    def _discard(self, proc: Optional[Proc]) -> None:
+        if proc is None:
+            return
+        self._procs.discard(proc)
+        self._tasks.pop(proc.pid, None)
+        if proc.returncode is None:
+            proc.kill()
+
+    async def parse(self, body: bytes, charset: str):
+        """
+        extract.ParseResult for one page. Raises if the worker fails; the caller decides
+        how to fall back.
+        """
+        proc = await self._idle.get()
+        try:
+            if proc is None or proc.returncode is not None:
+                self._discard(proc)
+                proc = await self._spawn()
+            frame = pickle.dumps((body, charset), protocol=pickle.HIGHEST_PROTOCOL)
+            proc.stdin.write(len(frame).to_bytes(_HEADER, "big") + frame)
+            await proc.stdin.drain()
+            size = int.from_bytes(await proc.stdout.readexactly(_HEADER), "big")
+            result = pickle.loads(await proc.stdout.readexactly(size))
+        except BaseException:
+            # Half-written request or unread reply: this worker can't be reused.
+            self._discard(proc)
+            self._idle.put_nowait(None)
+            raise
+
+        self._tasks[proc.pid] += 1
+        if self.max_tasks and self._tasks[proc.pid] >= self.max_tasks:
+            # It exits by itself after this reply; start fresh next time. The slot goes
+            # back before reaping, so a cancelled wait can't leak it.
+            self._procs.discard(proc)
+            self._tasks.pop(proc.pid, None)
+            self._idle.put_nowait(None)
+            await proc.wait()
+            return result
+        self._idle.put_nowait(proc)
+        return result
+
+    async def close(self) -> None:
+        procs: List[Proc] = list(self._procs)
+        for proc in procs:
+            self._discard(proc)
+        await asyncio.gather(*(p.wait() for p in procs), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "running": len(self._procs), "spawned": self.spawned}
+
+
+def serve(max_tasks: int) -> None:
+    """
+    Worker loop: one reply frame per request frame, exit after max_tasks (0 = never).
+    """
+    import bs4  # noqa: F401  (loaded up front so the first page isn't slower)
+
+    from extract import ParseResult, parse_page
+
+    stdin = sys.stdin.buffer
+    # Replies get a private copy of fd 1; stray prints (ours or a library's) go to stderr
+    # instead of corrupting the reply stream.
+    stdout = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    done = 0
+    while not max_tasks or done < max_tasks:
+        header = stdin.read(_HEADER)
+        if len(header) < _HEADER:
+            return  # parent went away
+        body, charset = pickle.loads(stdin.read(int.from_bytes(header, "big")))
+        try:
+            result = parse_page(body, charset)
+        except Exception as e:
+            print(f"⚠️ parse worker: {type(e).__name__}: {e}")
+            result = ParseResult("Unknown Product", "N/A")
+        frame = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        stdout.write(len(frame).to_bytes(_HEADER, "big") + frame)
+        stdout.flush()
+        done += 1
+
+
+if __name__ == "__main__":
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
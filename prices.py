@@ -0,0 +1,106 @@
+"""
+Price normalizer: free-form scraped price text -> (amount_minor, currency).
+
+Scraped prices come as whatever the page had: "19.99" (OpenGraph amount), "$1,299.00",
+"1.299,00 €", "₹ 2,499", "N/A". parse_price() turns them into an integer amount in the
+currency's minor unit plus an ISO 4217 code, so sorting and totals can run in SQL.
+A bare number has no currency unless PRICE_DEFAULT_CURRENCY is set.
+"""
+import os
+import re
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Optional, Tuple
+
+# ISO code for prices that carry no symbol or code (e.g. "19.99"); empty = unknown.
+PRICE_DEFAULT_CURRENCY = os.getenv("PRICE_DEFAULT_CURRENCY", "").strip().upper() or None
+
+# Longest first so "US$" wins over "$".
+CURRENCY_SYMBOLS = [
+    ("US$", "USD"), ("CA$", "CAD"), ("C$", "CAD"), ("A$", "AUD"), ("AU$", "AUD"),
+    ("NZ$", "NZD"), ("HK$", "HKD"), ("S$", "SGD"), ("R$", "BRL"), ("MX$", "MXN"),
+    ("Rs.", "INR"), ("Rs", "INR"), ("zł", "PLN"),
+    ("$", "USD"), ("€", "EUR"), ("£", "GBP"), ("₹", "INR"), ("¥", "JPY"), ("₩", "KRW"),
+    ("₺", "TRY"), ("₽", "RUB"), ("₫", "VND"), ("₪", "ILS"),
+]
+CURRENCY_SYMBOLS.sort(key=lambda s: -len(s[0]))
+
+KNOWN_CODES = {
+    "USD", "EUR", "GBP", "INR", "JPY", "CNY", "CAD", "AUD", "NZD", "CHF", "SEK", "NOK",
+    "DKK", "PLN", "CZK", "HUF", "BRL", "MXN", "KRW", "SGD", "HKD", "ZAR", "TRY", "AED",
+    "SAR", "ILS", "RUB", "VND", "THB", "IDR", "MYR", "PHP", "CLP", "ISK",
+}
+# Currencies without a minor unit in practice.
+ZERO_DECIMAL = {"JPY", "KRW", "VND", "CLP", "ISK"}
+
+_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+# Digits with optional single-character thousands separators between 3-digit groups
+# ("1,299", "1 299", "1'299", NBSP) and a decimal part; or a bare ".99". Anything looser
+# glues neighbouring numbers together ("$19.99 2 left").
+_NUMBER_RE = re.compile(
+    r"(?:\d{1,3}(?:[ .,'\u00a0\u202f]\d{3})+|\d+)(?:[.,]\d+)?"
+    r"|(?<![A-Za-z])[.,]\d+"
+)
+
+ParsedPrice = Tuple[Optional[int], Optional[str]]
+
+
+def minor_digits(currency: Optional[str]) -> int:
+    return 0 if currency in ZERO_DECIMAL else 2
+
+
+def _currency(text: str) -> Optional[str]:
+    for code in _CODE_RE.findall(text.upper()):
+        if code in KNOWN_CODES:
+            return code
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return code
+    return None
+
+
+def _number(raw: str) -> Optional[Decimal]:
+    raw = re.sub(r"[\s']", "", raw).rstrip(".,")
+    if "," in raw and "." in raw:
+        # Whichever comes last is the decimal point: "1,299.00" / "1.299,00".
+        decimal = "," if raw.rfind(",") > raw.rfind(".") else "."
+    elif "," in raw or "." in raw:
+        sep = "," if "," in raw else "."
+        # One separator followed by exactly three digits is a thousands separator.
+        tail = raw.rpartition(sep)[2]
+        decimal = None if raw.count(sep) > 1 or len(tail) == 3 else sep
+    else:
+        decimal = None
+    thousands = {",", "."} - {decimal}
+    for t in thousands:
+        raw = raw.replace(t, "")
+    if decimal == ",":
+        raw = raw.replace(",", ".")
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        return None
+
+
+def parse_price(text: Optional[str]) -> ParsedPrice:
+    """
+    (amount_minor, currency) for a scraped price string; (None, None) if there's no number.
+    Ranges ("$10 - $20") use the first amount, like the JSON-LD lowPrice the scraper reads.
+    """
+    if not text:
+        return None, None
+    match = _NUMBER_RE.search(text)
+    if match is None:
+        return None, None
+    amount = _number(match.group())
+    if amount is None:
+        return None, None
+    currency = _currency(text) or PRICE_DEFAULT_CURRENCY
+    minor = int((amount * 10 ** minor_digits(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    return minor, currency
+
+
+def format_minor(amount_minor: int, currency: Optional[str]) -> str:
+    digits = minor_digits(currency)
+    amount = Decimal(amount_minor) / (10 ** digits)
+    text = f"{amount:,.{digits}f}"
+    return f"{currency} {text}" if currency else text
@@ -0,0 +1,195 @@
+"""
+Background price refresh.
+
+Walks wishlist items in order of staleness (refreshed_at), re-checks each distinct
+url_norm through the scrape cache (so validators stored there turn most checks into a
+304) and writes changed prices back in one transaction per batch.
+
+Work is paced by a global requests-per-minute budget and capped at
+PRICE_REFRESH_CONCURRENCY in-flight pages, so live link captures always keep most of
+scraper.SCRAPE_CONCURRENCY for themselves.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from itertools import zip_longest
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from sqlalchemy import func, select, update
+
+import metrics
+import render_cache
+import scrape_cache
+from db.models import WishlistItem
+from db.session import AsyncSessionLocal
+from prices import parse_price
+from scraper import TokenBucket
+
+# Items are re-checked once they are older than this (seconds); 0 disables the refresher.
+PRICE_REFRESH_INTERVAL = float(os.getenv("PRICE_REFRESH_INTERVAL", "86400"))
+# Global budget shared by every host, in page checks per minute.
+PRICE_REFRESH_RPM = float(os.getenv("PRICE_REFRESH_RPM", "30"))
+PRICE_REFRESH_CONCURRENCY = int(os.getenv("PRICE_REFRESH_CONCURRENCY", "2"))
+PRICE_REFRESH_BATCH = int(os.getenv("PRICE_REFRESH_BATCH", "50"))
+# Rows read off the refreshed_at index per wanted link: a link saved in several
+# channels has one row each, and only distinct url_norms count towards the batch.
+STALE_SCAN_FACTOR = 4
+# A failed check is retried after this many seconds instead of a full interval.
+PRICE_REFRESH_RETRY = float(os.getenv("PRICE_REFRESH_RETRY", "3600"))
+# Sleep when nothing is due.
+PRICE_REFRESH_IDLE = float(os.getenv("PRICE_REFRESH_IDLE", "60"))
+
+
+@metrics.timed_db
+async def stale_urls_db(older_than: datetime, limit: int) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Oldest-first (url_norm, url, price) for links not refreshed since older_than.
+    One entry per url_norm, however many channels saved it.
+
+    Candidates come from a LIMITed walk of ix_wishlist_refreshed_at, and only their rows
+    (found through ix_wishlist_url_norm) are grouped, so a batch costs the same however
+    big the table is.
+    """
+    candidates = (
+        select(WishlistItem.url_norm)
+        .where(WishlistItem.refreshed_at < older_than)
+        .order_by(WishlistItem.refreshed_at)
+        .limit(limit * STALE_SCAN_FACTOR)
+        .subquery()
+    )
+    async with AsyncSessionLocal() as db:
+        res = await db.execute(
+            select(
+                WishlistItem.url_norm,
+                func.min(WishlistItem.url),
+                func.min(WishlistItem.price),
+            )
+            .where(
+                WishlistItem.url_norm.in_(select(candidates.c.url_norm).distinct()),
+                WishlistItem.refreshed_at < older_than,
+            )
+            .group_by(WishlistItem.url_norm)
+            .order_by(func.min(WishlistItem.refreshed_at))
+            .limit(limit)
+        )
+        return [tuple(r) for r in res.all()]
+
+
+@metrics.timed_db
+async def apply_refresh_db(
+    checked: List[str], prices: Dict[str, Optional[str]], failed: Optional[List[str]] = None
+) -> None:
+    """
+    One transaction: new prices for the url_norms in `prices`, refreshed_at bumped for
+    every url_norm in `checked`. `failed` ones are stamped so they come due again after
+    PRICE_REFRESH_RETRY rather than a full interval, and a dead page still doesn't
+    block the head of the queue.
+    """
+    if not checked and not failed:
+        return
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        for norm, price in prices.items():
+            amount_minor, currency = parse_price(price)
+            await db.execute(
+                update(WishlistItem)
+                .where(WishlistItem.url_norm == norm)
+                .values(price=price, amount_minor=amount_minor, currency=currency)
+            )
+        if checked:
+            await db.execute(
+                update(WishlistItem).where(WishlistItem.url_norm.in_(checked)).values(refreshed_at=now)
+            )
+        if failed:
+            retry_at = now - timedelta(seconds=max(0.0, PRICE_REFRESH_INTERVAL - PRICE_REFRESH_RETRY))
+            await db.execute(
+                update(WishlistItem).where(WishlistItem.url_norm.in_(failed)).values(refreshed_at=retry_at)
+            )
+        await db.commit()
+    if prices:
+        # Updated by url_norm across channels; cached pages may show the old price.
+        render_cache.pages.invalidate_all()
+
+
+def spread_by_host(rows: List[Tuple[str, str, Optional[str]]]) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Round-robin over hosts so one retailer's backlog doesn't go out as a burst.
+    """
+    by_host: Dict[str, List[Tuple[str, str, Optional[str]]]] = {}
+    for row in rows:
+        by_host.setdefault((urlparse(row[1]).hostname or "").lower(), []).append(row)
+    return [row for group in zip_longest(*by_host.values()) for row in group if row is not None]
+
+
+class PriceRefresher:
+    """
+    Owns the refresh loop for one process; start()/stop() like metrics.MetricsService.
+    """
+    def __init__(self):
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.bucket = TokenBucket(PRICE_REFRESH_RPM / 60, 1)
+        self.sem = asyncio.Semaphore(PRICE_REFRESH_CONCURRENCY)
+
+    async def start(self) -> None:
+        if PRICE_REFRESH_INTERVAL > 0 and PRICE_REFRESH_RPM > 0:
+            self.task = asyncio.create_task(self._run())
+            print(f"🔄 Price refresh every {PRICE_REFRESH_INTERVAL:.0f}s at ≤{PRICE_REFRESH_RPM:g} req/min")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _check(self, url: str) -> Dict[str, Any]:
+        async with self.sem:
+            return await scrape_cache.refresh(url, max_age=PRICE_REFRESH_INTERVAL)
+
+    async def run_once(self) -> int:
+        """
+        Refresh one batch; returns how many distinct links were checked.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=PRICE_REFRESH_INTERVAL)
+        rows = spread_by_host(await stale_urls_db(cutoff, PRICE_REFRESH_BATCH))
+        if not rows:
+            return 0
+
+        # The bucket spaces out the starts; the semaphore caps how many are in flight.
+        tasks = []
+        for _, url, _ in rows:
+            await self.bucket.acquire()
+            tasks.append(asyncio.create_task(self._check(url)))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        checked: List[str] = []
+        failed: List[str] = []
+        prices: Dict[str, Optional[str]] = {}
+        for (norm, _, old_price), info in zip(rows, results):
+            if isinstance(info, Exception) or not info.get("ok"):
+                failed.append(norm)
+                metrics.PRICE_REFRESHES.inc(result="failed")
+                continue
+            checked.append(norm)
+            if info.get("price") and info["price"] != "N/A" and info["price"] != old_price:
+                prices[norm] = info["price"]
+                metrics.PRICE_REFRESHES.inc(result="changed")
+            else:
+                metrics.PRICE_REFRESHES.inc(result="unchanged")
+
+        await apply_refresh_db(checked, prices, failed)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self.run_once() == 0:
+                    await asyncio.sleep(PRICE_REFRESH_IDLE)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Price refresh failed: {e}")
+                await asyncio.sleep(PRICE_REFRESH_IDLE)
@@ -0,0 +1,66 @@
+"""
+Versioned cache for what /wishlist latest and the WishlistPager show.
+
+Every channel has a version that is bumped whenever its items change (insert, clear,
+price refresh). Entries are keyed by (channel, version, ...), so a bump makes all of a
+channel's cached pages unreachable at once and they age out of the LRU; nothing has to
+be deleted. Repeated views and pager clicks on an unchanged channel never touch the DB.
+
+Versions only move for writes made by this process. worker.py inserts (SCRAPE_QUEUE)
+land in another process, and with SHARD_IDS set this is one of several bot.py processes
+while only the primary one runs the price refresher; in either case entries also expire
+after RENDER_CACHE_TTL seconds.
+"""
+import os
+from itertools import count
+from typing import Any, Dict, Hashable, Optional
+
+from cache import LRUCache
+
+_SCRAPE_QUEUE = os.getenv("SCRAPE_QUEUE", "false").lower() in ("1", "true", "yes")
+# shards.py gives every child its SHARD_IDS; other processes write to the same channels.
+_OTHER_WRITERS = _SCRAPE_QUEUE or bool(os.getenv("SHARD_IDS"))
+
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "2000"))
+RENDER_CACHE_TTL = float(os.getenv("RENDER_CACHE_TTL", "10" if _OTHER_WRITERS else "0")) or None
+
+
+class RenderCache:
+    """
+    Not thread-safe: bot event loop only, like cache.LRUCache.
+
+    Read version() before querying the DB and pass that to set(): if a write bumps the
+    channel while the query runs, the result lands under the old version and is never read.
+    """
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        # Versions come from one process-wide counter, so a channel forgotten by
+        # invalidate_all() can never come back with a version that was used before.
+        self._counter = count(1)
+        self._epoch = 0
+        self._versions: Dict[str, int] = {}
+
+    def version(self, channel_id: str) -> Any:
+        return (self._epoch, self._versions.get(str(channel_id), 0))
+
+    def bump(self, channel_id: str) -> None:
+        self._versions[str(channel_id)] = next(self._counter)
+
+    def invalidate_all(self) -> None:
+        """
+        For writes that don't know their channels (price refresh updates by url_norm).
+        """
+        self._epoch = next(self._counter)
+        self._versions.clear()
+
+    def get(self, channel_id: str, version: Any, key: Hashable) -> Any:
+        return self._entries.get((str(channel_id), version, key))
+
+    def set(self, channel_id: str, version: Any, key: Hashable, value: Any) -> None:
+        self._entries.set((str(channel_id), version, key), value)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._entries.stats()
+
+
+pages = RenderCache(maxsize=RENDER_CACHE_SIZE, ttl=RENDER_CACHE_TTL)
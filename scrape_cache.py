@@ -0,0 +1,163 @@
+"""
+Shared scrape-result cache keyed by normalize_url().
+
+Two tiers: an in-memory LRU in front of the scrape_cache table. Entries older than
+SCRAPE_CACHE_TTL are still served (stale-while-revalidate) while a background task
+revalidates them with the stored ETag/Last-Modified, so a popular link costs one
+fetch per TTL window instead of one per post.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import select
+
+import scraper
+from cache import LRUCache
+from db.models import ScrapeCache
+from db.session import AsyncSessionLocal, dialect_insert
+from urls import normalize_url
+
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "21600"))  # 6h
+SCRAPE_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_SIZE", "2000"))
+
+# No TTL on the LRU itself: staleness is decided here so stale entries can still be served.
+_memory = LRUCache(maxsize=SCRAPE_CACHE_SIZE)
+_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+_background: Set["asyncio.Task[Any]"] = set()
+
+
+def _is_fresh(entry: Dict[str, Any]) -> bool:
+    return time.time() - entry["fetched_at"] < SCRAPE_CACHE_TTL
+
+
+def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+    # ok=False when the fetch behind this result failed (title/price are the last good
+    # values, or placeholders on a cold miss).
+    return {"title": entry["title"], "price": entry["price"], "ok": entry.get("ok", True)}
+
+
+async def _load(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        async with AsyncSessionLocal() as db:
+            row = (
+                await db.execute(select(ScrapeCache).where(ScrapeCache.url_norm == key))
+            ).scalar_one_or_none()
+    except Exception as e:
+        print(f"⚠️ scrape_cache read failed for {key}: {e}")
+        return None
+    if row is None:
+        return None
+
+    fetched_at = row.fetched_at
+    if fetched_at.tzinfo is None:  # SQLite drops tzinfo
+        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+    entry = {
+        "title": row.title,
+        "price": row.price,
+        "etag": row.etag,
+        "last_modified": row.last_modified,
+        "fetched_at": fetched_at.timestamp(),
+    }
+    _memory.set(key, entry)
+    return entry
+
+
+async def _store(key: str, entry: Dict[str, Any]) -> None:
+    _memory.set(key, entry)
+    values = {
+        "title": entry["title"],
+        "price": entry["price"],
+        "etag": entry.get("etag"),
+        "last_modified": entry.get("last_modified"),
+        "fetched_at": datetime.fromtimestamp(entry["fetched_at"], tz=timezone.utc),
+    }
+    stmt = dialect_insert(ScrapeCache).values(url_norm=key, **values)
+    stmt = stmt.on_conflict_do_update(index_elements=[ScrapeCache.url_norm], set_=values)
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
+    except Exception as e:
+        print(f"⚠️ scrape_cache write failed for {key}: {e}")
+
+
+async def _fetch(key: str, url: str, entry: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if entry is not None:
+        info = await scraper.scrape_generic(url, etag=entry.get("etag"), last_modified=entry.get("last_modified"))
+    else:
+        info = await scraper.scrape_generic(url)
+
+    if info.get("not_modified") and entry is not None:
+        entry = dict(entry, fetched_at=time.time(), etag=info.get("etag"), last_modified=info.get("last_modified"))
+        await _store(key, entry)
+        return entry
+
+    if not info.get("ok"):
+        # Don't cache failures. The last good result is still returned (live lookups keep
+        # showing it) but marked failed, so refresh() callers don't take it for a check.
+        if entry is not None:
+            return dict(entry, ok=False)
+        return {"title": info["title"], "price": info["price"], "fetched_at": 0.0, "ok": False}
+
+    entry = {
+        "title": info["title"],
+        "price": info["price"],
+        "etag": info.get("etag"),
+        "last_modified": info.get("last_modified"),
+        "fetched_at": time.time(),
+    }
+    await _store(key, entry)
+    return entry
+
+
+def _fetch_once(key: str, url: str, entry: Optional[Dict[str, Any]]) -> "asyncio.Task[Dict[str, Any]]":
+    """
+    Coalesce concurrent fetches of the same URL into one task.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch(key, url, entry))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    return task
+
+
+async def cached_scrape(url: str) -> Dict[str, Any]:
+    """
+    scraper.scrape() with caching. Returns {"title", "price", "ok"}.
+    """
+    key = normalize_url(url)
+    entry = _memory.get(key)
+    if entry is None:
+        entry = await _load(key)
+
+    if entry is not None:
+        if not _is_fresh(entry) and key not in _inflight:
+            task = _fetch_once(key, url, entry)
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        return _public(entry)
+
+    return _public(await _fetch_once(key, url, None))
+
+
+async def refresh(url: str, max_age: float) -> Dict[str, Any]:
+    """
+    Result no older than max_age seconds: served from the cache when it is recent enough,
+    otherwise revalidated now (conditional request when validators are stored).
+    Used by refresher.py; live lookups go through cached_scrape().
+    """
+    key = normalize_url(url)
+    entry = _memory.get(key)
+    if entry is None:
+        entry = await _load(key)
+    if entry is not None and time.time() - entry["fetched_at"] < max_age:
+        return _public(entry)
+    return _public(await _fetch_once(key, url, entry))
+
+
+def stats() -> Dict[str, Any]:
+    return dict(_memory.stats(), inflight=len(_inflight))
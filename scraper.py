@@ -1,37 +1,341 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import codecs
+import os
+import time
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urlparse
+
+import aiohttp
+
+import metrics
+from cache import LRUCache
+from extract import MetaExtractor, ParseResult, parse_html, parse_json_ld, parse_page  # noqa: F401
+from parse_pool import ParsePool
 
 headers = {
     "User-Agent": "Mozilla/5.0"
 }
 
-def scrape_generic(url):
-    try:
-        res = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(res.text, "html.parser")
+# Max number of product pages fetched at once across every guild/channel.
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "10"))
+# Once title + price are known, stop reading at </head> or after this many bytes.
+SCRAPE_HEAD_BYTES = int(os.getenv("SCRAPE_HEAD_BYTES", str(256 * 1024)))
+# Hard cap on bytes read when the head isn't enough and we fall back to BeautifulSoup.
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(2 * 1024 * 1024)))
+SCRAPE_CHUNK_BYTES = 16 * 1024
 
-        # Try Open Graph first
-        title = (soup.find("meta", property="og:title") or {}).get("content")
-        price = (soup.find("meta", property="product:price:amount") or {}).get("content")
+# Processes running the BeautifulSoup fallback, so big pages parse on other cores instead
+# of holding the GIL; 0 = a thread in this process (default on single-core machines).
+_CPUS = os.cpu_count() or 1
+SCRAPE_PARSE_WORKERS = int(os.getenv("SCRAPE_PARSE_WORKERS", str(min(4, _CPUS) if _CPUS > 1 else 0)))
+# Each worker is replaced after this many pages, capping fragmentation/leak growth.
+SCRAPE_PARSE_MAX_TASKS = int(os.getenv("SCRAPE_PARSE_MAX_TASKS", "200"))
 
-        # Fallbacks
-        if not title and soup.title:
-            title = soup.title.get_text(strip=True)
-        if not price:
-            price_tag = soup.find("span", class_="price") or soup.find("span", class_="sale-price")
-            price = price_tag.get_text(strip=True) if price_tag else "N/A"
+# Per-host politeness: token bucket refill rate (req/s) and burst size.
+SCRAPE_HOST_RATE = float(os.getenv("SCRAPE_HOST_RATE", "2"))
+SCRAPE_HOST_BURST = int(os.getenv("SCRAPE_HOST_BURST", "5"))
+# Circuit breaker: after this many consecutive failures a host is skipped for the cool-down.
+SCRAPE_BREAKER_FAILURES = int(os.getenv("SCRAPE_BREAKER_FAILURES", "3"))
+SCRAPE_BREAKER_COOLDOWN = float(os.getenv("SCRAPE_BREAKER_COOLDOWN", "300"))
+# Hosts come from user messages: keep limiter/breaker state for the most recent ones only,
+# and give the first SCRAPE_METRIC_DOMAINS hosts their own metric label ("other" after).
+SCRAPE_MAX_DOMAINS = int(os.getenv("SCRAPE_MAX_DOMAINS", "5000"))
+SCRAPE_METRIC_DOMAINS = int(os.getenv("SCRAPE_METRIC_DOMAINS", "50"))
 
-        return {
-            "title": title or "Unknown Product",
-            "price": price or "N/A"
+_session: Optional[aiohttp.ClientSession] = None
+_semaphore = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+_parse_pool: Optional[ParsePool] = None
+
+
+class TokenBucket:
+    """
+    Classic token bucket; acquire() sleeps until a token is available.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DomainState:
+    """
+    Rate limiter, circuit breaker and latency/failure stats for one host.
+    Closed -> (N consecutive failures) -> open for the cool-down -> half-open: one trial
+    request decides whether it closes again or re-opens.
+    """
+    def __init__(self, host: str):
+        self.host = host
+        self.bucket = TokenBucket(SCRAPE_HOST_RATE, SCRAPE_HOST_BURST)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.skipped = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self.latency_ms_avg = 0.0
+        self.latency_ms_max = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self.consecutive_failures < SCRAPE_BREAKER_FAILURES:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.skipped += 1
+        metrics.SCRAPE_FAILURES.inc(domain=_metric_domain(self.host), reason="circuit_open")
+        return False
+
+    def _record(self, started: float) -> None:
+        ms = (time.monotonic() - started) * 1000
+        self.requests += 1
+        # EWMA so the number tracks how the host behaves now, not last week.
+        self.latency_ms_avg = ms if self.requests == 1 else 0.8 * self.latency_ms_avg + 0.2 * ms
+        self.latency_ms_max = max(self.latency_ms_max, ms)
+        self.trial_in_flight = False
+
+    def record_success(self, started: float) -> None:
+        self._record(started)
+        self.consecutive_failures = 0
+
+    def record_failure(self, started: float, error: str, reason: str = "error") -> None:
+        metrics.SCRAPE_FAILURES.inc(domain=_metric_domain(self.host), reason=reason)
+        self._record(started)
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.consecutive_failures >= SCRAPE_BREAKER_FAILURES:
+            self.open_until = time.monotonic() + SCRAPE_BREAKER_COOLDOWN
+
+
+_domains = LRUCache(maxsize=SCRAPE_MAX_DOMAINS)
+_metric_domains: Set[str] = set()
+
+
+def _metric_domain(host: str) -> str:
+    """
+    Bounded label set for SCRAPE_FAILURES: one time series per host would grow with every
+    link someone posts.
+    """
+    host = host.removeprefix("www.")
+    if host in _metric_domains:
+        return host
+    if len(_metric_domains) < SCRAPE_METRIC_DOMAINS:
+        _metric_domains.add(host)
+        return host
+    return "other"
+
+
+def _domain(url: str) -> DomainState:
+    host = (urlparse(url).hostname or "").lower()
+    state = _domains.get(host)
+    if state is None:
+        state = DomainState(host)
+        _domains.set(host, state)
+    return state
+
+
+def domain_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        host: {
+            "state": d.state,
+            "requests": d.requests,
+            "failures": d.failures,
+            "consecutive_failures": d.consecutive_failures,
+            "skipped": d.skipped,
+            "latency_ms_avg": round(d.latency_ms_avg, 1),
+            "latency_ms_max": round(d.latency_ms_max, 1),
+            "last_error": d.last_error,
         }
+        for host, d in _domains.items()
+    }
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Shared client session (created lazily, it must be built inside the running loop).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=SCRAPE_TIMEOUT),
+            # Keep-alive pool shared by every scrape; DNS answers cached for 5 min.
+            connector=aiohttp.TCPConnector(
+                limit=SCRAPE_CONCURRENCY * 2,
+                limit_per_host=SCRAPE_HOST_BURST,
+                ttl_dns_cache=300,
+                keepalive_timeout=30,
+            ),
+        )
+    return _session
+
+
+def get_parse_pool() -> Optional[ParsePool]:
+    """
+    None with SCRAPE_PARSE_WORKERS=0; workers only start on the first fallback parse.
+    """
+    global _parse_pool
+    if _parse_pool is None and SCRAPE_PARSE_WORKERS > 0:
+        _parse_pool = ParsePool(SCRAPE_PARSE_WORKERS, SCRAPE_PARSE_MAX_TASKS)
+    return _parse_pool
+
+
+async def parse_body(body: bytes, charset: str) -> ParseResult:
+    """
+    Full parse of a fetched body in a worker process (or a thread without a pool).
+    """
+    pool = get_parse_pool()
+    if pool is not None:
+        try:
+            return await pool.parse(body, charset)
+        except (OSError, EOFError, asyncio.IncompleteReadError) as e:
+            # The pool replaces the worker; this page is parsed here instead.
+            print(f"⚠️ Parse worker failed ({type(e).__name__}); parsing in-process")
+    return await asyncio.to_thread(parse_page, body, charset)
+
+
+async def close() -> None:
+    global _session, _parse_pool
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    if _parse_pool is not None:
+        await _parse_pool.close()
+        _parse_pool = None
+
+
+def _charset(res: aiohttp.ClientResponse) -> str:
+    try:
+        return codecs.lookup(res.charset or "utf-8").name
+    except LookupError:
+        return "utf-8"
+
+
+async def read_page(res: aiohttp.ClientResponse) -> Dict[str, Any]:
+    """
+    Stream the body through MetaExtractor. Stops at </head> (or SCRAPE_HEAD_BYTES) once
+    title + price are found; otherwise keeps the body up to SCRAPE_MAX_BYTES and parses
+    it with BeautifulSoup.
+    """
+    charset = _charset(res)
+    decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+    extractor = MetaExtractor()
+    body = bytearray()
+
+    feeding = True
+    parse_s = 0.0
+
+    async for chunk in res.content.iter_chunked(SCRAPE_CHUNK_BYTES):
+        body += chunk
+        if feeding:
+            t = time.perf_counter()
+            extractor.feed(decoder.decode(chunk))
+            parse_s += time.perf_counter() - t
+            if extractor.complete or (len(body) >= SCRAPE_HEAD_BYTES and extractor.price and extractor.title):
+                return {"title": extractor.title, "price": extractor.price, "bytes": len(body), "parse_s": parse_s}
+            # Past the head the rest is only for the BeautifulSoup fallback; don't
+            # spend loop time running the incremental parser over the body too.
+            feeding = not extractor.head_closed and len(body) < SCRAPE_HEAD_BYTES
+        if len(body) >= SCRAPE_MAX_BYTES:
+            break
+
+    # Head wasn't enough (e.g. price only in a <span class="price">): full parse of the
+    # raw bytes in a worker process, since html.parser is pure Python and holds the GIL.
+    t = time.perf_counter()
+    result = await parse_body(bytes(body), charset)
+    parse_s += time.perf_counter() - t
+    info: Dict[str, Any] = result._asdict()
+    if extractor.title:
+        info["title"] = extractor.title
+    if extractor.price:
+        info["price"] = extractor.price
+    info["bytes"] = len(body)
+    info["parse_s"] = parse_s
+    return info
+
+
+async def scrape_generic(url, etag=None, last_modified=None):
+    """
+    Fetch + parse a product page.
+
+    Returns {"title", "price", "etag", "last_modified", "ok"}. When etag/last_modified are
+    given they are sent as If-None-Match/If-Modified-Since; a 304 comes back as
+    {"not_modified": True, ...} without title/price.
+    """
+    req_headers = {}
+    if etag:
+        req_headers["If-None-Match"] = etag
+    if last_modified:
+        req_headers["If-Modified-Since"] = last_modified
+
+    domain = _domain(url)
+    if not domain.allow():
+        # Host keeps failing: answer right away instead of waiting out another timeout.
+        return {"title": "Unknown Product", "price": "N/A", "ok": False, "skipped": True}
+
+    started = time.monotonic()
+    try:
+        # Inside the try: a scrape cancelled while waiting for a token must still release
+        # a half-open breaker's trial slot (except CancelledError below).
+        await domain.bucket.acquire()
+        started = time.monotonic()
+        async with _semaphore:
+            async with get_session().get(url, headers=req_headers) as res:
+                validators = {
+                    "etag": res.headers.get("ETag", etag),
+                    "last_modified": res.headers.get("Last-Modified", last_modified),
+                }
+                if res.status == 304:
+                    domain.record_success(started)
+                    return {"not_modified": True, "ok": True, **validators}
+                if res.status == 429 or res.status >= 500:
+                    domain.record_failure(started, f"HTTP {res.status}", reason=f"http_{res.status}")
+                    return {"title": "Unknown Product", "price": "N/A", "ok": False}
+                info = await read_page(res)
+                ok = res.status < 400
+
+        domain.record_success(started)
+        parse_s = info.pop("parse_s", 0.0)
+        metrics.SCRAPE_SECONDS.observe(parse_s, phase="parse")
+        metrics.SCRAPE_SECONDS.observe(max(0.0, time.monotonic() - started - parse_s), phase="fetch")
+        info.update(validators, ok=ok)
+        return info
 
+    except asyncio.CancelledError:
+        domain.trial_in_flight = False
+        raise
     except Exception as e:
+        reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+        domain.record_failure(started, f"{type(e).__name__}: {e}", reason=reason)
         print(f"❌ Error scraping {url}: {e}")
         return {
             "title": "Unknown Product",
-            "price": "N/A"
+            "price": "N/A",
+            "ok": False,
         }
 
-def scrape(url):
-    return scrape_generic(url)
+async def scrape(url):
+    return await scrape_generic(url)
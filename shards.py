@@ -0,0 +1,212 @@
+"""
+Multi-process gateway launcher: `python shards.py` instead of `python bot.py`.
+
+Splits this machine's shards into SHARD_PROCESSES contiguous ranges and runs one
+bot.py per range (an AutoShardedClient over just those shards), so message handling
+spreads over cores. Several machines can share one bot: give each the same SHARD_COUNT
+and its own SHARD_IDS.
+
+Every child gets:
+- SHARD_COUNT / SHARD_IDS for its range
+- DB_POOL_SIZE / DB_MAX_OVERFLOW from an equal share of DB_CONNECTION_BUDGET, so all
+  processes together stay under the database's connection limit
+- its own METRICS_PORT (base + index) and WRITE_JOURNAL_PATH (suffixed with the index)
+- SCRAPE_PARSE_WORKERS from an equal share of the CPUs (unless set explicitly), so the
+  processes' parse pools don't oversubscribe the machine
+
+Children are started in turn so their IDENTIFYs respect Discord's max_concurrency, and
+restarted with backoff if they exit. SIGINT/SIGTERM stop them all.
+"""
+import asyncio
+import math
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN = os.getenv("DISCORD_TOKEN")
+# Total shards for the whole bot; "auto" asks Discord for its recommendation.
+SHARD_COUNT = os.getenv("SHARD_COUNT", "auto")
+# This machine's share, e.g. "0-7" or "0,2,4"; empty = all of them.
+SHARD_IDS = os.getenv("SHARD_IDS", "")
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "0")) or (os.cpu_count() or 1)
+# Connections all bot.py processes on this machine may hold together (pool + overflow).
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "20"))
+METRICS_PORT = os.getenv("METRICS_PORT", "9091")
+WRITE_JOURNAL_PATH = os.getenv("WRITE_JOURNAL_PATH", "write_journal.ndjson")
+SCRAPE_PARSE_WORKERS = os.getenv("SCRAPE_PARSE_WORKERS")
+
+IDENTIFY_WINDOW = 5.0  # seconds per max_concurrency IDENTIFYs (Discord gateway rule)
+RESTART_BACKOFF_MAX = 300.0
+
+
+def parse_shard_ids(spec: str) -> List[int]:
+    """
+    "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+    """
+    ids: List[int] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        ids.extend(range(int(lo), int(hi or lo) + 1))
+    return sorted(set(ids))
+
+
+def split_ranges(ids: List[int], n: int) -> List[List[int]]:
+    """
+    Contiguous, near-equal slices; never more slices than shards.
+    """
+    n = max(1, min(n, len(ids)))
+    size, extra = divmod(len(ids), n)
+    out, start = [], 0
+    for i in range(n):
+        end = start + size + (1 if i < extra else 0)
+        out.append(ids[start:end])
+        start = end
+    return out
+
+
+def pool_sizes(budget: int, processes: int) -> Tuple[int, int]:
+    """
+    (DB_POOL_SIZE, DB_MAX_OVERFLOW) for one process's share of the budget. The shares
+    never add up to more than the budget; run() refuses to start with less than one
+    connection per process.
+    """
+    share = budget // processes
+    if share < 1:
+        raise ValueError(f"a budget of {budget} connections can't cover {processes} processes")
+    pool = math.ceil(share / 2)
+    return pool, share - pool
+
+
+def parse_workers(cpus: int, processes: int) -> int:
+    """
+    One process's share of the CPUs for its parse pool; 0 (parse in a thread) on one CPU.
+    """
+    return 0 if cpus <= 1 else max(1, cpus // processes)
+
+
+async def gateway_info(token: str) -> Tuple[int, int]:
+    """
+    (recommended shard count, identify max_concurrency) from GET /gateway/bot.
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot", headers={"Authorization": f"Bot {token}"}
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return int(data["shards"]), int(data["session_start_limit"]["max_concurrency"])
+
+
+class ShardProcess:
+    """
+    One bot.py child running a range of shards; restarted with backoff when it exits.
+    """
+    def __init__(self, index: int, shard_ids: List[int], env: Dict[str, str]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.env = env
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.stopping = False
+
+    @property
+    def label(self) -> str:
+        return f"shards {self.shard_ids[0]}-{self.shard_ids[-1]}"
+
+    async def run(self, start_delay: float) -> None:
+        await asyncio.sleep(start_delay)
+        backoff = 1.0
+        while not self.stopping:
+            started = time.monotonic()
+            self.proc = await asyncio.create_subprocess_exec(sys.executable, "bot.py", env=self.env)
+            print(f"🚀 [{self.label}] pid {self.proc.pid}")
+            code = await self.proc.wait()
+            if self.stopping:
+                break
+            # A child that stayed up a while gets a fresh backoff.
+            if time.monotonic() - started > RESTART_BACKOFF_MAX:
+                backoff = 1.0
+            print(f"⚠️ [{self.label}] exited with {code}; restarting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+    def stop(self) -> None:
+        self.stopping = True
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.terminate()
+
+
+async def run() -> None:
+    if not TOKEN:
+        raise RuntimeError("DISCORD_TOKEN is not set")
+
+    recommended, max_concurrency = await gateway_info(TOKEN)
+    total = recommended if SHARD_COUNT == "auto" else int(SHARD_COUNT)
+    ids = parse_shard_ids(SHARD_IDS) if SHARD_IDS else list(range(total))
+    if not ids or ids[-1] >= total:
+        raise RuntimeError(f"SHARD_IDS {SHARD_IDS!r} doesn't fit SHARD_COUNT={total}")
+
+    ranges = split_ranges(ids, SHARD_PROCESSES)
+    if len(ranges) > DB_CONNECTION_BUDGET:
+        raise RuntimeError(
+            f"{len(ranges)} shard processes need at least one DB connection each but "
+            f"DB_CONNECTION_BUDGET={DB_CONNECTION_BUDGET}; raise the budget or lower SHARD_PROCESSES"
+        )
+    pool, overflow = pool_sizes(DB_CONNECTION_BUDGET, len(ranges))
+    print(
+        f"🧩 {len(ids)}/{total} shards over {len(ranges)} processes "
+        f"(Discord recommends {recommended}); DB pool {pool}+{overflow} each"
+    )
+
+    children: List[ShardProcess] = []
+    delay = 0.0
+    for i, shard_ids in enumerate(ranges):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(total),
+            SHARD_IDS=",".join(map(str, shard_ids)),
+            DB_POOL_SIZE=str(pool),
+            DB_MAX_OVERFLOW=str(overflow),
+            WRITE_JOURNAL_PATH=f"{WRITE_JOURNAL_PATH}.{i}",
+        )
+        if METRICS_PORT:
+            env["METRICS_PORT"] = str(int(METRICS_PORT) + i)
+        if SCRAPE_PARSE_WORKERS is None:
+            env["SCRAPE_PARSE_WORKERS"] = str(parse_workers(os.cpu_count() or 1, len(ranges)))
+        children.append(ShardProcess(i, shard_ids, env))
+
+    tasks = []
+    for child in children:
+        tasks.append(asyncio.create_task(child.run(delay)))
+        # The next child starts once this one's shards have had their IDENTIFY slots.
+        delay += IDENTIFY_WINDOW * math.ceil(len(child.shard_ids) / max_concurrency)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    print("🛑 Stopping shard processes")
+    for child in children:
+        child.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(
+        *(c.proc.wait() for c in children if c.proc is not None and c.proc.returncode is None),
+        return_exceptions=True,
+    )
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
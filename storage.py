@@ -1,24 +1,379 @@
+"""
+Local append-only store (the offline/`/data` volume path).
+
+Records are appended as NDJSON lines, so a save costs the same however big the store is,
+and a crash can at worst leave one torn line at the end, which is cut off on open.
+Every append is flushed to the OS before it returns, so a process crash loses nothing.
+fsync is batched: every STORAGE_FSYNC_EVERY records, and a background thread fsyncs
+anything older than STORAGE_FSYNC_INTERVAL seconds, so a power loss or kernel crash
+loses at most that window of records even if no further writes come.
+
+A small index file (`<path>.idx`) maps channel_id -> byte offsets so one channel can be
+streamed without scanning the log. It is rewritten on compaction/close only; on open,
+whatever the log has beyond the indexed size is scanned and added.
+
+Deleting is done with tombstones ({"op": "clear", "channel_id": ...}); compaction
+rewrites the live records into a new file and swaps it in atomically. It runs once dead
+records outnumber live ones (and number at least STORAGE_COMPACT_MIN), checked after
+every clear, on flush() and on each tick of the fsync thread.
+"""
+import atexit
 import json
 import os
+import threading
+import time
 from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+STORAGE_PATH = os.getenv("STORAGE_PATH", "wishlist.ndjson")
+STORAGE_FSYNC_EVERY = int(os.getenv("STORAGE_FSYNC_EVERY", "64"))
+STORAGE_FSYNC_INTERVAL = float(os.getenv("STORAGE_FSYNC_INTERVAL", "1.0"))
+# Compact once dead records outnumber live ones (and there are at least this many).
+STORAGE_COMPACT_MIN = int(os.getenv("STORAGE_COMPACT_MIN", "1000"))
+
+_NO_CHANNEL = ""
+
+
+def _fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LogStore:
+    """
+    Append-only NDJSON log + channel index. Thread-safe (one lock), so it can be driven
+    from asyncio.to_thread as well as from plain scripts.
+    """
+    def __init__(
+        self,
+        path: str,
+        fsync_every: int = STORAGE_FSYNC_EVERY,
+        fsync_interval: float = STORAGE_FSYNC_INTERVAL,
+        compact_min: int = STORAGE_COMPACT_MIN,
+    ):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_min = compact_min
+
+        self._lock = threading.RLock()
+        self._offsets: Dict[str, List[int]] = {}
+        self._live = 0
+        self._dead = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._recover()
+        self._fh = open(self.path, "ab")
+
+        self._closed = threading.Event()
+        if fsync_interval > 0:
+            threading.Thread(target=self._sync_loop, name=f"logstore-sync:{path}", daemon=True).start()
 
-def save_item(data, path="wishlist.json"):
-    wishlist = []
+    # --- open/recovery ----------------------------------------------------------------
 
-    # Safely read existing wishlist
-    if os.path.exists(path):
+    def _load_index(self) -> int:
         try:
-            with open(path, "r") as f:
-                contents = f.read().strip()
-                if contents:
-                    wishlist = json.loads(contents)
-        except json.JSONDecodeError:
-            print("⚠️ Warning: wishlist.json is corrupted. Starting fresh.")
-
-    # Add timestamp and append the new item
+            with open(self.index_path, "r") as f:
+                idx = json.load(f)
+            if idx.get("inode") != os.stat(self.path).st_ino:
+                raise ValueError("index belongs to another file generation")
+            self._offsets = {k: list(v) for k, v in idx["channels"].items()}
+            self._live = int(idx["live"])
+            self._dead = int(idx["dead"])
+            return int(idx["size"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self._offsets, self._live, self._dead = {}, 0, 0
+            return 0
+
+    def _recover(self) -> None:
+        if not os.path.exists(self.path):
+            open(self.path, "ab").close()
+        size = os.path.getsize(self.path)
+        start = self._load_index()
+        if start > size:  # index from another file generation
+            self._offsets, self._live, self._dead = {}, 0, 0
+            start = 0
+
+        good = start
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b"\n"):
+                    break  # torn write at the tail
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._track(record, offset)
+                good = f.tell()
+
+        if good < size:
+            print(f"⚠️ {self.path}: dropping {size - good} bytes of torn tail")
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _track(self, record: Dict[str, Any], offset: int) -> None:
+        channel = str(record.get("channel_id") or _NO_CHANNEL)
+        if record.get("op") == "clear":
+            dropped = self._offsets.pop(channel, [])
+            self._live -= len(dropped)
+            self._dead += len(dropped) + 1
+        else:
+            self._offsets.setdefault(channel, []).append(offset)
+            self._live += 1
+
+    # --- writes -----------------------------------------------------------------------
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        offset = self._fh.tell()
+        self._fh.write(line)
+        self._track(record, offset)
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _sync_loop(self) -> None:
+        # Bounds the fsync lag when writes stop, and gives compaction a periodic check.
+        while not self._closed.wait(self.fsync_interval):
+            with self._lock:
+                if self._fh.closed:
+                    return
+                if self._unsynced:
+                    self._sync()
+                self._maybe_compact()
+
+    def _sync(self) -> None:
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._write(record)
+            self._fh.flush()
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for r in records:
+                self._write(r)
+            self._fh.flush()
+
+    def clear_channel(self, channel_id: str) -> None:
+        with self._lock:
+            self._write({"op": "clear", "channel_id": str(channel_id)})
+            self._sync()
+            self._maybe_compact()
+
+    def flush(self) -> None:
+        """
+        fsync anything written since the last batch boundary.
+        """
+        with self._lock:
+            if self._unsynced:
+                self._sync()
+            self._maybe_compact()
+
+    # --- reads ------------------------------------------------------------------------
+
+    def iter_channel(self, channel_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream one channel's records in insertion order via the index.
+        """
+        with self._lock:
+            self._fh.flush()
+            offsets = list(self._offsets.get(str(channel_id), ()))
+            # Opened under the lock: a later compaction swaps the path, not this file.
+            f = open(self.path, "rb")
+        with f:
+            for offset in offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def iter_all(self) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every live record (tombstones applied).
+        """
+        with self._lock:
+            self._fh.flush()
+            live = sorted(o for offsets in self._offsets.values() for o in offsets)
+            f = open(self.path, "rb")
+        with f:
+            for offset in live:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    def channels(self) -> List[str]:
+        with self._lock:
+            return [c for c, offsets in self._offsets.items() if offsets]
+
+    def __len__(self) -> int:
+        return self._live
+
+    # --- compaction -------------------------------------------------------------------
+
+    def _maybe_compact(self) -> None:
+        if self._dead >= self.compact_min and self._dead > self._live:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Rewrite live records into <path>.tmp, fsync, rename over the log, rebuild the index.
+        """
+        with self._lock:
+            self._sync()
+            tmp = self.path + ".tmp"
+            offsets: Dict[str, List[int]] = {}
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                live = sorted(
+                    (o, c) for c, channel_offsets in self._offsets.items() for o in channel_offsets
+                )
+                for old, channel in live:
+                    src.seek(old)
+                    offsets.setdefault(channel, []).append(dst.tell())
+                    dst.write(src.readline())
+                dst.flush()
+                os.fsync(dst.fileno())
+
+            self._fh.close()
+            os.replace(tmp, self.path)
+            _fsync_dir(self.path)
+            self._fh = open(self.path, "ab")
+            self._offsets = offsets
+            self._dead = 0
+            self._write_index()
+
+    def truncate(self, expected_len: Optional[int] = None) -> bool:
+        """
+        Drop every record (e.g. a journal that has been replayed). With expected_len, only
+        if the store still holds exactly that many live records, so appends that raced
+        the caller aren't lost. Returns whether it truncated.
+        """
+        with self._lock:
+            if expected_len is not None and self._live != expected_len:
+                return False
+            self._fh.truncate(0)
+            self._fh.seek(0)
+            self._sync()
+            self._offsets, self._live, self._dead = {}, 0, 0
+            self._write_index()
+            return True
+
+    def drop_oldest(self, count: int) -> None:
+        """
+        Drop the `count` oldest live records (e.g. the journal prefix just replayed) and
+        compact them away; anything appended after them stays.
+        """
+        with self._lock:
+            if count >= self._live:
+                self.truncate()
+                return
+            cut = set(sorted(o for offsets in self._offsets.values() for o in offsets)[:count])
+            for channel in list(self._offsets):
+                kept = [o for o in self._offsets[channel] if o not in cut]
+                if kept:
+                    self._offsets[channel] = kept
+                else:
+                    del self._offsets[channel]
+            self._live -= count
+            self._dead += count
+            self.compact()
+
+    def _write_index(self) -> None:
+        self._fh.flush()
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(
+                {
+                    "inode": os.fstat(self._fh.fileno()).st_ino,
+                    "size": self._fh.tell(),
+                    "live": self._live,
+                    "dead": self._dead,
+                    "channels": self._offsets,
+                },
+                f,
+                separators=(",", ":"),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.index_path)
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            if self._fh.closed:
+                return
+            self._sync()
+            self._write_index()
+            self._fh.close()
+
+
+_stores: Dict[str, LogStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: Optional[str] = None) -> LogStore:
+    """
+    One shared LogStore per path for the process.
+    """
+    path = path or STORAGE_PATH
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = LogStore(path)
+            _import_legacy(store)
+        return store
+
+
+def _import_legacy(store: LogStore) -> None:
+    # One-time move of the old rewrite-the-whole-file wishlist.json into the log.
+    legacy = os.path.splitext(store.path)[0] + ".json"
+    if legacy == store.path or not os.path.exists(legacy) or len(store):
+        return
+    try:
+        with open(legacy, "r") as f:
+            contents = f.read().strip()
+        items = json.loads(contents) if contents else []
+    except (OSError, json.JSONDecodeError):
+        print(f"⚠️ Warning: {legacy} is corrupted. Not importing it.")
+        return
+    store.append_many([it for it in items if isinstance(it, dict)])
+    store.flush()
+    os.replace(legacy, legacy + ".imported")
+    print(f"✅ Imported {len(items)} items from {legacy}")
+
+
+@atexit.register
+def _close_all() -> None:
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+
+
+def save_item(data, path=None):
+    """
+    Append one item; cost is independent of the store size.
+    """
     data["timestamp"] = datetime.now().isoformat()
-    wishlist.append(data)
+    get_store(path).append(data)
+
 
-    # Save back to JSON
-    with open(path, "w") as f:
-        json.dump(wishlist, f, indent=2)
+def iter_items(channel_id, path=None):
+    return get_store(path).iter_channel(channel_id)
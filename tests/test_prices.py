@@ -0,0 +1,42 @@
+import pytest
+
+from prices import format_minor, parse_price
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("$1,299.00", (129900, "USD")),
+        ("1.299,00 €", (129900, "EUR")),
+        ("1 299,00 €", (129900, "EUR")),
+        ("1 299,99 €", (129999, "EUR")),
+        ("CHF 1'299.50", (129950, "CHF")),
+        ("₹ 2,499", (249900, "INR")),
+        ("¥1,200", (1200, "JPY")),
+        ("12,5 EUR", (1250, "EUR")),
+        ("$10 - $20", (1000, "USD")),
+        ("Rs. 1,499", (149900, "INR")),
+    ],
+)
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+
+def test_neighbouring_numbers_are_not_merged():
+    assert parse_price("$19.99 2 left") == (1999, "USD")
+    assert parse_price("$5.00 (3 offers)") == (500, "USD")
+
+
+def test_leading_decimal_point():
+    assert parse_price("$.99") == (99, "USD")
+    assert parse_price(".99 EUR") == (99, "EUR")
+
+
+@pytest.mark.parametrize("text", [None, "", "N/A", "Price unavailable"])
+def test_no_number(text):
+    assert parse_price(text) == (None, None)
+
+
+def test_format_minor():
+    assert format_minor(129900, "USD") == "USD 1,299.00"
+    assert format_minor(1200, "JPY") == "JPY 1,200"
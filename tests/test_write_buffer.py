@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("aiohttp")
+
+from sqlalchemy import exc as sa_exc  # noqa: E402
+
+import write_buffer  # noqa: E402
+from write_buffer import WriteBuffer, is_outage  # noqa: E402
+
+
+def _wrapped(orig: BaseException, **kw) -> sa_exc.DBAPIError:
+    # The way SQLAlchemy raises driver errors: wrapped, with the original as __cause__.
+    try:
+        try:
+            raise orig
+        except BaseException as e:
+            raise sa_exc.OperationalError("INSERT INTO wishlist_item ...", {}, e, **kw) from e
+    except sa_exc.OperationalError as e:
+        return e
+
+
+class FakePgError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def test_statement_errors_are_not_outages():
+    assert not is_outage(_wrapped(Exception("no such table: wishlist_item")))
+    assert not is_outage(_wrapped(Exception("database is locked")))
+    assert not is_outage(_wrapped(FakePgError("42P01")))  # undefined_table
+
+
+def test_connection_errors_are_outages():
+    assert is_outage(_wrapped(ConnectionRefusedError()))
+    assert is_outage(_wrapped(Exception("server closed the connection"), connection_invalidated=True))
+    assert is_outage(_wrapped(FakePgError("08006")))
+    assert is_outage(_wrapped(FakePgError("53300")))
+    assert is_outage(asyncio.TimeoutError())
+    assert is_outage(sa_exc.TimeoutError("QueuePool limit reached"))
+
+
+def test_statement_error_is_raised_not_journaled(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_buffer, "WRITE_JOURNAL_RETRY", 3600)
+
+    async def insert(items):
+        raise _wrapped(Exception("no such table: wishlist_item"))
+
+    async def run():
+        buf = WriteBuffer(insert, journal_path=str(tmp_path / "journal.ndjson"))
+        await buf.start()
+        try:
+            with pytest.raises(sa_exc.OperationalError):
+                await buf.submit([{"channel_id": "1", "url": "https://example.com/a"}])
+            return buf.down, len(buf._journal)
+        finally:
+            await buf.stop()
+
+    assert asyncio.run(run()) == (False, 0)
@@ -0,0 +1,173 @@
+"""
+URL canonicalization for duplicate detection and the scrape cache key.
+
+normalize_url() is pure and cheap: host aliases, per-domain rules (e.g. Amazon ->
+/dp/ASIN), tracking-param removal and a sorted query. Short links (amzn.to, bit.ly, ...)
+can't be canonicalized offline; resolve_short_link() follows them with a HEAD request
+and caches the answer.
+"""
+import os
+import re
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import aiohttp
+
+import scraper
+from cache import LRUCache
+
+# Follow known short-link hosts before normalizing (one HEAD per new short link).
+URL_RESOLVE_SHORT_LINKS = os.getenv("URL_RESOLVE_SHORT_LINKS", "true").lower() in ("1", "true", "yes")
+URL_RESOLVE_TIMEOUT = float(os.getenv("URL_RESOLVE_TIMEOUT", "5"))
+URL_RESOLVE_CACHE_SIZE = int(os.getenv("URL_RESOLVE_CACHE_SIZE", "5000"))
+URL_RESOLVE_CACHE_TTL = float(os.getenv("URL_RESOLVE_CACHE_TTL", "86400"))
+
+SHORT_LINK_HOSTS = {
+    "amzn.to", "amzn.eu", "amzn.asia", "a.co",
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "ow.ly", "buff.ly",
+    "ebay.us", "etsy.me", "shope.ee", "s.click.aliexpress.com",
+}
+
+# Dropped from every query string: ad/analytics click ids no shop uses to pick a product.
+# Generic-looking keys (ref, tag, si, ...) can select a product or variant elsewhere, so
+# they are only dropped on the hosts below.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "gclsrc", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "srsltid", "_ga", "_gl",
+}
+TRACKING_PREFIXES = ("utm_", "hsa_", "_hs")
+
+# Per-site tracking keys: (params, prefixes).
+AMAZON_TRACKING = (
+    {
+        "ref", "ref_", "tag", "linkcode", "linkid", "ascsubtag", "camp", "creative",
+        "creativeasin", "psc", "smid", "_encoding", "ref_src", "si",
+    },
+    ("pd_rd_", "pf_rd_"),
+)
+HOST_TRACKING = {
+    "aliexpress.com": ({"spm", "scm", "aff_fcid", "aff_fsk", "aff_platform", "aff_trace_key", "sk", "terminal_id"}, ()),
+}
+
+# Mobile/desktop variants of the same site.
+HOST_PREFIXES = ("www.", "m.", "mobile.", "smile.")
+
+_AMAZON_HOST = re.compile(r"^amazon\.(com|ca|com\.mx|com\.br|co\.uk|de|fr|it|es|nl|se|pl|com\.be|com\.tr|ae|sa|in|co\.jp|com\.au|sg|eg)$")
+_AMAZON_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d|exec/obidos/asin|o/asin)/([A-Z0-9]{10})(?:[/?]|$)", re.I)
+_EBAY_ITEM = re.compile(r"^/itm/(?:[^/]+/)?(\d{9,})")
+_ETSY_LISTING = re.compile(r"^/listing/(\d+)")
+_WALMART_ITEM = re.compile(r"^/ip/(?:[^/]+/)?(\d+)")
+
+# host -> rule(path) returning the canonical path, or None to keep the generic form.
+# A rule that returns a path also drops the whole query string.
+DomainRule = Callable[[str], Optional[str]]
+
+
+def _amazon(path: str) -> Optional[str]:
+    m = _AMAZON_ASIN.search(path + "/")
+    return f"/dp/{m.group(1).upper()}" if m else None
+
+
+def _match(pattern: "re.Pattern[str]", fmt: str) -> DomainRule:
+    def rule(path: str) -> Optional[str]:
+        m = pattern.match(path)
+        return fmt.format(m.group(1)) if m else None
+    return rule
+
+
+DOMAIN_RULES: Dict[str, DomainRule] = {
+    "ebay.com": _match(_EBAY_ITEM, "/itm/{}"),
+    "ebay.co.uk": _match(_EBAY_ITEM, "/itm/{}"),
+    "ebay.de": _match(_EBAY_ITEM, "/itm/{}"),
+    "etsy.com": _match(_ETSY_LISTING, "/listing/{}"),
+    "walmart.com": _match(_WALMART_ITEM, "/ip/{}"),
+}
+
+
+def _rule_for(host: str) -> Optional[DomainRule]:
+    if _AMAZON_HOST.match(host):
+        return _amazon
+    return DOMAIN_RULES.get(host)
+
+
+def _canonical_host(netloc: str) -> str:
+    host = netloc.lower().rsplit("@", 1)[-1]
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    return host
+
+
+def _is_tracking(key: str, host: str) -> bool:
+    k = key.lower()
+    if k in TRACKING_PARAMS or k.startswith(TRACKING_PREFIXES):
+        return True
+    site = AMAZON_TRACKING if _AMAZON_HOST.match(host) else HOST_TRACKING.get(host)
+    return site is not None and (k in site[0] or k.startswith(site[1]))
+
+
+def normalize_url(raw: str) -> str:
+    """
+    Normalize URL for duplicate detection:
+    - https, lowercase host without www./m./mobile. and default ports
+    - per-domain rules (Amazon /dp/ASIN, eBay /itm/ID, ...)
+    - strip fragments, trailing slash and tracking params (global + per-site)
+    - sort the remaining query params
+    """
+    try:
+        raw = raw.strip()
+        p = urlparse(raw)
+        host = _canonical_host(p.netloc)
+        path = p.path.rstrip("/")
+
+        rule = _rule_for(host)
+        canonical_path = rule(p.path) if rule else None
+        if canonical_path is not None:
+            return urlunparse(("https", host, canonical_path, "", "", ""))
+
+        query = sorted(
+            (k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not _is_tracking(k, host)
+        )
+        return urlunparse(("https", host, path, p.params, urlencode(query), ""))  # strip fragment
+    except Exception:
+        return raw.strip()
+
+
+def is_short_link(url: str) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return host in SHORT_LINK_HOSTS
+
+
+_resolved = LRUCache(maxsize=URL_RESOLVE_CACHE_SIZE, ttl=URL_RESOLVE_CACHE_TTL)
+
+
+async def resolve_short_link(url: str) -> str:
+    """
+    Final URL behind a known short-link host (HEAD, redirects followed), cached.
+    Anything else, or a failed lookup, comes back unchanged.
+    """
+    if not URL_RESOLVE_SHORT_LINKS or not is_short_link(url):
+        return url
+    cached = _resolved.get(url)
+    if cached is not None:
+        return cached
+    try:
+        async with scraper.get_session().head(
+            url,
+            allow_redirects=True,
+            max_redirects=5,
+            timeout=aiohttp.ClientTimeout(total=URL_RESOLVE_TIMEOUT),
+        ) as res:
+            final = str(res.url)
+    except Exception as e:
+        print(f"⚠️ Could not resolve {url}: {e}")
+        return url
+    _resolved.set(url, final)
+    return final
+
+
+def resolver_stats() -> Dict[str, Any]:
+    return _resolved.stats()
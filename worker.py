@@ -0,0 +1,240 @@
+"""
+Scrape worker: drains the scrape_job queue filled by bot.py when SCRAPE_QUEUE is on.
+
+Runs as its own process (`python worker.py`, the "scraper" process in fly.toml), so
+page fetching/parsing never competes with the gateway connection. Jobs are claimed with
+FOR UPDATE SKIP LOCKED, so any number of workers can share the table; a claimed job
+whose worker died is picked up again once its lease runs out.
+
+Replies go out over Discord's REST API only (no gateway session).
+"""
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import discord
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import bot
+import metrics
+import scrape_cache
+import scraper
+from urls import normalize_url
+
+from sqlalchemy import and_, delete, or_, select, update
+
+from db.session import AsyncSessionLocal, async_engine
+from db.models import ScrapeJob
+
+# Jobs claimed per round trip, and how many of them are scraped at once.
+WORKER_BATCH = int(os.getenv("WORKER_BATCH", "20"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))
+# Sleep between polls when the queue is empty.
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1"))
+# Longest sleep after consecutive loop errors (DB outage etc.); doubles from 1s.
+WORKER_ERROR_BACKOFF_MAX = 60.0
+# After this many failed scrapes the link is saved anyway as "Unknown Product".
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# A running job untouched for this long is assumed orphaned and re-claimed.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "30"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "3600"))
+
+
+def backoff_seconds(attempts: int) -> float:
+    """
+    Exponential backoff with full jitter: base * 2^(attempts-1), capped.
+    """
+    return random.uniform(0, min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempts - 1)))
+
+
+@metrics.timed_db
+async def claim_jobs_db(limit: int) -> List[ScrapeJob]:
+    """
+    Claim up to `limit` due jobs for this worker: pending ones whose backoff is over,
+    plus running ones whose lease expired. Rows locked by another worker are skipped.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        jobs = (
+            await db.execute(
+                select(ScrapeJob)
+                .where(
+                    or_(
+                        and_(ScrapeJob.status == "pending", ScrapeJob.next_attempt_at <= now),
+                        and_(
+                            ScrapeJob.status == "running",
+                            ScrapeJob.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS),
+                        ),
+                    )
+                )
+                .order_by(ScrapeJob.next_attempt_at, ScrapeJob.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        for job in jobs:
+            job.status = "running"
+            job.locked_at = now
+            job.attempts += 1
+        await db.commit()
+    return list(jobs)
+
+
+@metrics.timed_db
+async def retry_jobs_db(failed: List[Tuple[ScrapeJob, str]]) -> None:
+    if not failed:
+        return
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        for job, error in failed:
+            await db.execute(
+                update(ScrapeJob)
+                .where(ScrapeJob.id == job.id)
+                .values(
+                    status="pending",
+                    locked_at=None,
+                    last_error=error,
+                    next_attempt_at=now + timedelta(seconds=backoff_seconds(job.attempts)),
+                )
+            )
+        await db.commit()
+
+
+@metrics.timed_db
+async def delete_jobs_db(job_ids: List[int]) -> None:
+    if not job_ids:
+        return
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(ScrapeJob).where(ScrapeJob.id.in_(job_ids)))
+        await db.commit()
+
+
+async def _scrape(sem: asyncio.Semaphore, job: ScrapeJob) -> Tuple[Dict[str, Any], Optional[str]]:
+    async with sem:
+        try:
+            info = await scrape_cache.cached_scrape(job.url)
+        except Exception as e:
+            return {"title": "Unknown Product", "price": "N/A", "ok": False}, f"{type(e).__name__}: {e}"
+    if info.get("ok", True):
+        return info, None
+    d = scraper.domain_stats().get((urlparse(job.url).hostname or "").lower(), {})
+    return info, d.get("last_error") or "scrape failed"
+
+
+async def _post(client: discord.Client, channel_id: str, dupes: List[str], embeds: List[discord.Embed]) -> None:
+    channel = client.get_partial_messageable(int(channel_id))
+    try:
+        for chunk in bot.chunk_lines("🔁 Already in this channel wishlist:", [f"<{u}>" for u in dupes]):
+            await channel.send(chunk)
+        for i in range(0, len(embeds), bot.MAX_EMBEDS_PER_MESSAGE):
+            await channel.send(embeds=embeds[i:i + bot.MAX_EMBEDS_PER_MESSAGE])
+    except discord.HTTPException as e:
+        # Channel gone or no permission: the items are saved either way.
+        print(f"⚠️ Could not post to channel {channel_id}: {e}")
+
+
+async def process_batch(client: discord.Client, jobs: List[ScrapeJob], sem: asyncio.Semaphore) -> None:
+    results = await asyncio.gather(*(_scrape(sem, job) for job in jobs))
+
+    failed: List[Tuple[ScrapeJob, str]] = []
+    done: Dict[str, List[Tuple[ScrapeJob, Dict[str, Any]]]] = {}
+    for job, (info, error) in zip(jobs, results):
+        if error is not None and job.attempts < JOB_MAX_ATTEMPTS:
+            failed.append((job, error))
+        else:
+            # Success, or out of attempts: save what we have, like the inline path does.
+            done.setdefault(job.channel_id, []).append((job, info))
+
+    await retry_jobs_db(failed)
+
+    for channel_id, entries in done.items():
+        # Same link queued twice for one channel: the first one wins.
+        first: Dict[str, Tuple[ScrapeJob, Dict[str, Any]]] = {}
+        for job, info in entries:
+            first.setdefault(normalize_url(job.url), (job, info))
+
+        inserted = await bot.save_items_db(
+            [
+                {
+                    "guild_id": job.guild_id,
+                    "channel_id": channel_id,
+                    "url": job.url,
+                    "title": info.get("title", "Unknown"),
+                    "price": info.get("price"),
+                    "user_tag": job.user_tag,
+                }
+                for job, info in first.values()
+            ]
+        )
+        await delete_jobs_db([job.id for job, _ in entries])
+
+        metrics.INSERT_RACES.inc(len(first) - len(inserted))
+        metrics.LINKS_CAPTURED.inc(len(inserted))
+
+        dupes = [
+            job.url for job, _ in entries
+            if normalize_url(job.url) not in inserted or first[normalize_url(job.url)][0] is not job
+        ]
+        embeds = [
+            bot.build_item_embed(job.url, info, job.user_tag)
+            for norm, (job, info) in first.items()
+            if norm in inserted
+        ]
+        await _post(client, channel_id, dupes, embeds)
+
+
+async def run() -> None:
+    if not bot.TOKEN:
+        raise RuntimeError("DISCORD_TOKEN is not set")
+    if not bot.SCRAPE_QUEUE:
+        # Nothing will ever be enqueued; don't keep the database awake polling it.
+        print("⚠️ SCRAPE_QUEUE is off; worker has nothing to do, exiting")
+        return
+
+    service = metrics.MetricsService()
+    await service.start()
+    # REST-only client: login() fetches the bot user but never opens a gateway session.
+    client = discord.Client(intents=discord.Intents.none(), http_trace=metrics.discord_trace_config())
+    await client.login(bot.TOKEN)
+    print(f"✅ Worker running as {client.user}")
+
+    sem = asyncio.Semaphore(WORKER_CONCURRENCY)
+    backoff = 1.0
+    try:
+        while True:
+            try:
+                jobs = await claim_jobs_db(WORKER_BATCH)
+                if not jobs:
+                    await asyncio.sleep(WORKER_POLL_INTERVAL)
+                    continue
+                await process_batch(client, jobs, sem)
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Claimed jobs stay leased and are picked up again once the lease runs out.
+                print(f"⚠️ Worker loop error: {type(e).__name__}: {e}; retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, WORKER_ERROR_BACKOFF_MAX)
+    finally:
+        await client.close()
+        await service.stop()
+        await scraper.close()
+        await async_engine.dispose()
+
+
+def main() -> None:
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Write-behind buffer in front of the wishlist insert.
+
+Items submitted from any number of messages are grouped and written as one multi-row
+INSERT ... ON CONFLICT DO NOTHING. A write starts immediately when none is in flight;
+while one is, new rows collect until it lands, WRITE_BUFFER_MS passes or
+WRITE_BUFFER_ROWS are waiting, whichever comes first.
+
+If the database is unreachable the batch is appended to a durable journal
+(storage.LogStore on the /data volume) instead, and the submitter is told the items
+were saved. From then on batches go straight to the journal, without waiting on doomed
+connections, until a background task manages to replay the journal. Replay is
+idempotent: rows already present lose on uq_wishlist_channel_urlnorm and are skipped.
+Journaled rows carry the time they were submitted, so replay keeps their created_at.
+
+Each replay pass inserts a snapshot of the journal and then drops exactly that prefix;
+rows spilled meanwhile stay for the next pass. After the first clean pass the database
+takes new batches again, so the passes only have to drain a shrinking tail.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import exc as sa_exc
+
+import metrics
+from storage import LogStore
+from urls import normalize_url
+
+WRITE_BUFFER_MS = float(os.getenv("WRITE_BUFFER_MS", "50"))
+WRITE_BUFFER_ROWS = int(os.getenv("WRITE_BUFFER_ROWS", "200"))
+WRITE_JOURNAL_PATH = os.getenv("WRITE_JOURNAL_PATH", "write_journal.ndjson")
+# Seconds between replay attempts while the database is down.
+WRITE_JOURNAL_RETRY = float(os.getenv("WRITE_JOURNAL_RETRY", "5"))
+
+# (channel_id, url_norm) pairs that were actually inserted.
+InsertFn = Callable[[List[Dict[str, Any]]], Awaitable[Set[Tuple[str, str]]]]
+
+
+# Postgres SQLSTATEs that mean the server can't be used right now rather than that the
+# statement is wrong: class 08 (connection exception), shutdowns, too many connections.
+_OUTAGE_SQLSTATES = ("08", "57P01", "57P02", "57P03", "53300")
+
+
+def is_outage(e: BaseException) -> bool:
+    """
+    True for "can't reach the database" errors (refused/reset connections, timeouts,
+    pool exhaustion, a connection SQLAlchemy invalidated), as opposed to errors in the
+    statement itself. OperationalError alone isn't enough: it also covers statement
+    failures ("no such table", "database is locked") that would never replay.
+    """
+    while e is not None:
+        if isinstance(e, (OSError, asyncio.TimeoutError, sa_exc.TimeoutError, sa_exc.DisconnectionError)):
+            return True
+        if isinstance(e, sa_exc.DBAPIError) and e.connection_invalidated:
+            return True
+        sqlstate = getattr(e, "sqlstate", None)
+        if isinstance(sqlstate, str) and sqlstate.startswith(_OUTAGE_SQLSTATES):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+
+def _key(item: Dict[str, Any]) -> Tuple[str, str]:
+    return str(item["channel_id"]), normalize_url(item["url"])
+
+
+class WriteBuffer:
+    def __init__(
+        self,
+        insert: InsertFn,
+        flush_ms: float = WRITE_BUFFER_MS,
+        max_rows: int = WRITE_BUFFER_ROWS,
+        journal_path: str = WRITE_JOURNAL_PATH,
+    ):
+        self.insert = insert
+        self.flush_ms = flush_ms
+        self.max_rows = max_rows
+        self.journal_path = journal_path
+        self.down = False
+        self._journal: Optional[LogStore] = None
+        self._pending: List[Tuple[Dict[str, Any], "asyncio.Future[bool]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set["asyncio.Task[None]"] = set()
+        self._replay_task: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        self._journal = await asyncio.to_thread(LogStore, self.journal_path)
+        metrics.JOURNAL_PENDING.set(len(self._journal))
+        if len(self._journal):
+            # Left over from an outage before the last restart.
+            print(f"📒 {len(self._journal)} journaled writes waiting for replay")
+            self._mark_down(None)
+
+    async def stop(self) -> None:
+        self._flush_now()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task = None
+        if self._journal is not None:
+            await asyncio.to_thread(self._journal.close)
+
+    async def submit(self, items: List[Dict[str, Any]]) -> Set[str]:
+        """
+        Queue items for the next batch and wait for it. Returns the url_norms that were
+        inserted (or journaled); the rest were already in their channel.
+        """
+        if not items:
+            return set()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            fut: "asyncio.Future[bool]" = loop.create_future()
+            self._pending.append((item, fut))
+            futures.append(fut)
+
+        # Group commit: with nothing in flight write right away (no added latency when
+        # quiet); otherwise rows pile up until the current batch lands, the timer fires
+        # or the batch is full.
+        if not self._writes or len(self._pending) >= self.max_rows or self.flush_ms <= 0:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_ms / 1000, self._flush_now)
+
+        results = await asyncio.gather(*futures)
+        return {normalize_url(it["url"]) for it, ok in zip(items, results) if ok}
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_rows], self._pending[self.max_rows:]
+            task = asyncio.create_task(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._write_done)
+
+    def _write_done(self, task: "asyncio.Task[None]") -> None:
+        self._writes.discard(task)
+        if self._pending and not self._writes:
+            self._flush_now()
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], "asyncio.Future[bool]"]]) -> None:
+        items = [it for it, _ in batch]
+        metrics.WRITE_BATCH_ROWS.observe(len(items))
+        inserted: Optional[Set[Tuple[str, str]]] = None
+
+        if not self.down:
+            try:
+                inserted = await self.insert(items)
+            except Exception as e:
+                if not is_outage(e):
+                    for _, fut in batch:
+                        if not fut.done():
+                            fut.set_exception(e)
+                    return
+                self._mark_down(e)
+
+        if inserted is None:
+            try:
+                await self._spill(items)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                return
+            # Optimistic: the duplicate check already passed; replay sorts out races.
+            inserted = {_key(it) for it in items}
+
+        # Same link twice in one batch (two messages racing): the first one wins.
+        seen: Set[Tuple[str, str]] = set()
+        for item, fut in batch:
+            key = _key(item)
+            if not fut.done():
+                fut.set_result(key in inserted and key not in seen)
+            seen.add(key)
+
+    async def _spill(self, items: List[Dict[str, Any]]) -> None:
+        journal = self._journal
+        now = datetime.now(timezone.utc)
+        records = []
+        for it in items:
+            created_at = it.get("created_at") or now
+            records.append({**it, "created_at": created_at.isoformat()})
+
+        def write() -> None:
+            journal.append_many(records)
+            journal.flush()
+
+        await asyncio.to_thread(write)
+        metrics.JOURNALED_ROWS.inc(len(items))
+        metrics.JOURNAL_PENDING.set(len(journal))
+
+    def _mark_down(self, error: Optional[BaseException]) -> None:
+        if not self.down:
+            self.down = True
+            print(f"⚠️ Database unreachable, journaling writes to {self.journal_path}: {error}")
+        if self._replay_task is None or self._replay_task.done():
+            self._replay_task = asyncio.create_task(self._replay_loop())
+
+    async def _replay_loop(self) -> None:
+        while True:
+            await asyncio.sleep(WRITE_JOURNAL_RETRY)
+            try:
+                await self._replay()
+            except Exception as e:
+                if not is_outage(e):
+                    print(f"⚠️ Journal replay failed: {e}")
+                continue
+            # Checked without awaiting: a spill after this point finds the task done
+            # and _mark_down starts a new one.
+            if not len(self._journal):
+                self.down = False
+                print("✅ Database is back, journal replayed")
+                return
+
+    async def _replay(self) -> None:
+        journal = self._journal
+        while True:
+            records = await asyncio.to_thread(lambda: list(journal.iter_all()))
+            if not records:
+                return
+            for r in records:
+                if r.get("created_at"):  # journals written before it was recorded lack it
+                    r["created_at"] = datetime.fromisoformat(r["created_at"])
+            for i in range(0, len(records), self.max_rows):
+                await self.insert(records[i:i + self.max_rows])
+            # Only the snapshot just inserted; rows spilled during the pass stay queued.
+            await asyncio.to_thread(journal.drop_oldest, len(records))
+            metrics.JOURNAL_PENDING.set(len(journal))
+            # The database took a whole pass: send new batches to it again, so the next
+            # pass only drains what spilled during this one.
+            self.down = False